@@ -0,0 +1,72 @@
+"""
+Benchmark of the import time, i.e. the startup of the command line interface.
+
+Every module is imported in a fresh interpreter (the startup of a bare interpreter is subtracted), repeated
+``--repeats`` times and the best time is reported. Fails if a module takes longer than its budget, so the startup
+stays fast as the library grows.
+
+Usage::
+
+    python benchmarks/import_time.py                        # the default budgets
+    python benchmarks/import_time.py --budget 0.05          # the same budget for all the modules
+    python benchmarks/import_time.py --modules knarrow.cli
+
+or ``hatch run bench-import`` with the same arguments.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+# the budgets in seconds, on top of the bare interpreter; only knarrow.main (NumPy) is allowed to be slow
+BUDGETS = {
+    "knarrow": 0.05,
+    "knarrow.cli": 0.15,
+    "knarrow.main": 0.5,
+}
+
+
+def measure(statement, repeats):
+    """
+    The best wall time of running a statement in a fresh interpreter.
+
+    Args:
+        statement (``str``): the Python code to run
+        repeats (``int``): how many times to run it
+
+    Returns:
+        ``float``: the best time in seconds
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(BUDGETS))
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--budget", type=float, help="the budget of every module in seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    baseline = measure("pass", arguments.repeats)
+    print(f"{'module':>14} {'import':>12} {'budget':>12}")
+    over_budget = 0
+    for module in arguments.modules:
+        elapsed = measure(f"import {module}", arguments.repeats) - baseline
+        budget = arguments.budget if arguments.budget is not None else BUDGETS.get(module, float("inf"))
+        over_budget += elapsed > budget
+        flag = "  OVER BUDGET" if elapsed > budget else ""
+        print(f"{module:>14} {elapsed * 1e3:>9.1f} ms {budget * 1e3:>9.1f} ms{flag}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark of the memory scaling of the windowed methods.
+
+The scores of every windowed method are computed on prepared curves of growing size and the peak memory is measured
+with :obj:`tracemalloc`, reported in bytes per point. The strided views allocate only the elementwise temporaries,
+so the bytes per point stay constant; for comparison, the ``gathered`` rows build the same scores from the triplets
+gathered through the index matrices of :obj:`knarrow.util.np_windowed` and :obj:`knarrow.util.np_anchored`. Fails if
+a method allocates more than its budget per point.
+
+Usage::
+
+    python benchmarks/memory.py
+    python benchmarks/memory.py --sizes 1000 1000000 --dtype float32
+
+or ``hatch run bench-memory`` with the same arguments.
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+import numpy as np
+
+from knarrow.distance_method import distance_adjacent_scores
+from knarrow.menger import get_curvature, menger_anchored_scores, menger_successive_scores
+from knarrow.util import np_anchored, np_windowed, pad_scores, projection_distance
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# the budgets in the number of float arrays of the size of the curve, the scores included, and a constant overhead
+BUDGETS = {
+    "menger_successive": 8,
+    "menger_anchored": 8,
+    "distance_adjacent": 8,
+}
+OVERHEAD = 64 * 1024
+
+
+def gathered_scores(method, x, y):
+    # the scores computed from the gathered triplets, as before the strided views
+    if method == "menger_anchored":
+        indices = np_anchored(x.shape[-1])
+    else:
+        indices = np_windowed(x.shape[-1], 3)
+    points = np.stack((x[..., indices], y[..., indices]), axis=-1)
+    if method == "distance_adjacent":
+        translated = (points - points[..., [0], :])[..., 1:, :]
+        return pad_scores(projection_distance(translated), before=0, after=2)
+    return pad_scores(get_curvature(points))
+
+
+METHODS = {
+    "menger_successive": menger_successive_scores,
+    "menger_anchored": menger_anchored_scores,
+    "distance_adjacent": distance_adjacent_scores,
+}
+
+
+def peak_memory(function, x, y):
+    """
+    The peak memory (in bytes) allocated during a single call of a function, not counting the inputs.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        function(x, y)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--dtype", choices=["float64", "float32"], default="float64", help="the type of the curves")
+    parser.add_argument("--no-gathered", action="store_true", help="skip the comparison with the gathered triplets")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    itemsize = np.dtype(arguments.dtype).itemsize
+    print(f"{'method':>18} {'size':>8} {'strided [B/point]':>18} {'gathered [B/point]':>19} {'budget':>8}")
+    over_budget = 0
+    for size in arguments.sizes:
+        x = np.linspace(0, 1, size, dtype=arguments.dtype)
+        y = 1 - np.exp(-8 * x)
+        for method, function in METHODS.items():
+            strided = peak_memory(function, x, y)
+            gathered = ""
+            if not arguments.no_gathered:
+                gathered = f"{peak_memory(lambda x, y: gathered_scores(method, x, y), x, y) / size:.1f}"
+            budget = BUDGETS[method] * itemsize
+            over = strided > budget * size + OVERHEAD
+            over_budget += over
+            print(f"{method:>18} {size:>8} {strided / size:>18.1f} {gathered:>19} {budget:>8}{'  OVER BUDGET' * over}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
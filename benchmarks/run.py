@@ -0,0 +1,279 @@
+"""
+Benchmarks of the knee-finding methods.
+
+Every case is one target (a method, ``smoothing`` or ``all``) on one synthetic curve, defined by its size, its knee
+type and the standard deviation of the added noise. Each case is timed with :obj:`time.perf_counter` (repeated until
+``--min-time`` seconds pass, the best and the median time are reported) and its peak memory is measured in a separate
+run with :obj:`tracemalloc`, which also tracks the NumPy allocations.
+
+Usage::
+
+    python benchmarks/run.py                                # the full grid, 10 to 10^6 points
+    python benchmarks/run.py --quick                        # only up to 10^4 points
+    python benchmarks/run.py --targets distance kneedle --sizes 1000 100000
+    python benchmarks/run.py --save baseline.json           # store the results
+    python benchmarks/run.py --dtype float32                # float32 curves, computed in float32
+    python benchmarks/run.py --backend numpy                # the NumPy reference even if numba is installed
+    python benchmarks/run.py --compare baseline.json        # report the changes, fail on regressions
+    python benchmarks/run.py --quick --compare benchmarks/baseline.json  # against the committed reference run
+    python benchmarks/run.py --profile --targets c_method   # cProfile of the selected cases instead of timing
+
+or ``hatch run bench`` with the same arguments.
+"""
+
+import argparse
+import cProfile
+import datetime
+import gc
+import json
+import platform
+import pstats
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from knarrow import find_knee
+from knarrow.__about__ import __version__
+from knarrow.kernels import BACKENDS, get_backend, set_backend
+from knarrow.methods import available
+from knarrow.util import KneeType, cubic_spline_smoothing, normalize
+
+SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+QUICK_SIZES = [10, 100, 1_000, 10_000]
+NOISE_LEVELS = [0.0, 0.01, 0.1]
+SMOOTHING_FACTOR = 0.01
+TARGETS = [*available(), "smoothing", "all"]
+
+# one representative curve per knee type, all with the knee around x = 0.2 (or 0.8 for the reversed ones)
+CURVES = {
+    KneeType.INCREASING_CONCAVE: lambda x: 1 - np.exp(-8 * x),
+    KneeType.DECREASING_CONVEX: lambda x: np.exp(-8 * x),
+    KneeType.INCREASING_CONVEX: lambda x: np.exp(8 * (x - 1)),
+    KneeType.DECREASING_CONCAVE: lambda x: 1 - np.exp(8 * (x - 1)),
+}
+
+
+def make_curve(size, knee_type, noise, seed=0, dtype="float64"):
+    """
+    A reproducible synthetic curve.
+
+    Args:
+        size (``int``): the number of points
+        knee_type (``KneeType``): the shape of the curve
+        noise (``float``): the standard deviation of the gaussian noise added to :math:`y`
+        seed (``int``): the seed of the noise
+        dtype (``str``): the floating point type of the coordinates
+
+    Returns:
+        ``tuple`` of ``np.ndarray``: the :math:`x` and the :math:`y` coordinates
+    """
+    x = np.linspace(0, 1, size)
+    y = CURVES[knee_type](x) + np.random.default_rng(seed).normal(0, noise, size)
+    return x.astype(dtype), y.astype(dtype)
+
+
+def get_function(target):
+    """
+    The function which is benchmarked for a target.
+
+    Args:
+        target (``str``): a method name, ``smoothing`` or ``all``
+
+    Returns:
+        ``callable``: the function of :math:`x` and :math:`y`
+    """
+    if target == "smoothing":
+        return lambda x, y: cubic_spline_smoothing(normalize(x), normalize(y), SMOOTHING_FACTOR)
+    return lambda x, y: find_knee(x, y, method=target)
+
+
+def measure_time(function, x, y, min_time, max_repeats):
+    """
+    Time a function, repeating it until ``min_time`` seconds pass (or ``max_repeats`` repetitions).
+
+    Returns:
+        ``tuple``: the best time, the median time and the number of repetitions
+    """
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(times) < max_repeats and (not times or sum(times) < min_time):
+            start = time.perf_counter()
+            function(x, y)
+            times.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return min(times), statistics.median(times), len(times)
+
+
+def measure_memory(function, x, y):
+    """
+    The peak memory (in bytes) allocated during a single call of a function, not counting the inputs.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        function(x, y)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def iterate_cases(targets, sizes, knee_types, noise_levels, dtype="float64"):
+    for size in sizes:
+        for knee_type in knee_types:
+            for noise in noise_levels:
+                x, y = make_curve(size, knee_type, noise, dtype=dtype)
+                for target in targets:
+                    case = {"target": target, "size": size, "knee_type": knee_type.name, "noise": noise}
+                    yield {**case, "dtype": dtype}, x, y
+
+
+def run(targets, sizes, knee_types, noise_levels, min_time=0.2, max_repeats=100, dtype="float64"):
+    """
+    Benchmark all the combinations of the arguments.
+
+    Returns:
+        ``list`` of ``dict``: one result per case
+    """
+    results = []
+    for case, x, y in iterate_cases(targets, sizes, knee_types, noise_levels, dtype):
+        function = get_function(case["target"])
+        function(x, y)  # warm up
+        best, median, repeats = measure_time(function, x, y, min_time, max_repeats)
+        result = {**case, "best": best, "median": median, "repeats": repeats}
+        result["peak_memory"] = measure_memory(function, x, y)
+        results.append(result)
+        print(format_result(result), flush=True)
+    return results
+
+
+def profile(targets, sizes, knee_types, noise_levels, limit=15, dtype="float64"):
+    """
+    Run every case once under :obj:`cProfile` and print the most expensive functions.
+    """
+    for case, x, y in iterate_cases(targets, sizes, knee_types, noise_levels, dtype):
+        print(f"### {case['target']} size={case['size']} {case['knee_type']} noise={case['noise']}")
+        profiler = cProfile.Profile()
+        profiler.runcall(get_function(case["target"]), x, y)
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats("cumulative").print_stats(limit)
+
+
+def case_key(result):
+    # the baselines saved before the dtype was recorded are all float64
+    return result["target"], result["size"], result["knee_type"], result["noise"], result.get("dtype", "float64")
+
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_result(result):
+    return (
+        f"{result['target']:>18} {result['size']:>8} {result['knee_type']:>19} {result['noise']:>5} "
+        f"{result['best'] * 1e3:>10.3f} ms {result['median'] * 1e3:>10.3f} ms {format_bytes(result['peak_memory']):>10}"
+    )
+
+
+def metadata():
+    return {
+        "knarrow": __version__,
+        "numpy": np.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "backends": {target: get_backend(target) for target in TARGETS},
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the ratios of the times and the peak memory to the baseline.
+
+    Args:
+        results (``list`` of ``dict``): the current results
+        baseline (``dict``): the saved results with the metadata
+        threshold (``float``): the ratio over which a change is a regression
+
+    Returns:
+        ``int``: the number of regressions
+    """
+    baseline_results = {case_key(result): result for result in baseline["results"]}
+    print(f"\nCompared to the baseline from {baseline['metadata']['date']} (knarrow {baseline['metadata']['knarrow']})")
+    regressions = 0
+    for result in results:
+        old = baseline_results.get(case_key(result))
+        if old is None:
+            continue
+        time_ratio = result["best"] / old["best"]
+        memory_ratio = result["peak_memory"] / max(old["peak_memory"], 1)
+        regression = time_ratio > threshold or memory_ratio > threshold
+        regressions += regression
+        print(
+            f"{result['target']:>18} {result['size']:>8} {result['knee_type']:>19} {result['noise']:>5} "
+            f"time x{time_ratio:.2f} memory x{memory_ratio:.2f}{'  REGRESSION' if regression else ''}"
+        )
+    print(f"{regressions} regression(s) over x{threshold}")
+    return regressions
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=None)
+    parser.add_argument("--quick", action="store_true", help=f"use the sizes {QUICK_SIZES}")
+    knee_types = [knee_type.name for knee_type in KneeType]
+    parser.add_argument("--knee-types", nargs="+", choices=knee_types, default=knee_types)
+    parser.add_argument("--noise", nargs="+", type=float, default=NOISE_LEVELS)
+    parser.add_argument("--dtype", choices=["float64", "float32"], default="float64", help="the type of the curves")
+    parser.add_argument("--backend", choices=BACKENDS, help="the backend of the methods (default: the fastest one)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to repeat every case for")
+    parser.add_argument("--max-repeats", type=int, default=100)
+    parser.add_argument("--save", metavar="PATH", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="the ratio over which a change is a regression")
+    parser.add_argument("--profile", action="store_true", help="profile the cases with cProfile instead of timing them")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    sizes = arguments.sizes or (QUICK_SIZES if arguments.quick else SIZES)
+    knee_types = [KneeType[name] for name in arguments.knee_types]
+    set_backend(arguments.backend)
+    if arguments.profile:
+        profile(arguments.targets, sizes, knee_types, arguments.noise, dtype=arguments.dtype)
+        return 0
+
+    print(f"{'target':>18} {'size':>8} {'knee type':>19} {'noise':>5} {'best':>13} {'median':>13} {'peak memory':>10}")
+    results = run(
+        arguments.targets,
+        sizes,
+        knee_types,
+        arguments.noise,
+        arguments.min_time,
+        arguments.max_repeats,
+        arguments.dtype,
+    )
+    if arguments.save:
+        with open(arguments.save, "w") as file:
+            json.dump({"metadata": metadata(), "results": results}, file, indent=2)
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)
+        return 1 if compare(results, baseline, arguments.threshold) > 0 else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
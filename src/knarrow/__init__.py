@@ -1,3 +1,55 @@
-from .main import all, find_knee
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["find_knee", "all"]
+if TYPE_CHECKING:
+    from .asynchronous import KneeBatcher, find_knee_async
+    from .incremental import IncrementalKneeDetector
+    from .main import (
+        all,
+        ensemble,
+        find_knee,
+        find_knees,
+        find_knees_grouped,
+        find_top_knees,
+    )
+    from .result import KneeResult
+
+__all__ = [
+    "find_knee",
+    "find_knees",
+    "find_knees_grouped",
+    "find_top_knees",
+    "all",
+    "ensemble",
+    "find_knee_async",
+    "KneeBatcher",
+    "IncrementalKneeDetector",
+    "KneeResult",
+]
+
+# the public names are imported on the first access (PEP 562), so e.g. the command line interface can start without
+# importing NumPy and all the methods
+_MODULES = {
+    "find_knee": "main",
+    "find_knees": "main",
+    "find_knees_grouped": "main",
+    "find_top_knees": "main",
+    "all": "main",
+    "ensemble": "main",
+    "find_knee_async": "asynchronous",
+    "KneeBatcher": "asynchronous",
+    "IncrementalKneeDetector": "incremental",
+    "KneeResult": "result",
+}
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_MODULES[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,5 +1,7 @@
 import numpy as np
 
+from .util import as_index, differences, pad_scores
+
 
 def angle(x, y, **kwargs):
     """
@@ -15,11 +17,23 @@ def angle(x, y, **kwargs):
     Returns:
         ``int``: the index of the knee
     """
+    return as_index(np.argmax(angle_scores(x, y, **kwargs), axis=-1))
+
+
+def angle_scores(x, y, **kwargs):
+    """
+    The absolute change of the angle at every point, the scores of :obj:`angle`.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+        **kwargs: possible additional arguments (none are used)
+
+    Returns:
+        ``np.ndarray``: the score of every point, :math:`-\\infty` for the first and the last one
+    """
     assert len(kwargs) == 0
     assert x.shape == y.shape
-    d_x = np.diff(x)
-    d_y = np.diff(y)
+    d_x, d_y = differences(x, y)
     angles = np.arctan2(d_y, d_x)
-    angle_differences = np.abs(np.diff(angles))
-    max_diff = angle_differences.argmax().item()
-    return max_diff + 1
+    return pad_scores(np.abs(np.diff(angles)))
@@ -4,3 +4,6 @@ import numpy as np
 import numpy.typing as npt
 
 def angle(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any) -> int: ...
+def angle_scores(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any
+) -> npt.NDArray[np.float64]: ...
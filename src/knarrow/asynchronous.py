@@ -0,0 +1,210 @@
+import asyncio
+import contextvars
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .main import find_knee, find_knees
+from .profiling import stage
+from .util import float_dtype
+
+DEFAULT_WINDOW = 0.002  # seconds
+DEFAULT_MAX_BATCH = 256
+
+
+class KneeBatcher:
+    """
+    Find the knees for an asyncio application, coalescing the concurrent requests into batches.
+
+    The knee finding is CPU-bound, so it runs in an executor instead of blocking the event loop. The requests arriving
+    within ``window`` seconds of the first one are collected and the compatible ones (the same method, arguments,
+    number of points and floating point type) are computed together with a single :obj:`knarrow.find_knees` call, which
+    pays the per-call overhead once per batch instead of once per request. Every caller gets its own knee, the same as
+    :obj:`knarrow.find_knee` would return.
+
+    If a batch fails (e.g. one of the curves is invalid), its curves are retried one by one, so only the callers with
+    an invalid curve get the exception. The requests which can't be batched (other shapes of the input, less than four
+    points, ``return_result`` or ``coarse``) are sent to the executor on their own.
+
+    The requests waiting for a batch must come from the same event loop.
+
+    Args:
+        executor (:obj:`concurrent.futures.Executor`, optional): where to run the computation, e.g. a
+            :obj:`concurrent.futures.ProcessPoolExecutor` to use more cores (default: the default executor of the loop)
+        window (``float``): how long to wait for more requests after the first one, in seconds; with 0, only the
+            requests made in the same iteration of the event loop are coalesced (default: 0.002)
+        max_batch (``int``): the largest batch, a full batch is computed without waiting (default: 256)
+
+    Attributes:
+        requests (``int``): the number of the requests so far
+        batches (``int``): the number of the executor calls so far
+    """
+
+    def __init__(self, executor=None, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        assert window >= 0 and max_batch >= 1
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = 0
+        self.batches = 0
+        self._pending = {}
+        self._loop = None
+
+    async def find_knee(self, x, y=None, method="menger_successive", **kwargs):
+        """
+        The asynchronous counterpart of :obj:`knarrow.find_knee`.
+
+        Args:
+            x (``np.ndarray``): the x coordinates of the points, or the y coordinates if ``y`` is not given
+            y (``np.ndarray``, optional): the y coordinates of the points
+            method (``str``): the knee-finding method (default: menger_successive)
+            **kwargs: possible additional arguments for :obj:`knarrow.find_knee`
+
+        Returns:
+            ``int``: the index of the knee
+        """
+        loop = asyncio.get_running_loop()
+        assert not self._pending or self._loop is loop, "The requests waiting for a batch must come from one event loop"
+        self.requests += 1
+        args = (x,) if y is None else (x, y)
+        key = _batch_key(args, method, kwargs)
+        if key is None:
+            self.batches += 1
+            arguments = _in_context(self.executor, _run_single, args, method, kwargs)
+            return await loop.run_in_executor(self.executor, *arguments)
+
+        # the loop is only held while there are pending requests, so a finished loop can be collected
+        self._loop = loop
+        future = loop.create_future()
+        requests = self._pending.get(key)
+        if requests is None:
+            requests = self._pending[key] = []
+            if self.window > 0:
+                loop.call_later(self.window, self._flush, key, requests)
+            else:
+                loop.call_soon(self._flush, key, requests)
+        requests.append((args, future))
+        if len(requests) >= self.max_batch:
+            self._flush(key, requests)
+        return await future
+
+    def _flush(self, key, requests):
+        # the scheduled flush of an already flushed (full) batch does nothing
+        if self._pending.get(key) is not requests:
+            return
+        del self._pending[key]
+        loop = self._loop
+        if not self._pending:
+            self._loop = None
+        self.batches += 1
+        _, method, kwargs = key
+        curves = [args for args, _ in requests]
+        arguments = _in_context(self.executor, _run_batch, curves, method, dict(kwargs))
+        computation = loop.run_in_executor(self.executor, *arguments)
+        computation.add_done_callback(lambda done: _resolve(done, [future for _, future in requests]))
+
+
+def _in_context(executor, *arguments):
+    # the threads see the active profile and the backends of the caller, the context can't be sent to other processes
+    if executor is None or isinstance(executor, ThreadPoolExecutor):
+        return (contextvars.copy_context().run, *arguments)
+    return arguments
+
+
+def _batch_key(args, method, kwargs):
+    # the requests with the same key can be computed with one find_knees call, None if the request can't be batched
+    if kwargs.get("return_result") or kwargs.get("coarse") is not None:
+        return None
+    arrays = [np.asarray(argument) for argument in args]
+    n = arrays[-1].shape[-1] if arrays[-1].ndim == 1 else None
+    if n is None or n < 4 or any(array.shape != (n,) for array in arrays):
+        return None
+    try:
+        kwargs = tuple(sorted(kwargs.items()))
+        hash(kwargs)
+    except TypeError:
+        return None
+    return (len(args), n, float_dtype(*arrays)), method, kwargs
+
+
+def _run_single(args, method, kwargs):
+    return find_knee(*args, method=method, **kwargs)
+
+
+def _run_batch(curves, method, kwargs):
+    """
+    Find the knees of the coalesced requests with one :obj:`knarrow.find_knees` call, or one by one if it fails.
+
+    Returns:
+        ``list`` of ``tuple``: a pair ``(knee, None)`` or ``(None, exception)`` for every request
+    """
+    with stage("async.batch"):
+        try:
+            if len(curves[0]) == 1:
+                knees = find_knees(np.stack([y for y, in curves]), method=method, **kwargs)
+            else:
+                x = curves[0][0]
+                if not all(x_other is x for x_other, _ in curves):
+                    x = np.stack([x_other for x_other, _ in curves])
+                knees = find_knees(x, np.stack([y for _, y in curves]), method=method, **kwargs)
+            return [(knee, None) for knee in knees.tolist()]
+        except (AssertionError, ValueError):
+            # an invalid curve (or argument) fails the whole batch, the curves are retried to find its callers
+            pass
+    results = []
+    for args in curves:
+        try:
+            results.append((_run_single(args, method, kwargs), None))
+        except Exception as error:  # noqa: BLE001, the error is raised in its caller
+            results.append((None, error))
+    return results
+
+
+def _resolve(computation, futures):
+    # pass the knees (or the exceptions) from the executor to the callers which are still waiting
+    if computation.cancelled():
+        for future in futures:
+            future.cancel()
+        return
+    error = computation.exception()
+    results = [(None, error)] * len(futures) if error is not None else computation.result()
+    for future, (knee, error) in zip(futures, results):
+        if future.done():
+            continue
+        if error is None:
+            future.set_result(knee)
+        else:
+            future.set_exception(error)
+
+
+_BATCHERS = weakref.WeakKeyDictionary()
+
+
+async def find_knee_async(x, y=None, method="menger_successive", executor=None, window=DEFAULT_WINDOW, **kwargs):
+    """
+    Find the knee without blocking the event loop, batched together with the concurrent calls.
+
+    A shortcut for :obj:`KneeBatcher.find_knee` with a batcher shared by all the calls in the running event loop with
+    the same ``executor`` and ``window``.
+
+    Args:
+        x (``np.ndarray``): the x coordinates of the points, or the y coordinates if ``y`` is not given
+        y (``np.ndarray``, optional): the y coordinates of the points
+        method (``str``): the knee-finding method (default: menger_successive)
+        executor (:obj:`concurrent.futures.Executor`, optional): where to run the computation (default: the default
+            executor of the loop)
+        window (``float``): how long to wait for more requests to batch, in seconds (default: 0.002)
+        **kwargs: possible additional arguments for :obj:`knarrow.find_knee`
+
+    Returns:
+        ``int``: the index of the knee
+
+    Example:
+        >>> knees = await asyncio.gather(*(find_knee_async(x, y) for y in curves))  # one find_knees call
+    """
+    batchers = _BATCHERS.setdefault(asyncio.get_running_loop(), {})
+    batcher = batchers.get((executor, window))
+    if batcher is None:
+        batcher = batchers[executor, window] = KneeBatcher(executor, window)
+    return await batcher.find_knee(x, y, method=method, **kwargs)
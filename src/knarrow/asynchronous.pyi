@@ -0,0 +1,34 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy.typing as npt
+
+DEFAULT_WINDOW: float
+DEFAULT_MAX_BATCH: int
+
+class KneeBatcher:
+    executor: Optional[Executor]
+    window: float
+    max_batch: int
+    requests: int
+    batches: int
+    _pending: Dict[Any, List[Tuple[Tuple[npt.ArrayLike, ...], asyncio.Future[int]]]]
+    _loop: Optional[asyncio.AbstractEventLoop]
+    def __init__(self, executor: Optional[Executor] = ..., window: float = ..., max_batch: int = ...) -> None: ...
+    async def find_knee(
+        self,
+        x: npt.ArrayLike,
+        y: Optional[npt.ArrayLike] = ...,
+        method: str = ...,
+        **kwargs: Any,
+    ) -> int: ...
+
+async def find_knee_async(
+    x: npt.ArrayLike,
+    y: Optional[npt.ArrayLike] = ...,
+    method: str = ...,
+    executor: Optional[Executor] = ...,
+    window: float = ...,
+    **kwargs: Any,
+) -> int: ...
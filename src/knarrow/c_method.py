@@ -1,6 +1,27 @@
 import numpy as np
 
+from .kernels import as_rows, get_backend, kernel, newton_raphson_fit
+from .util import as_index
+
 TOLERANCE = 1e-5
+MAX_ITERATIONS = 100
+C_BOUNDS = (-50.0, 50.0)
+
+
+def tolerance(dtype):
+    """
+    The :obj:`TOLERANCE` of :obj:`newton_raphson` for the curves of the given floating point type.
+
+    The derivatives of the energy can't be computed more precisely than about the square root of the machine epsilon,
+    so for ``float32`` curves the tolerance is relaxed to that.
+
+    Args:
+        dtype (``np.dtype``): the floating point type of the curves
+
+    Returns:
+        ``float``: the tolerance
+    """
+    return max(TOLERANCE, float(np.sqrt(np.finfo(dtype).eps)))
 
 
 def f(x, c):
@@ -22,7 +43,7 @@ def f(x, c):
 
 def df_dc(x, c):
     """
-    The first derivative of the knee curve :math:`f(x)` with respect to :math:`x`, conditioned on :math:`c`.
+    The first derivative of the knee curve :math:`f(x)` with respect to :math:`c`.
 
     Args:
         x (``np.ndarray``): the :math:`x` coordinates of the points
@@ -33,12 +54,12 @@ def df_dc(x, c):
 
     """
     t = x * np.exp(c)
-    return (x - 1) * t / (t + 1) ** 2
+    return (1 - x) * t / (t + 1) ** 2
 
 
 def d2f_dc2(x, c):
     """
-    The second derivative of the knee curve :math:`f(x)` with respect to :math:`x`, conditioned on :math:`c`.
+    The second derivative of the knee curve :math:`f(x)` with respect to :math:`c`.
 
     Args:
         x (``np.ndarray``): the :math:`x` coordinates of the points
@@ -61,12 +82,12 @@ def de_dc(y, x, c):
     Args:
         y (``np.ndarray``): the ground truth function values we wish to fit the knee curve :math:`f(x)` on
         x (``np.ndarray``): the :math:`x` coordinates of the points
-        c (``float``): the shape parameter
+        c (``np.ndarray``): the shape parameters, shape ``(..., 1)``
 
     Returns:
-        ``np.ndarray``: values of the first derivative of :math:`E(x)` evaluated at :math:`x`
+        ``np.ndarray``: values of the first derivative of :math:`E(x)` evaluated at :math:`x`, shape ``(..., 1)``
     """
-    return np.mean((f(x, c) - y) * df_dc(x, c))
+    return np.mean((f(x, c) - y) * df_dc(x, c), axis=-1, keepdims=True)
 
 
 def d2e_dc2(y, x, c):
@@ -78,36 +99,96 @@ def d2e_dc2(y, x, c):
     Args:
         y (``np.ndarray``): the ground truth function values we wish to fit the knee curve :math:`f(x)` on
         x (``np.ndarray``): the :math:`x` coordinates of the points
-        c (``float``): the shape parameter
+        c (``np.ndarray``): the shape parameters, shape ``(..., 1)``
 
     Returns:
-        ``np.ndarray``: values of the second derivative of :math:`E(x)` evaluated at :math:`x`
+        ``np.ndarray``: values of the second derivative of :math:`E(x)` evaluated at :math:`x`, shape ``(..., 1)``
     """
-    return np.mean(df_dc(x, c) + (f(x, c) - y) * d2f_dc2(x, c))
+    return np.mean(df_dc(x, c) ** 2 + (f(x, c) - y) * d2f_dc2(x, c), axis=-1, keepdims=True)
 
 
-def newton_raphson(x, y):
+def energy_derivatives(y, x, c):
+    """
+    Both derivatives of the energy function :math:`E(x)` with respect to :math:`c`, fused in one pass.
+
+    Equivalent to :obj:`de_dc` and :obj:`d2e_dc2`, but :math:`e^c`, :math:`f(x)` and its derivatives are computed only
+    once and shared between the two. The per-point terms are computed in the floating point type of :math:`x`, only the
+    means are accumulated in ``float64``.
+
+    Args:
+        y (``np.ndarray``): the ground truth function values we wish to fit the knee curve :math:`f(x)` on
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        c (``np.ndarray``): the shape parameters, shape ``(...)``
+
+    Returns:
+        ``tuple`` of ``np.ndarray``: the first and the second derivative of :math:`E(x)`, both of shape ``(...)``
+    """
+    exp_c = np.exp(c).astype(x.dtype, copy=False)[..., np.newaxis]
+    t = x * exp_c
+    inverse = 1 / (t + 1)
+    error = x * (exp_c + 1) * inverse - y
+    first = (1 - x) * t * inverse * inverse
+    second = first * (1 - t) * inverse
+    return (
+        np.mean(error * first, axis=-1, dtype=np.float64),
+        np.mean(first * first + error * second, axis=-1, dtype=np.float64),
+    )
+
+
+def newton_raphson(x, y, c0=3.0, max_iterations=MAX_ITERATIONS):
     """
     The implementation of the `Newton-Raphson <https://en.wikipedia.org/wiki/Newton%27s_method>`_ optimization
     procedure.
     It fits the knee curve :math:`f(x)` to the :math:`y` s of the corresponding :math:`x` s by tweaking the shape
     parameter :math:`c` from an initial guess.
+    Many curves can be fitted at once by stacking them along the leading axes; every curve stops being updated as soon
+    as it converges.
+
+    The iterations are safeguarded: every curve keeps a bracket of :math:`c` known to contain a minimum (the sign of
+    the first derivative tells on which side of the current guess it is), starting from ``C_BOUNDS``. A Newton step
+    which is uphill or leaves the bracket is replaced with a bisection of the bracket, so the procedure cannot diverge,
+    and it stops after at most ``max_iterations`` steps even if the tolerance (see :obj:`tolerance`) was not reached.
+    The shape parameters are always kept in ``float64``.
 
     Args:
         x (``np.ndarray``): the ground truth :math:`x` coordinates
-        y (``np.ndarray``): the ground truth :math:`y` coordinates
+        y (``np.ndarray``): the ground truth :math:`y` coordinates, shape ``(..., len(x))``
+        c0 (``float`` or ``np.ndarray``): the initial guess, e.g. the result of a previous fit on a similar curve. One
+            per curve if there are multiple curves (default: 3.0)
+        max_iterations (``int``): the maximal number of steps (default: ``MAX_ITERATIONS``)
 
     Returns:
-        ``float``: the optimal shape parameter :math:`c` which minimizes the squared error, up to a predefined
-        tolerance level
-
-    """
-    c = 0
-    new_c = 3
-    while abs(new_c - c) > TOLERANCE:
-        c = new_c
-        new_c = c - de_dc(y, x, c) / d2e_dc2(y, x, c)
-    return new_c
+        ``float`` or ``np.ndarray``: the optimal shape parameter :math:`c` which minimizes the squared error, up to a
+        predefined tolerance level. One per curve if there are multiple curves.
+
+    """
+    shape = y.shape[:-1]
+    n = y.shape[-1]
+    y = y.reshape(-1, n)
+    x = x if x.ndim == 1 else np.broadcast_to(x, shape + (n,)).reshape(-1, n)
+    c = np.clip(np.broadcast_to(c0, shape), *C_BOUNDS).astype(np.float64).reshape(-1)
+    low = np.full_like(c, C_BOUNDS[0])
+    high = np.full_like(c, C_BOUNDS[1])
+    active = np.arange(len(c))
+    epsilon = tolerance(y.dtype)
+    if get_backend("c_method") == "numba":
+        kernel(newton_raphson_fit)(*as_rows(x, y), c, low, high, epsilon, max_iterations)
+        return c.reshape(shape)
+    for _ in range(max_iterations):
+        if len(active) == 0:
+            break
+        c_active, low_active, high_active = c[active], low[active], high[active]
+        gradient, curvature = energy_derivatives(y[active], x if x.ndim == 1 else x[active], c_active)
+        # the minimum is to the right of c if the energy is decreasing, to the left if it is increasing
+        low_active = np.where(gradient < 0, c_active, low_active)
+        high_active = np.where(gradient > 0, c_active, high_active)
+        newton = c_active - gradient / np.where(curvature > 0, curvature, 1.0)
+        safe = (curvature > 0) & (low_active < newton) & (newton < high_active)
+        new_c = np.where(safe, newton, (low_active + high_active) / 2)
+        converged = (np.abs(new_c - c_active) <= epsilon) | (high_active - low_active <= epsilon)
+        c[active], low[active], high[active] = new_c, low_active, high_active
+        active = active[~converged]
+    return c.reshape(shape)
 
 
 def get_knee(c):
@@ -133,16 +214,34 @@ def c_method(x, y, **kwargs):
     Args:
         x (``np.ndarray``): the ground truth :math:`x` coordinates
         y (``np.ndarray``): the ground truth :math:`y` coordinates
-        **kwargs:``dict``, optional arguments (should be empty)
+        **kwargs:
+            c0 (``float`` or ``np.ndarray``): the initial guess of the shape parameter (default: 3.0)
+            max_iterations (``int``): the maximal number of Newton-Raphson steps (default: ``MAX_ITERATIONS``)
 
     Returns:
         ``int``: the index of the knee
     """
+    return as_index(np.argmax(c_method_scores(x, y, **kwargs), axis=-1))
+
+
+def c_method_scores(x, y, **kwargs):
+    """
+    The negated distance of every point from the theoretical knee, the scores of :obj:`c_method`.
+
+    Args:
+        x (``np.ndarray``): the ground truth :math:`x` coordinates
+        y (``np.ndarray``): the ground truth :math:`y` coordinates
+        **kwargs: the same optional arguments as for :obj:`c_method`
+
+    Returns:
+        ``np.ndarray``: the score of every point
+    """
+    c0 = kwargs.pop("c0", 3.0)
+    max_iterations = kwargs.pop("max_iterations", MAX_ITERATIONS)
     assert len(kwargs) == 0
-    best_c = newton_raphson(x, y)
+    best_c = newton_raphson(x, y, c0, max_iterations)
     knee = get_knee(best_c)
 
     # the knee is a real number between 0 and 1 which is the best theoretical knee
     # however, that number most likely does not exist in the x array, so the closest is found
-    best_knee = np.argmin(np.abs(x - knee))
-    return best_knee.item()
+    return -np.abs(x - np.expand_dims(knee, -1).astype(x.dtype, copy=False))
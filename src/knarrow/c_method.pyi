@@ -1,7 +1,25 @@
-from typing import Any
+from typing import Any, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
 
+TOLERANCE: float
+MAX_ITERATIONS: int
+C_BOUNDS: Tuple[float, float]
+
+def tolerance(dtype: npt.DTypeLike) -> float: ...
+
+def energy_derivatives(
+    y: npt.NDArray[np.float64], x: npt.NDArray[np.float64], c: npt.NDArray[np.float64]
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: ...
+def newton_raphson(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    c0: Union[float, npt.ArrayLike] = ...,
+    max_iterations: int = ...,
+) -> npt.NDArray[np.float64]: ...
 def get_knee(c: float) -> float: ...
 def c_method(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], method: str, **kwargs: Any) -> int: ...
+def c_method_scores(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any
+) -> npt.NDArray[np.float64]: ...
@@ -3,25 +3,25 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import enum
-from functools import partial
 from pathlib import Path
 import sys
 from typing import List, Optional
 
 try:
     import typer
-    from knarrow import find_knee
-    from knarrow.main import _METHODS
 except ImportError:
     print("Please install 'knarrow[cli]' to use this command.")
     sys.exit(1)
 
+# NumPy and the methods are only imported by the command itself, so the startup, --help and --version stay fast
+from knarrow.cli.formats import InputFormat
+from knarrow.methods import available
 
 from ..__about__ import __version__
 
 
 # Build enum members: ALL + one per method (uppercased)
-_method_members = {"ALL": "all", **{m.upper(): m for m in _METHODS}}
+_method_members = {"ALL": "all", **{m.upper(): m for m in available()}}
 Method = enum.Enum("Method", _method_members, type=str)
 
 
@@ -61,6 +61,16 @@ def main(
         ",",
         help="If the input is 2-dimensional, split the dimensions by this option's value",
     ),
+    input_format: InputFormat = typer.Option(
+        "auto",
+        help="Format of the input: text, a .npy file or raw binary numbers. Auto picks npy for .npy files, else text",
+    ),
+    dtype: str = typer.Option(
+        "float64", help="Type of the numbers in a raw binary input"
+    ),
+    columns: int = typer.Option(
+        1, min=1, max=2, help="Number of columns (y, or x and y) in a raw binary input"
+    ),
     output: Output = typer.Option(
         "value",
         help="Type of output. Value means value itself, index means it's ordinal number",
@@ -75,28 +85,16 @@ def main(
         is_eager=True,
     ),  # version boilerplate
 ):
+    from knarrow import find_knee
+    from knarrow.cli.loading import load
+
     for path in files:
-        file = sys.stdin if str(path) == "-" else path.open("r")
-        with file:
-            rows = list(map(str.strip, file))
-            split = partial(str.split, sep=delimiter)
-            values = map(split, rows)
-            numbers = list(tuple(float(value) for value in row) for row in values)
-            indices = list(range(len(numbers)))
-            if sort:
-                indices.sort(key=lambda i: numbers[i])
-                key_function = (
-                    (lambda x: x) if len(numbers[0]) == 1 else (lambda x: x[0])
-                )
-                numbers.sort(key=key_function)
-
-            if method == Method.ALL:
-                knee = find_knee(numbers, method="all", sort=sort, smoothing=smoothing)
-            else:
-                knee = find_knee(
-                    numbers, method=method.value, sort=sort, smoothing=smoothing
-                )
-
-            result = indices[knee] if output == Output.INDEX else rows[indices[knee]]
-            print(file.name if str(path) == "-" else path.name, result)
+        table = load(path, input_format, delimiter, dtype, columns)
+        # the indices map the (possibly sorted) points back to the rows of the input
+        indices = table.sorted_order() if sort else None
+        points = table.points(indices)
+        knee = find_knee(points, method=method.value, sort=sort, smoothing=smoothing)
+        row = knee if indices is None else indices[knee].item()
+        result = row if output == Output.INDEX else table.value(row, delimiter)
+        print(path.name if str(path) != "-" else "<stdin>", result)
     return
@@ -0,0 +1,12 @@
+# SPDX-FileCopyrightText: 2021-present InCogNiTo124 <msmetko@msmetko.xyz>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import enum
+
+
+class InputFormat(str, enum.Enum):
+    AUTO = "auto"
+    TEXT = "text"
+    NPY = "npy"
+    BINARY = "binary"
@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: 2021-present InCogNiTo124 <msmetko@msmetko.xyz>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import sys
+
+import numpy as np
+
+from .formats import InputFormat
+
+
+class Table:
+    """
+    The numbers read from one input, one point per row.
+
+    Args:
+        data (``np.ndarray``): a 2D array of shape ``(n, 1)`` (just :math:`y`) or ``(n, 2)`` (:math:`x` and :math:`y`)
+        lines (``list``, optional): the original text lines, only for text inputs
+    """
+
+    def __init__(self, data, lines=None):
+        assert data.ndim == 2 and data.shape[1] in (1, 2), "The input must have 1 or 2 columns"
+        self.data = data
+        self.lines = lines
+
+    def sorted_order(self):
+        """
+        The order of the rows sorted by :math:`x`, ties broken by :math:`y`.
+
+        Returns:
+            ``np.ndarray``: the indices of the rows in the sorted order
+        """
+        if self.data.shape[1] == 1:
+            return np.argsort(self.data[:, 0], kind="stable")
+        return np.lexsort((self.data[:, 1], self.data[:, 0]))
+
+    def points(self, order=None):
+        """
+        The points in a shape ready for :obj:`knarrow.find_knee`.
+
+        Args:
+            order (``np.ndarray``, optional): the order of the rows
+
+        Returns:
+            ``np.ndarray``: a 1D array of :math:`y` or a 2D array of shape ``(n, 2)``
+        """
+        data = self.data if order is None else self.data[order]
+        return data[:, 0] if data.shape[1] == 1 else data
+
+    def value(self, index, delimiter):
+        """
+        The row at the given index as text: the original line for text inputs, otherwise the formatted numbers.
+
+        Args:
+            index (``int``): the index of the row
+            delimiter (``str``): separates the numbers of a row which was not read from text
+
+        Returns:
+            ``str``: the row as text
+        """
+        if self.lines is not None:
+            return self.lines[index].strip()
+        return delimiter.join(map(str, self.data[index].tolist()))
+
+
+def resolve_format(path, input_format):
+    """
+    Resolve the ``auto`` format from the file suffix: ``.npy`` files are NumPy arrays, everything else is text.
+
+    Args:
+        path (``pathlib.Path``): the path of the input
+        input_format (``InputFormat``): the requested format
+
+    Returns:
+        ``InputFormat``: the concrete format of the input
+    """
+    if input_format != InputFormat.AUTO:
+        return input_format
+    return InputFormat.NPY if path.suffix == ".npy" else InputFormat.TEXT
+
+
+def load(path, input_format=InputFormat.AUTO, delimiter=",", dtype="float64", columns=1):
+    """
+    Read all the numbers of an input at once into a contiguous array.
+
+    Text is parsed by :obj:`np.loadtxt` in a single vectorized pass. ``.npy`` files and raw binary files are memory
+    mapped, so only the pages which are actually needed are read; stdin (``-``) is read in full since it can't be
+    mapped.
+
+    Args:
+        path (``pathlib.Path``): the path of the input, ``-`` for stdin
+        input_format (``InputFormat``): the format of the input (default: ``auto``)
+        delimiter (``str``): separates the columns of a text input (default: ``,``)
+        dtype (``str``): the type of the numbers in a raw binary input (default: ``float64``)
+        columns (``int``): the number of columns of a raw binary input (default: 1)
+
+    Returns:
+        ``Table``: the numbers and, for text inputs, the original lines
+    """
+    is_stdin = str(path) == "-"
+    input_format = resolve_format(path, input_format)
+    if input_format == InputFormat.TEXT:
+        with sys.stdin if is_stdin else path.open("r") as file:
+            # np.loadtxt skips the blank lines, so they are dropped from the lines as well to keep the rows aligned
+            lines = [line for line in file.read().splitlines() if line.strip()]
+        data = np.loadtxt(lines, delimiter=delimiter, ndmin=2, comments=None)
+        return Table(data, lines)
+
+    if input_format == InputFormat.NPY:
+        data = np.load(io.BytesIO(sys.stdin.buffer.read())) if is_stdin else np.load(path, mmap_mode="r")
+        if data.ndim == 1:
+            data = data[:, np.newaxis]
+        elif data.ndim == 2 and data.shape[0] == 2 and data.shape[1] != 2:
+            data = data.T  # x in the first row, y in the second, the same as for find_knee
+    else:
+        data = np.frombuffer(sys.stdin.buffer.read(), dtype=dtype) if is_stdin else np.memmap(path, dtype, "r")
+        data = data.reshape(-1, columns)
+    return Table(data)
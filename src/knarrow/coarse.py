@@ -0,0 +1,112 @@
+import numpy as np
+
+from .methods import get
+
+
+def lttb(x, y, n_out):
+    """
+    Downsample a curve with the Largest-Triangle-Three-Buckets algorithm.
+
+    The inner points are split into ``n_out - 2`` buckets of (almost) equal size. From every bucket, the point forming
+    the largest triangle with the point selected from the previous bucket and the average point of the next bucket is
+    selected. The first and the last point are always kept, so the shape of the curve (and its knee) is preserved much
+    better than with a simple stride. See https://hdl.handle.net/1946/15343
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+        n_out (``int``): the number of points to keep, at least 3
+
+    Returns:
+        ``np.ndarray``: the sorted indices of the kept points
+    """
+    n = len(x)
+    assert n_out >= 3
+    if n_out >= n:
+        return np.arange(n)
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.intp) + 1  # the starts of the buckets, and n - 1
+    sizes = np.diff(edges)
+    average_x = np.append(np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes, x[-1])
+    average_y = np.append(np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        previous = selected[bucket]
+        next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+        # twice the areas of the triangles
+        d_x, d_y = x[start:end] - x[previous], y[start:end] - y[previous]
+        areas = np.abs((x[previous] - next_x) * d_y + d_x * (next_y - y[previous]))
+        selected[bucket + 1] = start + np.argmax(areas)
+    return selected
+
+
+def coarse_to_fine(method, x, y, coarse, window=2, **kwargs):
+    """
+    Find a knee on a decimated curve, then refine it on the full-resolution points around it.
+
+    The curve is decimated to ``coarse`` points with :obj:`lttb` and the method finds the candidate knee on them. Then
+    all the points between the ``window``-th decimated neighbours on both sides of the candidate are scored at full
+    resolution, together with the few neighbours (or the anchors) each method needs, and the best of them is the knee.
+    The points are already normalized over the whole curve, so a full-resolution score is exactly the same as in the
+    full computation.
+
+    Tolerance guarantee: if the full-resolution knee lies within the refinement window, the result is identical to the
+    full computation. Otherwise, the result is the best point of the window, at most ``window`` decimated points away
+    from the candidate. For ``c_method``, the shape parameter is fitted on the decimated curve and the knee is the
+    closest full-resolution point to its theoretical knee.
+
+    Args:
+        method (``str``): the method, any registered method with a ``locality`` (see :obj:`knarrow.methods.MethodSpec`)
+            or ``c_method``
+        x (``np.ndarray``): the prepared :math:`x` coordinates of the points
+        y (``np.ndarray``): the prepared :math:`y` coordinates of the points
+        coarse (``int``): the number of points of the decimated curve
+        window (``int``): the number of decimated points on each side of the candidate to refine between (default: 2)
+        **kwargs: possible additional arguments for the method
+
+    Returns:
+        ``int``: the index of the knee
+    """
+    locality = None if method == "all" else get(method).locality
+    if locality is None and method != "c_method":
+        raise ValueError(f"The coarse-to-fine mode is not available for {method}, its scores are not local")
+    assert window >= 1
+    scores_function = get(method).load()[1]
+    n = len(x)
+    if n <= coarse:
+        return np.argmax(scores_function(x, y, **kwargs)).item()
+    selected = lttb(x, y, coarse)
+    if method == "c_method":
+        # the method modules are only imported when used
+        from .c_method import get_knee, newton_raphson
+
+        knee = get_knee(newton_raphson(x[selected], y[selected], **kwargs))
+        return _closest(x, knee)
+
+    candidate = np.argmax(scores_function(x[selected], y[selected], **kwargs))
+    low = selected[max(candidate - window, 0)]
+    high = selected[min(candidate + window, coarse - 1)]
+    if locality == "anchored":
+        # the first and the last point can't be scored, the rest of the window is scored together with them
+        low, high = max(low, 1), min(high, n - 2)
+        indices = np.concatenate(([0], np.arange(low, high + 1), [n - 1]))
+        scores = scores_function(x[indices], y[indices], **kwargs)[1:-1]
+    else:
+        # the points without all the neighbours in the slice are scored -inf, but they are either outside of the
+        # window or at the ends of the whole curve, where they are scored -inf in the full computation as well
+        before, after = locality
+        # with multiple scales, the neighbours are up to the largest dilation away instead of one
+        reach = max(kwargs.get("dilations") or (1,))
+        before, after = before + reach - 1, after + reach - 1
+        start, stop = max(low - before, 0), min(high + after + 1, n)
+        scores = scores_function(x[start:stop], y[start:stop], **kwargs)[low - start : high - start + 1]
+    return low + np.argmax(scores).item()
+
+
+def _closest(x, value):
+    # the index of the first point closest to the value in the sorted x, as np.argmin(np.abs(x - value))
+    right = min(int(np.searchsorted(x, value)), len(x) - 1)
+    left = max(right - 1, 0)
+    return left if abs(x[left] - value) <= abs(x[right] - value) else right
@@ -0,0 +1,15 @@
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+def lttb(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], n_out: int) -> npt.NDArray[np.intp]: ...
+def coarse_to_fine(
+    method: str,
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    coarse: int,
+    window: int = ...,
+    **kwargs: Any,
+) -> int: ...
+def _closest(x: npt.NDArray[np.float64], value: float) -> int: ...
@@ -1,6 +1,14 @@
 import numpy as np
 
-from .util import np_windowed, projection_distance
+from .util import (
+    aggregate_scales,
+    as_index,
+    multiscale_views,
+    pad_scores,
+    projection_distance_components,
+    residuals,
+    successive_views,
+)
 
 
 def distance(x, y, **kwargs):
@@ -18,34 +26,80 @@ def distance(x, y, **kwargs):
     Returns:
         ``int``: the index of the knee
     """
+    return as_index(np.argmax(distance_scores(x, y, **kwargs), axis=-1))
+
+
+def distance_scores(x, y, **kwargs):
+    """
+    The distance of every point from the line :math:`y=x`, the scores of :obj:`distance`.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+        **kwargs: possible additional arguments (none are actually used)
+
+    Returns:
+        ``np.ndarray``: the score of every point
+    """
     assert len(kwargs) == 0
     assert x.shape == y.shape
-    distances = abs(y - x)
-    return np.argmax(distances).item()
+    return abs(residuals(x, y))
 
 
-def distance_adjacent(x, y, **kwargs):
+def distance_adjacent(x, y, dilations=None, aggregate="mean", **kwargs):
     """
     Find a knee by finding a point which is most distant from the line going through the neighbouring points.
 
-    This method is quite sensitive to noise, so only use with cubic spline smoothing.
+    This method is quite sensitive to noise, so only use with cubic spline smoothing, or with multiple ``dilations``:
+    then the distance of every point is measured from the lines through the neighbours ``d`` points away for every
+    ``d`` in ``dilations``, and the scales are aggregated into one score. The distance of a knee from the line grows
+    with the scale while the distance of the noise does not, so the larger scales weigh more in the ``mean``.
 
     Note: I developed a (somewhat) fancy linear algebra implementation so this should be quite fast.
 
     Args:
         x (``np.ndarray``): the :math:`x` coordinates of the points
         y (``np.ndarray``): the :math:`y` coordinates of the points
+        dilations (``iterable`` of ``int``, optional): the scales, e.g. ``(1, 2, 4, 8)`` (default: only the adjacent
+            points)
+        aggregate (``str`` or ``callable``): the aggregation of the scales, see :obj:`knarrow.util.aggregate_scales`
+            (default: ``mean``)
         **kwargs: possible additional arguments (none are actually used)
 
     Returns:
         ``int``: the index of the knee
     """
+    return as_index(np.argmax(distance_adjacent_scores(x, y, dilations, aggregate, **kwargs), axis=-1))
+
+
+def distance_adjacent_scores(x, y, dilations=None, aggregate="mean", **kwargs):
+    """
+    The distance of every point from the line through its neighbours, the scores of :obj:`distance_adjacent`.
+
+    For compatibility with the earlier versions, the distance of the point :math:`i + 1` is reported at the index
+    :math:`i` (the first point of the triplet), so the method returns the point right before the most distant one.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+        dilations (``iterable`` of ``int``, optional): the scales (default: only the adjacent points)
+        aggregate (``str`` or ``callable``): the aggregation of the scales (default: ``mean``)
+        **kwargs: possible additional arguments (none are actually used)
+
+    Returns:
+        ``np.ndarray``: the score of every point, :math:`-\\infty` for the first ``max(dilations) - 1`` and the last
+        ``max(dilations) + 1``
+    """
     assert len(kwargs) == 0
-    indices = np_windowed(len(x), 3)
-    x_windowed = x[indices]  # shape = (len(x), 3)
-    y_windowed = y[indices]  # shape = (len(x), 3)
-    points = np.stack((x_windowed, y_windowed), axis=-1)  # shape = (len(x), 3, 2)
-    translated_points = points - points[:, [0], :]  # anchor all the triplets at the origin. The list is important!
-    translated_points = translated_points[..., 1:, :]  # remove the origin po``int``, now shape = (len(x), 2, 2)
-    distances = projection_distance(translated_points)
-    return np.argmax(distances).item()
+    if dilations is None:
+        (x_1, y_1), (x_2, y_2), (x_3, y_3) = successive_views(x, y)
+        reach = 1
+    else:
+        (x_1, y_1), (x_2, y_2), (x_3, y_3) = multiscale_views(x, y, dilations)
+        reach = max(dilations)
+    # anchor all the triplets at the origin, the middle point is projected on the line to the last one
+    middle, last = (x_2 - x_1, y_2 - y_1), (x_3 - x_1, y_3 - y_1)
+    scores = projection_distance_components(middle, last)
+    if dilations is not None:
+        scores = aggregate_scales(scores, aggregate)
+    return pad_scores(scores, before=reach - 1, after=reach + 1)
@@ -1,7 +1,23 @@
-from typing import Any
+from typing import Any, Callable, Iterable, Optional, Union
 
 import numpy as np
 import numpy.typing as npt
 
 def distance(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any) -> int: ...
-def distance_adjacent(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any) -> int: ...
+def distance_adjacent(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    dilations: Optional[Iterable[int]] = ...,
+    aggregate: Union[str, Callable[..., npt.NDArray[np.float64]]] = ...,
+    **kwargs: Any,
+) -> int: ...
+def distance_scores(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any
+) -> npt.NDArray[np.float64]: ...
+def distance_adjacent_scores(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    dilations: Optional[Iterable[int]] = ...,
+    aggregate: Union[str, Callable[..., npt.NDArray[np.float64]]] = ...,
+    **kwargs: Any,
+) -> npt.NDArray[np.float64]: ...
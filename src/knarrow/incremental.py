@@ -0,0 +1,219 @@
+import numpy as np
+
+from .main import find_knee
+from .ols import cumulative_r_squared, r_squared_from_sums
+from .util import KneeType, detect_knee_type
+
+INCREMENTAL_METHODS = ("distance", "ols_swiping")
+CONDITIONING = 1e-6  # the relative spread of a right part under which its fit is computed from the points
+
+
+class IncrementalKneeDetector:
+    """
+    Knee detector for curves which grow one point at a time, e.g. a training loss recorded every few seconds.
+
+    The points are appended with :obj:`append` in the order of strictly increasing :math:`x`, and the knee of all the
+    points so far is available with :obj:`knee` at any time. The answer is the same as
+    ``find_knee(x, y, method=method)`` on the whole history, but the detector keeps a running state instead of
+    preparing the whole history on every query. Only the methods in :obj:`INCREMENTAL_METHODS` have such a state:
+
+    - the points live in preallocated buffers which double when full, so an append is amortized :math:`O(1)`
+    - the extremes of :math:`y` (and therefore the normalization) and the knee type are tracked as the points come
+    - for ``distance``, the upper and the lower convex hull of the points are maintained (amortized :math:`O(1)` per
+      point, Andrew's monotone chain). The normalized distance from the line :math:`y=x` is a linear function of the
+      raw coordinates, so its extremes are always on the hull and are found with a binary search in
+      :math:`O(\\log n)`
+    - for ``ols_swiping``, the cumulative sums of the coordinates are maintained. :math:`R^2` doesn't depend on the
+      scale of the coordinates, so the left fits are read from the sums directly and the right fits from the total
+      sums minus the sums of the left parts. Only the right parts spread much less than the whole curve (see
+      :obj:`CONDITIONING`), where the differences of the sums would cancel, are fitted to the points
+    - the last answer is cached until a new point arrives
+
+    The other methods can't be updated incrementally: the normalization to the unit square changes with every point
+    which extends the range of the coordinates (every point extends the range of :math:`x`), and the angles, the
+    curvatures and the kneedle differences of all the points depend on it nonlinearly. They are rejected rather than
+    answered by re-running them on the whole history, which is just ``find_knee``.
+
+    The hull and the cumulative sums only apply to the increasing concave and the decreasing convex knees; the other
+    two knee types are handled by reversing the :math:`y` coordinates (see :obj:`knarrow.util.prepare`), which pairs
+    the points differently. Those knee types, as well as the additional arguments of the method (e.g.
+    ``smoothing``), are answered with one vectorized pass of the method over the history; the buffers are passed as
+    views with ``sort=False``, the zero-copy path of :obj:`knarrow.util.prepare`.
+
+    Args:
+        method (``str``): one of :obj:`INCREMENTAL_METHODS` (default: ``distance``, the one with the cheapest queries)
+        capacity (``int``): the initial size of the buffers
+        **kwargs: possible additional arguments for the knee-finding method
+    """
+
+    def __init__(self, method="distance", capacity=256, **kwargs):
+        assert method in INCREMENTAL_METHODS, f"The method must be one of {INCREMENTAL_METHODS}"
+        assert capacity > 0
+        self.method = method
+        self.kwargs = kwargs
+        self._n = 0
+        self._points = np.empty((2, capacity))
+        self._y_min = self._y_max = None
+        self._upper_hull = []
+        self._lower_hull = []
+        self._sums = np.empty((5, capacity)) if method == "ols_swiping" else None
+        self._knee = None
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def x(self):
+        """``np.ndarray``: the :math:`x` coordinates of the points so far (read-only view)"""
+        view = self._points[0, : self._n]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def y(self):
+        """``np.ndarray``: the :math:`y` coordinates of the points so far (read-only view)"""
+        view = self._points[1, : self._n]
+        view.flags.writeable = False
+        return view
+
+    def append(self, x, y):
+        """
+        Append a new point to the curve.
+
+        Args:
+            x (``float``): the :math:`x` coordinate of the point, greater than all the previous ones
+            y (``float``): the :math:`y` coordinate of the point
+        """
+        n = self._n
+        assert n == 0 or x > self._points[0, n - 1], "The x coordinates must be strictly increasing"
+        if n == self._points.shape[1]:
+            self._points = self._grow(self._points)
+            if self._sums is not None:
+                self._sums = self._grow(self._sums)
+        self._points[:, n] = x, y
+        point = self._points[:, n]
+        self._y_min = point[1] if n == 0 else min(self._y_min, point[1])
+        self._y_max = point[1] if n == 0 else max(self._y_max, point[1])
+        if self.method == "distance":
+            self._add_to_hull(self._upper_hull, n, 1)
+            self._add_to_hull(self._lower_hull, n, -1)
+        if self._sums is not None:
+            d_x, d_y = point - self._points[:, 0]  # translated so that the first point is the origin, as in ols.py
+            increments = (d_x, d_y, d_x * d_x, d_y * d_y, d_x * d_y)
+            self._sums[:, n] = increments if n == 0 else self._sums[:, n - 1] + increments
+        self._n += 1
+        self._knee = None
+
+    def extend(self, x, y):
+        """
+        Append multiple points to the curve.
+
+        Args:
+            x (``np.ndarray``): the :math:`x` coordinates of the points
+            y (``np.ndarray``): the :math:`y` coordinates of the points
+        """
+        for point_x, point_y in zip(x, y):
+            self.append(point_x, point_y)
+
+    def knee(self):
+        """
+        Find the knee of all the points appended so far.
+
+        Returns:
+            ``int``: the index of the knee
+        """
+        assert self._n > 3, "The curve must have at least 4 points"
+        if self._knee is None:
+            knee_type = self._knee_type()
+            fast_path = not self.kwargs and knee_type in (KneeType.INCREASING_CONCAVE, KneeType.DECREASING_CONVEX)
+            if self.method == "distance" and fast_path:
+                self._knee = self._distance_knee(knee_type)
+            elif self.method == "ols_swiping" and fast_path:
+                self._knee = self._ols_knee()
+            else:
+                self._knee = find_knee(self.x, self.y, method=self.method, sort=False, **self.kwargs)
+        return self._knee
+
+    @staticmethod
+    def _grow(buffer):
+        grown = np.empty((buffer.shape[0], 2 * buffer.shape[1]))
+        grown[:, : buffer.shape[1]] = buffer
+        return grown
+
+    def _normalized(self, index):
+        x, y = self._points[:, index]
+        x_first, x_last = self._points[0, 0], self._points[0, self._n - 1]
+        # the same arithmetic as `normalize`, so that the values are identical
+        return (x - x_first) / (x_last - x_first), (y - self._y_min) / (self._y_max - self._y_min)
+
+    def _knee_type(self):
+        n = self._n
+        y = [self._normalized(index)[1] for index in (0, 1, n - 2, n - 1)]
+        return detect_knee_type(*y)
+
+    def _add_to_hull(self, hull, index, direction):
+        # pops the points which are not making a turn in the right direction (clockwise for the upper hull)
+        x, y = self._points[:, index]
+        while len(hull) >= 2:
+            (x1, y1), (x2, y2) = self._points[:, hull[-2]], self._points[:, hull[-1]]
+            if direction * ((x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)) < 0:
+                break
+            hull.pop()
+        hull.append(index)
+
+    def _hull_argmax(self, hull, alpha, beta):
+        # alpha * y + beta * x is unimodal along the hull, so the binary search finds the first (leftmost) maximum
+        def value(k):
+            x, y = self._points[:, hull[k]]
+            return alpha * y + beta * x
+
+        low, high = 0, len(hull) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if value(middle + 1) > value(middle):
+                low = middle + 1
+            else:
+                high = middle
+        return hull[low]
+
+    def _distance_knee(self, knee_type):
+        # the oriented distance is linear in the raw coordinates: sign * (y - y_min) / y_range - (x - x_0) / x_range
+        sign = -1.0 if knee_type == KneeType.DECREASING_CONVEX else 1.0
+        alpha = sign / (self._y_max - self._y_min)
+        beta = -1.0 / (self._points[0, self._n - 1] - self._points[0, 0])
+        # an upper hull point maximizes the linear function if alpha > 0, otherwise a lower hull point does
+        maximum_hull, minimum_hull = (
+            (self._upper_hull, self._lower_hull) if alpha > 0 else (self._lower_hull, self._upper_hull)
+        )
+        candidates = sorted(
+            (self._hull_argmax(maximum_hull, alpha, beta), self._hull_argmax(minimum_hull, -alpha, -beta))
+        )
+
+        def score(index):
+            x, y = self._normalized(index)
+            y = 1 - y if knee_type == KneeType.DECREASING_CONVEX else y
+            return abs(y - x)
+
+        return max(candidates, key=score)
+
+    def _ols_knee(self):
+        # the left part of the pivot i are the points [0, i], the right part are the points [i, n - 1]
+        n = self._n
+        pivots = np.arange(1, n - 1)
+        left_r2 = r_squared_from_sums(pivots + 1, *self._sums[:, 1 : n - 1])
+        right_sums = self._sums[:, n - 1 : n] - self._sums[:, : n - 2]
+        right_r2 = r_squared_from_sums(n - pivots, *right_sums)
+        # the differences of the sums cancel when a right part is spread much less than the whole curve (its short
+        # tail, or a plateau); the spread only shrinks with the pivot, so those right fits are the last ones, and they
+        # are computed from the points instead, translated to the last point as in `cumulative_r_squared`
+        spread, total_spread = _spread(n - pivots, *right_sums), _spread(n, *self._sums[:, n - 1 : n])
+        tail = np.flatnonzero(np.any(spread < CONDITIONING * total_spread, axis=0))
+        if tail.size > 0:
+            start = tail[0] + 1
+            right_r2[start - 1 :] = cumulative_r_squared(self.x[start:][::-1], self.y[start:][::-1])[:0:-1]
+        return np.argmin(left_r2 + right_r2).item() + 1
+
+
+def _spread(count, sum_x, sum_y, sum_xx, sum_yy, sum_xy):
+    # the scaled variances of the coordinates, as in `r_squared_from_sums`
+    return np.stack((sum_xx - sum_x * sum_x / count, sum_yy - sum_y * sum_y / count))
@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from .util import KneeType
+
+INCREMENTAL_METHODS: Tuple[str, ...]
+CONDITIONING: float
+
+class IncrementalKneeDetector:
+    method: str
+    kwargs: Dict[str, Any]
+    _n: int
+    _points: npt.NDArray[np.float64]
+    _y_min: Optional[float]
+    _y_max: Optional[float]
+    _upper_hull: List[int]
+    _lower_hull: List[int]
+    _sums: Optional[npt.NDArray[np.float64]]
+    _knee: Optional[int]
+    def __init__(self, method: str = ..., capacity: int = ..., **kwargs: Any) -> None: ...
+    def __len__(self) -> int: ...
+    @property
+    def x(self) -> npt.NDArray[np.float64]: ...
+    @property
+    def y(self) -> npt.NDArray[np.float64]: ...
+    def append(self, x: float, y: float) -> None: ...
+    def extend(self, x: npt.ArrayLike, y: npt.ArrayLike) -> None: ...
+    def knee(self) -> int: ...
+    @staticmethod
+    def _grow(buffer: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+    def _normalized(self, index: int) -> Tuple[float, float]: ...
+    def _knee_type(self) -> KneeType: ...
+    def _add_to_hull(self, hull: List[int], index: int, direction: int) -> None: ...
+    def _hull_argmax(self, hull: List[int], alpha: float, beta: float) -> int: ...
+    def _distance_knee(self, knee_type: KneeType) -> int: ...
+    def _ols_knee(self) -> int: ...
+
+def _spread(
+    count: Union[int, npt.NDArray[np.intp]],
+    sum_x: npt.NDArray[np.float64],
+    sum_y: npt.NDArray[np.float64],
+    sum_xx: npt.NDArray[np.float64],
+    sum_yy: npt.NDArray[np.float64],
+    sum_xy: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]: ...
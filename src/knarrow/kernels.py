@@ -0,0 +1,270 @@
+import contextlib
+import contextvars
+import functools
+import importlib.util
+import math
+import threading
+
+import numpy as np
+
+BACKENDS = ("numpy", "numba")
+KERNEL_METHODS = ("c_method", "kneedle", "menger_anchored", "menger_successive")
+KERNEL_STAGES = ("smoothing",)  # the preparation stages with kernels, selected like the methods
+
+_LOCK = threading.Lock()
+_selected = {}  # the method (or None for all the methods) -> the selected backend
+_OVERRIDES = contextvars.ContextVar("knarrow_backends", default=None)  # the selections of `use_backend`, over these
+_compiled = {}
+
+
+@functools.cache
+def numba_available():
+    """
+    Returns:
+        ``bool``: whether Numba is installed, without importing it
+    """
+    return importlib.util.find_spec("numba") is not None
+
+
+def set_backend(backend, method=None):
+    """
+    Select the backend of a method, or the default backend of all the methods.
+
+    The ``numpy`` backend is the reference implementation of every method. The ``numba`` backend runs the compiled
+    kernels of the methods in :obj:`KERNEL_METHODS` (the scans and the iterations where the NumPy overhead dominates),
+    which find the same knees; the scores (``return_result=True``) are always computed with NumPy. The stages in
+    :obj:`KERNEL_STAGES` are selected the same way, e.g. ``smoothing`` runs the banded solver of
+    :obj:`knarrow.util.cubic_spline_smoothing` compiled instead of as a Python loop.
+
+    Args:
+        backend (``str``, optional): one of :obj:`BACKENDS`, or ``None`` to reset the selection
+        method (``str``, optional): the method or the stage; without it, the default of all of them is set, and the
+            selections of the single methods take precedence over it
+    """
+    _check_backend(backend)
+    with _LOCK:
+        if backend is None:
+            _selected.pop(method, None)
+        else:
+            _selected[method] = backend
+
+
+def _check_backend(backend):
+    assert backend is None or backend in BACKENDS, f"The backend must be one of {BACKENDS}"
+    assert backend != "numba" or numba_available(), "The numba backend requires numba (pip install knarrow[jit])"
+
+
+def get_backend(method):
+    """
+    The backend the method runs on: the selected one (see :obj:`set_backend`), otherwise ``numba`` if the method has a
+    kernel and Numba is installed, otherwise ``numpy``.
+
+    Args:
+        method (``str``): the method
+
+    Returns:
+        ``str``: the backend
+    """
+    if method not in KERNEL_METHODS and method not in KERNEL_STAGES:
+        return "numpy"
+    with _LOCK:
+        selected = {**_selected, **(_OVERRIDES.get() or {})}
+    selected = {key: value for key, value in selected.items() if value is not None}  # None resets a selection
+    backend = selected.get(method, selected.get(None))
+    if backend is None:
+        backend = "numba" if numba_available() else "numpy"
+    return backend
+
+
+@contextlib.contextmanager
+def use_backend(backend, method=None):
+    """
+    :obj:`set_backend` within a ``with`` block, the selections outside of it are back on exit.
+
+    The selection is bound to the current :obj:`contextvars.Context` rather than set for the whole process, so the
+    blocks in other threads (or tasks) don't see it and can't restore each other's backends. The functions run in a
+    copy of the context (:obj:`contextvars.copy_context`), like the methods in the threads of
+    :obj:`knarrow.main.ensemble` and :obj:`knarrow.asynchronous`, keep it.
+
+    Args:
+        backend (``str``, optional): one of :obj:`BACKENDS`, or ``None`` for the automatic selection
+        method (``str``, optional): the method (default: all the methods)
+    """
+    _check_backend(backend)
+    token = _OVERRIDES.set({**(_OVERRIDES.get() or {}), method: backend})
+    try:
+        yield
+    finally:
+        _OVERRIDES.reset(token)
+
+
+def kernel(function):
+    """
+    The compiled version of a kernel of this module, compiled on the first use.
+
+    Args:
+        function (``callable``): the kernel
+
+    Returns:
+        ``callable``: the compiled kernel
+    """
+    with _LOCK:
+        if function not in _compiled:
+            _compiled[function] = _compile(function)
+        return _compiled[function]
+
+
+def _compile(function):
+    import numba
+
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+def as_rows(x, y):
+    # the curves as rows of a 2-D array; a shared x is broadcast without a copy
+    n = y.shape[-1]
+    return np.broadcast_to(x, y.shape).reshape(-1, n), y.reshape(-1, n)
+
+
+# The kernels are written for Numba: plain loops over the points, every curve is a row of the inputs and the results
+# are written into `out`. They perform the same floating point operations in the same order as the NumPy reference,
+# so they find the same knees; only the sums of c_method are accumulated sequentially instead of pairwise. The
+# literals which meet the points are passed in their floating point type, as Numba would otherwise promote the float32
+# arithmetic to float64.
+
+
+def kneedle_knees(y_d, offset, online, out):
+    """
+    The knees of :obj:`knarrow.kneedle.kneedle` in a single scan of every row of the differences ``y_d``, with the
+    threshold ``offset`` below the local maxima.
+    """
+    n = y_d.shape[1]
+    for row in range(y_d.shape[0]):
+        previous_maximum, first_maximum, maxima, knee = -1, -1, 0, -1
+        for i in range(n):
+            # the points are compared only to the last local maximum strictly before them
+            below = previous_maximum >= 0 and y_d[row, i] < y_d[row, previous_maximum] - offset
+            if below and (knee < 0 or online):
+                knee = previous_maximum + 1
+            if 0 < i < n - 1 and y_d[row, i] > y_d[row, i - 1] and y_d[row, i] > y_d[row, i + 1]:
+                previous_maximum = i
+                maxima += 1
+                if maxima == 1:
+                    first_maximum = i
+        if maxima == 1:
+            knee = first_maximum
+        elif knee < 0:
+            # np.argmax of the differences, the first nan wins
+            knee = 0
+            for i in range(n):
+                if math.isnan(y_d[row, i]):
+                    knee = i
+                    break
+                if y_d[row, i] > y_d[row, knee]:
+                    knee = i
+        out[row] = knee
+
+
+def newton_raphson_fit(x, y, c, low, high, epsilon, max_iterations):
+    """
+    The safeguarded Newton-Raphson iterations of :obj:`knarrow.c_method.newton_raphson`, the shape parameters ``c``
+    and their brackets ``low`` and ``high`` are updated in place, one row at a time.
+    """
+    n = y.shape[1]
+    for row in range(y.shape[0]):
+        for _ in range(max_iterations):
+            exp_c = math.exp(c[row])
+            gradient, curvature = 0.0, 0.0
+            for i in range(n):
+                t = x[row, i] * exp_c
+                inverse = 1.0 / (t + 1.0)
+                error = x[row, i] * (exp_c + 1.0) * inverse - y[row, i]
+                first = (1.0 - x[row, i]) * t * inverse * inverse
+                second = first * (1.0 - t) * inverse
+                gradient += error * first
+                curvature += first * first + error * second
+            gradient /= n
+            curvature /= n
+            if gradient < 0:
+                low[row] = c[row]
+            elif gradient > 0:
+                high[row] = c[row]
+            newton = c[row] - gradient / (curvature if curvature > 0 else 1.0)
+            if curvature > 0 and low[row] < newton < high[row]:
+                new_c = newton
+            else:
+                new_c = (low[row] + high[row]) / 2
+            converged = abs(new_c - c[row]) <= epsilon or high[row] - low[row] <= epsilon
+            c[row] = new_c
+            if converged:
+                break
+
+
+def menger_knees(x, y, anchored, four, out):
+    """
+    The knees of :obj:`knarrow.menger.menger_successive` (or with ``anchored``, :obj:`knarrow.menger.menger_anchored`):
+    the curvature of every point is computed as in :obj:`knarrow.menger.get_curvature_components` and only the best
+    one is kept.
+    """
+    n = y.shape[1]
+    for row in range(y.shape[0]):
+        knee, best = 0, -np.inf
+        for i in range(1, n - 1):
+            first, third = (0, n - 1) if anchored else (i - 1, i + 1)
+            e_x, e_y = x[row, i] - x[row, first], y[row, i] - y[row, first]
+            g_x, g_y = x[row, third] - x[row, i], y[row, third] - y[row, i]
+            f_x, f_y = x[row, third] - x[row, first], y[row, third] - y[row, first]
+            lengths = (e_x * e_x + e_y * e_y) * (g_x * g_x + g_y * g_y) * (f_x * f_x + f_y * f_y)
+            area = abs(e_x * f_y - f_x * e_y)
+            if lengths != 0:
+                value = np.sqrt(four * area * area / lengths)
+            else:
+                # a zero-length edge, as with the floating point division
+                value = np.nan if area == 0 else np.inf
+            if math.isnan(value):
+                # the first nan is the knee, as with np.argmax
+                knee = i
+                break
+            if value > best:
+                knee, best = i, value
+        out[row] = knee
+
+
+def pentadiagonal_factors(d0, d1, d2, d, l1, l2):
+    """
+    The :math:`LDL^T` factorization of :obj:`knarrow.util.factorize_pentadiagonal`, the diagonal of :math:`D` and the
+    subdiagonals of :math:`L` are written into ``d``, ``l1`` and ``l2``.
+    """
+    m = d0.shape[0]
+    for i in range(m):
+        pivot = d0[i]
+        if i >= 1:
+            pivot -= l1[i - 1] * l1[i - 1] * d[i - 1]
+        if i >= 2:
+            pivot -= l2[i - 2] * l2[i - 2] * d[i - 2]
+        d[i] = pivot
+        if i < m - 1:
+            off_diagonal = d1[i]
+            if i >= 1:
+                off_diagonal -= l2[i - 1] * l1[i - 1] * d[i - 1]
+            l1[i] = off_diagonal / pivot
+        if i < m - 2:
+            l2[i] = d2[i] / pivot
+
+
+def pentadiagonal_substitution(d, l1, l2, z):
+    """
+    The forward and back substitution of :obj:`knarrow.util.solve_pentadiagonal`, in place on every row of ``z``.
+    """
+    m = d.shape[0]
+    for row in range(z.shape[0]):
+        for i in range(1, m):
+            z[row, i] -= l1[i - 1] * z[row, i - 1]
+            if i >= 2:
+                z[row, i] -= l2[i - 2] * z[row, i - 2]
+        for i in range(m):
+            z[row, i] /= d[i]
+        for i in range(m - 2, -1, -1):
+            z[row, i] -= l1[i] * z[row, i + 1]
+            if i < m - 2:
+                z[row, i] -= l2[i] * z[row, i + 2]
@@ -0,0 +1,49 @@
+from typing import Any, Callable, ContextManager, Optional, Tuple, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+BACKENDS: Tuple[str, ...]
+KERNEL_METHODS: Tuple[str, ...]
+KERNEL_STAGES: Tuple[str, ...]
+
+def numba_available() -> bool: ...
+def set_backend(backend: Optional[str], method: Optional[str] = ...) -> None: ...
+def get_backend(method: str) -> str: ...
+def use_backend(backend: Optional[str], method: Optional[str] = ...) -> ContextManager[None]: ...
+def kernel(function: _F) -> _F: ...
+def as_rows(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: ...
+def kneedle_knees(
+    y_d: npt.NDArray[np.float64], offset: np.floating[Any], online: bool, out: npt.NDArray[np.intp]
+) -> None: ...
+def newton_raphson_fit(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    c: npt.NDArray[np.float64],
+    low: npt.NDArray[np.float64],
+    high: npt.NDArray[np.float64],
+    epsilon: float,
+    max_iterations: int,
+) -> None: ...
+def menger_knees(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    anchored: bool,
+    four: np.floating[Any],
+    out: npt.NDArray[np.intp],
+) -> None: ...
+def pentadiagonal_factors(
+    d0: npt.NDArray[np.float64],
+    d1: npt.NDArray[np.float64],
+    d2: npt.NDArray[np.float64],
+    d: npt.NDArray[np.float64],
+    l1: npt.NDArray[np.float64],
+    l2: npt.NDArray[np.float64],
+) -> None: ...
+def pentadiagonal_substitution(
+    d: npt.NDArray[np.float64], l1: npt.NDArray[np.float64], l2: npt.NDArray[np.float64], z: npt.NDArray[np.float64]
+) -> None: ...
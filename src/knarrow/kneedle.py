@@ -1,52 +1,111 @@
 import numpy as np
 
+from .kernels import as_rows, get_backend, kernel, kneedle_knees
+from .util import as_index, residuals
+
 
 def kneedle(x, y, **kwargs):
     """
     Kneedle method from https://doi.org/10.1109/ICDCSW.2011.20
 
+    The thresholds are checked in a single linear scan: every point is compared only to the threshold of the last
+    local maximum before it, so the memory is :math:`O(n)` no matter how noisy the curve is.
+
     Args:
         x (``np.ndarray``): the :math:`x` coordinates of the points
         y (``np.ndarray``):  the :math:`y` coordinates of the points
         **kwargs:
+            S (``float``): the sensitivity, i.e. how far below a local maximum the curve must drop (default: 1.0)
+            online (``bool``): if ``True``, return the last confirmed knee instead of the first one, as in the online
+                mode from the paper, where a later knee replaces the earlier ones (default: ``False``)
 
     Returns:
         ``int``: the index of the knee
     """
-    n = len(x)
-    s = kwargs.get("S", 1.0)
+    s = kwargs.pop("S", 1.0)
+    online = kwargs.pop("online", False)
+    assert len(kwargs) == 0
+    n = y.shape[-1]
+    if get_backend("kneedle") == "numba":
+        y_d = residuals(x, y)
+        knees = np.empty(y_d.shape[:-1], dtype=np.intp)
+        # the threshold offset in the type the reference computes it in
+        offset = np.result_type(y_d, s / (n - 1)).type(s / (n - 1))
+        kernel(kneedle_knees)(as_rows(x, y_d)[1], offset, online, knees.reshape(-1))
+        return as_index(knees)
+    y_d, is_maximum, previous_maximum, below_threshold = _scan(x, y, s)
+    if online:
+        confirming = n - 1 - np.argmax(below_threshold[..., ::-1], axis=-1)
+    else:
+        confirming = np.argmax(below_threshold, axis=-1)
+    knee = np.take_along_axis(previous_maximum, confirming[..., np.newaxis], axis=-1)[..., 0] + 1
+
+    # without any knee, fall back to the point furthest from the line y=x
+    knee = np.where(below_threshold.any(axis=-1), knee, np.argmax(y_d, axis=-1))
+    # a single local maximum is the knee regardless of the threshold
+    knee = np.where(is_maximum.sum(axis=-1) == 1, np.argmax(is_maximum, axis=-1), knee)
+    return as_index(knee)
+
+
+def kneedle_scores(x, y, **kwargs):
+    """
+    The scores of :obj:`kneedle`: the height of every confirmed local maximum of :math:`y-x`.
+
+    The score is placed on the point which :obj:`kneedle` would report for that maximum; all the other points score
+    :math:`-\\infty`. The knee is the first (or with ``online=True``, the last) scored point, not necessarily the
+    highest one.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``):  the :math:`y` coordinates of the points
+        **kwargs: the same optional arguments as for :obj:`kneedle`
+
+    Returns:
+        ``np.ndarray``: the score of every point
+    """
+    s = kwargs.pop("S", 1.0)
+    kwargs.pop("online", False)
+    assert len(kwargs) == 0
+    y_d, is_maximum, previous_maximum, below_threshold = _scan(x, y, s)
+    # every point below the threshold confirms the local maximum before it
+    confirmed = np.zeros(y_d.shape, dtype=bool)
+    below_indices = np.nonzero(below_threshold)
+    confirmed[below_indices[:-1] + (previous_maximum[below_indices],)] = True
+    scores = np.full(y_d.shape, -np.inf, dtype=y_d.dtype)
+    scores[..., 1:] = np.where(confirmed[..., :-1], y_d[..., :-1], -np.inf)
+
+    # the same special cases as in `kneedle`, with the only reported point scored
+    fallback = np.where(is_maximum.sum(axis=-1) == 1, np.argmax(is_maximum, axis=-1), np.argmax(y_d, axis=-1))
+    fallback = fallback[..., np.newaxis]
+    special = (is_maximum.sum(axis=-1) == 1) | ~below_threshold.any(axis=-1)
+    fallback_scores = np.full(y_d.shape, -np.inf, dtype=y_d.dtype)
+    np.put_along_axis(fallback_scores, fallback, np.take_along_axis(y_d, fallback, axis=-1), axis=-1)
+    return np.where(special[..., np.newaxis], fallback_scores, scores)
+
+
+def _scan(x, y, s):
+    n = y.shape[-1]
     # Steps 1 and 2 from the paper are already performed
     # Step 3
-    y_d = y - x
+    y_d = residuals(x, y)
 
     # Step 4
-    local_maxima_indices = ((y_d[1:-1] > y_d[:-2]) & (y_d[1:-1] > y_d[2:])).nonzero()[0] + 1  # len() >= 2
-    if len(local_maxima_indices) == 1:
-        return local_maxima_indices[0].item()
-    x_lmx = x[local_maxima_indices]
-    y_lmx = y_d[local_maxima_indices]
-    # print(local_maxima_indices)
+    is_maximum = np.zeros(y_d.shape, dtype=bool)
+    is_maximum[..., 1:-1] = (y_d[..., 1:-1] > y_d[..., :-2]) & (y_d[..., 1:-1] > y_d[..., 2:])
+    # the index of the last local maximum strictly before every point, or -1 if there is none
+    previous_maximum = np.full(y_d.shape, -1)
+    previous_maximum[..., 1:] = np.maximum.accumulate(np.where(is_maximum, np.arange(n), -1), axis=-1)[..., :-1]
 
     # Step 5
     # The original paper states the following equation:
     # $\sum_{i=1}^{n-1}{\left(x_{sn_{i+1}}-x_{sn_i}\right)}$
     # where $x_sn$ is a vector of numbers scaled so that $min(x_sn) = 0$ and $max(x_sn) = 1$
     # If you **really** think about that, that sum will _always_ equal to 1
-    t = y_lmx - s / (n - 1)
+    threshold = np.take_along_axis(y_d, np.maximum(previous_maximum, 0), axis=-1) - s / (n - 1)
 
     # Step 6
-    # Fancy numpy tricks:
-    # 1. broadcasting to build (threshold x values) bool matrix denoting when the y_d value drops below the threshold
-    # 2. clever use of np.argpartition to get the indices of the earliest True per row
-    below_threshold_mask = x_lmx[:, np.newaxis] < x  # shape == (len(x_lmx), n)
-    below_threshold_mask &= t[:, np.newaxis] > y_d
-    # print(below_threshold_mask)
-    under_threshold_ix = np.argpartition(~below_threshold_mask, 0)[:, 0]
-
-    # filter the local maxima
-    local_maxima_indices_augmented = np.append(local_maxima_indices, n)
-    maxima_mask = (local_maxima_indices_augmented[:-1] < under_threshold_ix) & (
-        under_threshold_ix < local_maxima_indices_augmented[1:]
-    )
-    final_maxima = local_maxima_indices[maxima_mask]
-    return final_maxima[0].item() + 1
+    # A local maximum is a knee if the curve drops below its threshold before the next local maximum. The points
+    # between two local maxima are only compared to the threshold of the first one, so the first point below its
+    # threshold confirms the first knee and the last such point confirms the last knee.
+    below_threshold = (previous_maximum >= 0) & (y_d < threshold)
+    return y_d, is_maximum, previous_maximum, below_threshold
@@ -1,6 +1,12 @@
-from typing import Any
+from typing import Any, Tuple
 
 import numpy as np
 import numpy.typing as npt
 
 def kneedle(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any) -> int: ...
+def kneedle_scores(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any
+) -> npt.NDArray[np.float64]: ...
+def _scan(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], s: float
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.bool_], npt.NDArray[np.intp], npt.NDArray[np.bool_]]: ...
@@ -1,47 +1,105 @@
-from collections import Counter
-
-from .angle_method import angle  # noqa
-from .c_method import c_method  # noqa
-from .distance_method import distance, distance_adjacent  # noqa
-from .kneedle import kneedle  # noqa
-from .menger import menger_anchored, menger_successive  # noqa
-from .ols import ols_swiping  # noqa
-from .util import prepare
-
-_METHODS = [
-    "angle",
-    "c_method",
-    "distance",
-    "distance_adjacent",
-    "kneedle",
-    "menger_anchored",
-    "menger_successive",
-    "ols_swiping",
-]
+import contextvars
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from .coarse import coarse_to_fine
+from .methods import available, get
+from .profiling import stage
+from .result import KneeResult
+from .util import (
+    as_index,
+    prepare,
+    prepare_batch,
+    prepare_segments,
+    shared_intermediates,
+)
+
+
+def __getattr__(name):
+    if name == "_METHODS":
+        message = "knarrow.main._METHODS is deprecated, use knarrow.methods.available()"
+        warnings.warn(message, DeprecationWarning, stacklevel=2)
+        return available()
+    # the method modules are imported on the first use, the methods stay available as e.g. knarrow.main.angle_scores
+    method = name.removesuffix("_scores")
+    if method in available():
+        return get(method).load()[name != method]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class EnsembleResult(NamedTuple):
+    """
+    The result of running multiple knee-finding methods on the same curve (or curves).
+
+    Attributes:
+        knee (``int`` or ``np.ndarray``): the most-voted knee index
+        votes (``dict``): the knee index found by every method, keyed by the method name
+    """
+
+    knee: object
+    votes: dict
+
+    def map_indices(self, function):
+        return EnsembleResult(function(self.knee), {method: function(knee) for method, knee in self.votes.items()})
 
 
 @prepare
-def find_knee(x, y, method="menger_successive", **kwargs):
+def find_knee(x, y, method="menger_successive", return_result=False, coarse=None, coarse_window=2, **kwargs):
     """
     Public method for finding the knee
 
     Args:
         x (``np.ndarray``): the x coordinates of the points
         y (``np.ndarray``): the y coordinates of the points
-        method: `str`, denotes the method to be used (default: menger_successive)
+        method: `str`, denotes the method to be used, any of :obj:`knarrow.methods.available` or ``all``
+                (default: menger_successive)
+        return_result (``bool``): return a :obj:`KneeResult` with the scores of all the points instead of just the index
+        coarse (``int``): if given, find the knee on the curve decimated to this many points first and then refine it
+                          on the full-resolution points around it, see :obj:`knarrow.coarse.coarse_to_fine`. Only for
+                          the methods with local scores and ``c_method`` (default: no decimation)
+        coarse_window (``int``): the number of decimated points on each side of the candidate knee to refine between
+                                 (default: 2)
         **kwargs: possible additional arguments for the knee-finding method
 
-    Returns (``int``): the index of the knee
+    Returns (``int`` or :obj:`KneeResult`): the index of the knee
     """
-    assert method in _METHODS + ["all"]
+    assert method in available() + ["all"]
+    if coarse is not None:
+        assert not return_result, "The coarse-to-fine mode doesn't compute the scores of all the points"
+        with stage(f"method.{method}"):
+            return coarse_to_fine(method, x, y, coarse, coarse_window, **kwargs)
+    if return_result:
+        return _run_result(method, x, y, **kwargs)
     if method == "all":
-        return all(x, y, **kwargs)
-    function = globals()[method]
-    return function(x, y, **kwargs)
+        return _run_ensemble(x, y, **kwargs).knee  # the data is already prepared
+    return _run_method(method, x, y, **kwargs)
+
+
+def find_top_knees(*args, k=3, min_separation=1, method="menger_successive", **kwargs):
+    """
+    Find up to ``k`` knees of a curve with several knees, from a single scoring pass.
+
+    A shortcut for ``find_knee(*args, method=method, return_result=True, **kwargs).top_k(k, min_separation)``, see
+    :obj:`KneeResult.top_k`. Meant for the methods which score every point (``menger_*``, ``distance*``, ``angle``);
+    for ``kneedle``, the knees are the confirmed local maxima ranked by their height.
+
+    Args:
+        *args: the points, in any of the formats accepted by :obj:`find_knee`
+        k (``int``): the maximal number of knees (default: 3)
+        min_separation (``int``): the minimal distance between two knees, in indices (default: 1)
+        method: `str`, denotes the method to be used (default: menger_successive)
+        **kwargs: possible additional arguments for :obj:`find_knee` and the knee-finding method
+
+    Returns (``np.ndarray``): the indices of the knees, the best first
+    """
+    return find_knee(*args, method=method, return_result=True, **kwargs).top_k(k, min_separation)
 
 
 @prepare
-def all(x, y, **kwargs):
+def all(x, y, methods=None, max_complexity=None, **kwargs):
     """
     Find the knee by running all available methods and returning the most-voted result.
 
@@ -51,12 +109,211 @@ def all(x, y, **kwargs):
     Args:
         x (``np.ndarray``): the x coordinates of the points
         y (``np.ndarray``): the y coordinates of the points
-        **kwargs: additional arguments forwarded to every individual method
+        methods (``list`` of ``str``): the methods to run (default: all the available methods)
+        max_complexity (:obj:`knarrow.methods.Complexity`): skip the methods of a more expensive complexity class
+        **kwargs: additional arguments forwarded to the methods which accept them
 
     Returns (``int``): the index of the knee
     """
-    votes = Counter(
-        globals()[m](x, y, **kwargs)
-        for m in _METHODS
-    )
-    return votes.most_common(1)[0][0]
+    return _run_ensemble(x, y, methods=methods, max_complexity=max_complexity, **kwargs).knee
+
+
+@prepare
+def ensemble(x, y, methods=None, workers=None, max_complexity=None, **kwargs):
+    """
+    Run multiple knee-finding methods on the same curve and return both the most-voted knee and every method's answer.
+
+    The input is prepared only once, and the intermediate arrays needed by more than one method (the differences,
+    the windows of points, the :math:`y-x` residuals) are computed only once and shared. The methods are independent,
+    so they can run concurrently in a thread pool; NumPy releases the GIL in most of the heavy lifting.
+
+    Args:
+        x (``np.ndarray``): the x coordinates of the points
+        y (``np.ndarray``): the y coordinates of the points
+        methods (``list`` of ``str``): the methods to run (default: all the available methods)
+        workers (``int``): the number of threads to run the methods in (default: run sequentially)
+        max_complexity (:obj:`knarrow.methods.Complexity`): skip the methods of a more expensive complexity class
+        **kwargs: additional arguments forwarded to the methods which accept them
+
+    Returns (:obj:`EnsembleResult`): the most-voted knee and the knee found by every method
+    """
+    return _run_ensemble(x, y, methods=methods, workers=workers, max_complexity=max_complexity, **kwargs)
+
+
+def find_knees(*args, workers=None, **kwargs):
+    """
+    Public method for finding the knees of many curves at once
+
+    All the curves are processed together with vectorized operations along the leading (batch) axis, which avoids the
+    per-call overhead of :obj:`find_knee` when there are many short curves. With ``workers``, the curves are split
+    across a pool of processes instead, see :obj:`knarrow.parallel.find_knees_parallel`.
+
+    Args:
+        x (``np.ndarray``): the x coordinates of the points, either shared by all the curves with shape
+                            ``(n_points,)`` or one row per curve with shape ``(n_curves, n_points)``
+        y (``np.ndarray``): the y coordinates of the points, shape ``(n_curves, n_points)``
+        method: `str`, denotes the method to be used (default: menger_successive)
+        return_result (``bool``): return a :obj:`KneeResult` with the scores of all the points instead of just the
+                                  indices
+        workers (``int``): the number of processes to split the curves across (default: compute in this process)
+        **kwargs: possible additional arguments for the knee-finding method
+
+    Returns (``np.ndarray`` or :obj:`KneeResult`): the indices of the knees, one per curve
+    """
+    if workers is None or workers <= 1:
+        return _find_knees(*args, **kwargs)
+    assert not kwargs.get("return_result"), "The scores are not collected from the worker processes"
+    from .parallel import find_knees_parallel
+
+    return find_knees_parallel(*args, workers=workers, **kwargs)[0]
+
+
+@prepare_batch
+def _find_knees(x, y, method="menger_successive", return_result=False, **kwargs):
+    # the knees of the already prepared curves, see `find_knees`
+    assert method in available() + ["all"]
+    if return_result:
+        return _run_result(method, x, y, **kwargs)
+    if method == "all":
+        return _run_ensemble(x, y, **kwargs).knee
+    return _run_method(method, x, y, **kwargs)
+
+
+@prepare_segments
+def find_knees_grouped(x, y, offsets, method="menger_successive", **kwargs):
+    """
+    Public method for finding the knees of many curves of different lengths, stored one after another in flat arrays
+
+    Meant for the columnar data, e.g. a table with one row per point, grouped by the curve: instead of a Python loop
+    over the groups, the flat columns are prepared with :obj:`knarrow.util.prepare_segments` and the curves of the same
+    length are passed to the method together, as in :obj:`find_knees`. The knees are the same as :obj:`find_knee` finds
+    for every curve on its own.
+
+    Args:
+        x (``np.ndarray``): the x coordinates of the points of all the curves, any buffer-protocol array
+        y (``np.ndarray``): the y coordinates of the points of all the curves
+        offsets (``np.ndarray``): the offsets of the curves, the i-th curve is ``x[offsets[i]:offsets[i + 1]]``
+        method: `str`, denotes the method to be used (default: menger_successive)
+        **kwargs: possible additional arguments for the knee-finding method
+
+    Returns (``np.ndarray``): the indices of the knees, one per curve, relative to the start of the (sorted) curve
+
+    Example:
+        >>> find_knees_grouped(table["x"], table["y"], table_offsets)  # e.g. the offsets of a pyarrow ListArray
+    """
+    assert method in available() + ["all"]
+    lengths = np.diff(offsets)
+    knees = np.empty(len(lengths), dtype=np.intp)
+    # the curves of the same length are one batch; if all the curves are of the same length, the batch is a view
+    for length in np.unique(lengths).tolist():
+        curves = np.flatnonzero(lengths == length)
+        if len(curves) == len(lengths):
+            x_batch, y_batch = x.reshape(-1, length), y.reshape(-1, length)
+        else:
+            indices = offsets[curves, np.newaxis] + np.arange(length)
+            x_batch, y_batch = x[indices], y[indices]
+        if method == "all":
+            knees[curves] = _run_ensemble(x_batch, y_batch, **kwargs).knee
+        else:
+            knees[curves] = _run_method(method, x_batch, y_batch, **kwargs)
+    return knees
+
+
+def _run_method(method, x, y, **kwargs):
+    """
+    Run a single method on the already prepared curve (or curves), measured as the ``method.<name>`` profiling stage.
+    """
+    spec = get(method)
+    with stage(f"method.{method}"):
+        return _call(spec, spec.load()[0], x, y, **kwargs)
+
+
+def _run_result(method, x, y, **kwargs):
+    """
+    Run a single method (or the vote of all of them) on the already prepared curve (or curves), keeping the scores.
+
+    The scores of a method are computed only once and the knee is their argmax. The exception are the methods which
+    don't pick the best-scored point (like ``kneedle``), their scores are only computed if they are accessed. For
+    ``all``, the score of a point is the number of methods which voted for it.
+    """
+    if method == "all":
+        result = _run_ensemble(x, y, **kwargs)
+        return KneeResult(result.knee, lambda: _count_votes(np.stack(list(result.votes.values())), x.shape[-1]))
+    spec = get(method)
+    scores_function = spec.load()[1]
+    if scores_function is None:
+        raise ValueError(f"The method {method} doesn't provide the scores of the points")
+    if not spec.best_scored:
+        return KneeResult(_run_method(method, x, y, **kwargs), lambda: _call(spec, scores_function, x, y, **kwargs))
+    with stage(f"method.{method}"):
+        scores = _call(spec, scores_function, x, y, **kwargs)
+    return KneeResult(as_index(np.argmax(scores, axis=-1)), scores)
+
+
+def _call(spec, function, x, y, **kwargs):
+    # the methods without the batch capability are called curve by curve
+    if spec.batch or y.ndim == 1:
+        return function(x, y, **kwargs)
+    rows = zip(np.broadcast_to(x, y.shape).reshape(-1, y.shape[-1]), y.reshape(-1, y.shape[-1]))
+    results = [function(x_row, y_row, **kwargs) for x_row, y_row in rows]
+    return np.reshape(results, y.shape[:-1] + np.shape(results[0]))
+
+
+def _count_votes(votes, n):
+    # votes has the shape (n_methods, ...), the counts (..., n)
+    return np.sum(votes[..., np.newaxis] == np.arange(n), axis=0).astype(float)
+
+
+def _run_ensemble(x, y, methods=None, workers=None, max_complexity=None, **kwargs):
+    """
+    Run the methods on the already prepared curve (or curves) and count the votes.
+
+    Args:
+        x (``np.ndarray``): the x coordinates of the points
+        y (``np.ndarray``): the y coordinates of the points
+        methods (``list`` of ``str``): the methods to run (default: all the available methods)
+        workers (``int``): the number of threads to run the methods in (default: run sequentially)
+        max_complexity (:obj:`knarrow.methods.Complexity`): skip the methods of a more expensive complexity class
+        **kwargs: additional arguments, every method gets those it declares (see :obj:`knarrow.methods.MethodSpec`)
+
+    Returns (:obj:`EnsembleResult`): the most-voted knee and the knee found by every method
+    """
+    candidates = available(max_complexity=max_complexity)
+    assert methods is None or set(methods) <= set(available())
+    methods = candidates if methods is None else [method for method in methods if method in candidates]
+    assert len(methods) > 0, "No method to run"
+    method_kwargs = {method: {k: v for k, v in kwargs.items() if k in get(method).kwargs} for method in methods}
+    unused = set(kwargs).difference(*method_kwargs.values())
+    assert not unused, f"No method accepts the arguments {sorted(unused)}"
+    with shared_intermediates(x, y):
+        if workers is None or workers <= 1:
+            votes = {method: _run_method(method, x, y, **method_kwargs[method]) for method in methods}
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    method: executor.submit(
+                        contextvars.copy_context().run, _run_method, method, x, y, **method_kwargs[method]
+                    )
+                    for method in methods
+                }
+                votes = {method: future.result() for method, future in futures.items()}
+    stacked_votes = np.stack([np.asarray(knee) for knee in votes.values()])
+    knee = _vote(stacked_votes.reshape(len(methods), -1)).reshape(stacked_votes.shape[1:])
+    return EnsembleResult(as_index(knee), votes)
+
+
+def _vote(votes):
+    """
+    Find the most-voted knee of every curve.
+
+    Ties are broken the same way as in `collections.Counter.most_common`, i.e. in favour of the index voted for by the
+    earliest method.
+
+    Args:
+        votes (``np.ndarray``): the knee indices, shape ``(n_methods, n_curves)``
+
+    Returns (``np.ndarray``): the most-voted knee index per curve
+    """
+    agreement = (votes[:, np.newaxis, :] == votes[np.newaxis, :, :]).sum(axis=1)  # shape == (n_methods, n_curves)
+    winners = agreement.argmax(axis=0)
+    return votes[winners, np.arange(votes.shape[1])]
@@ -1,18 +1,66 @@
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
 
+import numpy as np
 import numpy.typing as npt
 
-_METHODS: List[str]
+from .methods import Complexity
+from .result import KneeResult
+
+_METHODS: List[str]  # deprecated, see knarrow.methods.available
+
+class EnsembleResult(NamedTuple):
+    knee: Union[int, npt.NDArray[np.intp]]
+    votes: Dict[str, Union[int, npt.NDArray[np.intp]]]
+    def map_indices(self, function: Callable[[Any], Any]) -> EnsembleResult: ...
 
 def find_knee(
     x: npt.ArrayLike,
     y: Optional[npt.ArrayLike] = ...,
     method: str = ...,
+    return_result: bool = ...,
+    coarse: Optional[int] = ...,
+    coarse_window: int = ...,
     **kwargs: Any,
-) -> int: ...
+) -> Union[int, KneeResult]: ...
+
+def find_top_knees(
+    *args: npt.ArrayLike,
+    k: int = ...,
+    min_separation: int = ...,
+    method: str = ...,
+    **kwargs: Any,
+) -> npt.NDArray[np.intp]: ...
 
 def all(
     x: npt.ArrayLike,
     y: Optional[npt.ArrayLike] = ...,
+    methods: Optional[Sequence[str]] = ...,
+    max_complexity: Optional[Complexity] = ...,
     **kwargs: Any,
 ) -> int: ...
+
+def find_knees(
+    x: npt.ArrayLike,
+    y: Optional[npt.ArrayLike] = ...,
+    method: str = ...,
+    return_result: bool = ...,
+    workers: Optional[int] = ...,
+    **kwargs: Any,
+) -> Union[npt.NDArray[np.intp], KneeResult]: ...
+
+def find_knees_grouped(
+    x: npt.ArrayLike,
+    y: npt.ArrayLike,
+    offsets: npt.ArrayLike,
+    method: str = ...,
+    **kwargs: Any,
+) -> npt.NDArray[np.intp]: ...
+
+def ensemble(
+    x: npt.ArrayLike,
+    y: Optional[npt.ArrayLike] = ...,
+    methods: Optional[Sequence[str]] = ...,
+    workers: Optional[int] = ...,
+    max_complexity: Optional[Complexity] = ...,
+    **kwargs: Any,
+) -> EnsembleResult: ...
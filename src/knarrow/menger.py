@@ -1,21 +1,32 @@
 import numpy as np
-from numpy import linalg as la
 
-from .util import np_anchored, np_windowed
+from .kernels import as_rows, get_backend, kernel, menger_knees
+from .util import (
+    aggregate_scales,
+    anchored_views,
+    as_index,
+    multiscale_views,
+    pad_scores,
+    successive_views,
+)
 
 
 def double_triangle_area(vertices):
     """
     Return twice the area of a triangle with the given vertices.
 
+    Uses the closed form of the determinant, so any number of triangles can be processed at once.
+
     Args:
-        vertices (``np.ndarray``): :math:`3 \\times 2` matrix where every row is a new 2-D vertex :math:`(x, y)`
+        vertices (``np.ndarray``): array of shape ``(..., 3, 2)`` where every row of the last two axes is a new 2-D
+                                   vertex :math:`(x, y)`
 
     Returns:
-        ``np.ndarray``: :math:`1 \\times 1` array, twice the area
+        ``np.ndarray``: array of shape ``(...)``, twice the area of every triangle
     """
-    assert vertices.shape == (3, 2)
-    double_area = abs(la.det(np.hstack((vertices, np.ones((3, 1), dtype=vertices.dtype)))))
+    assert vertices.shape[-2:] == (3, 2)
+    edges = vertices[..., 1:, :] - vertices[..., [0], :]  # the two edges from the first vertex, shape (..., 2, 2)
+    double_area = np.abs(edges[..., 0, 0] * edges[..., 1, 1] - edges[..., 1, 0] * edges[..., 0, 1])
     return double_area
 
 
@@ -24,16 +35,14 @@ def get_squared_vector_lengths(vertices):
     Return the square of the lengths between neighbouring vertices
 
     Args:
-        vertices (``np.ndarray``): array of vertices
+        vertices (``np.ndarray``): array of vertices, shape ``(..., k, 2)``
 
     Returns:
-        ``np.ndarray``: lenghts; the entry at ``lenghts[i]`` is a squared distance between the vertex ``i`` and ``i+1``
+        ``np.ndarray``: lenghts; the entry at ``lenghts[..., i]`` is a squared distance between the vertex ``i`` and
+        ``i+1``
     """
-    vector_differences = np.empty(vertices.shape)
-
-    rolled = np.roll(vertices, -1, axis=0)
-    np.subtract(rolled, vertices, out=vector_differences)
-    lengths = np.einsum("ij,ij->i", vector_differences, vector_differences)
+    vector_differences = np.roll(vertices, -1, axis=-2) - vertices
+    lengths = np.einsum("...ij,...ij->...i", vector_differences, vector_differences)
     return lengths
 
 
@@ -42,35 +51,83 @@ def get_curvature(vertices):
     Calculate the Menger curvature defined by the three points
 
     Args:
-        vertices (:obj:`np.ndarray`): :math:`3 \\times 2` matrix where every row is a new 2-D vertex :math:`(x, y)`
+        vertices (:obj:`np.ndarray`): array of shape ``(..., 3, 2)`` where every row of the last two axes is a new 2-D
+                                      vertex :math:`(x, y)`
 
     Returns:
         ``np.ndarray``: the curvature, i.e. the reciprocal of the radius of the circumcircle around the vertices
     """
-    area = double_triangle_area(vertices)
-    value = 4 * area * area / np.prod(get_squared_vector_lengths(vertices))
-    curvature = np.sqrt(value)
-    return curvature
+    assert vertices.shape[-2:] == (3, 2)
+    if vertices.ndim == 2:
+        return get_curvature(vertices[np.newaxis])[0]
+    return get_curvature_components(*((vertices[..., i, 0], vertices[..., i, 1]) for i in range(3)))
+
+
+def get_curvature_components(first, second, third):
+    """
+    :obj:`get_curvature` with the coordinates of the vertices given separately, e.g. as the views from
+    :obj:`knarrow.util.successive_views`, so the triangles are never gathered into one array.
 
+    Args:
+        first (:obj:`tuple` of ``np.ndarray``): the :math:`x` and :math:`y` coordinates of the first vertices
+        second (:obj:`tuple` of ``np.ndarray``): the :math:`x` and :math:`y` coordinates of the second vertices
+        third (:obj:`tuple` of ``np.ndarray``): the :math:`x` and :math:`y` coordinates of the third vertices
 
-def menger_successive(x, y, **kwargs):
+    Returns:
+        ``np.ndarray``: the curvature of every triangle
+    """
+    (x_1, y_1), (x_2, y_2), (x_3, y_3) = first, second, third
+    # the product of the squared lengths of the edges; the temporaries are released as soon as possible, so at most
+    # a few arrays of the size of the curve are alive at once
+    e_x, e_y = x_2 - x_1, y_2 - y_1
+    lengths = _squared_length(e_x, e_y)
+    g_x, g_y = x_3 - x_2, y_3 - y_2
+    lengths *= _squared_length(g_x, g_y)
+    del g_x, g_y
+    f_x, f_y = x_3 - x_1, y_3 - y_1
+    lengths *= _squared_length(f_x, f_y)
+    # twice the area of the triangle, from the two edges at the first vertex
+    area = e_x * f_y
+    area -= f_x * e_y
+    del e_x, e_y, f_x, f_y
+    np.abs(area, out=area)
+    value = 4 * area
+    value *= area
+    del area
+    value /= lengths
+    return np.sqrt(value, out=value)
+
+
+def _squared_length(d_x, d_y):
+    squared_length = d_x * d_x
+    squared_length += d_y * d_y
+    return squared_length
+
+
+def menger_successive(x, y, dilations=None, aggregate="min", **kwargs):
     """
     Find a knee using the Menger curvature on the three successive points
 
+    With ``dilations``, the curvature of every point is measured at multiple scales, i.e. with the neighbours ``d``
+    points away for every ``d`` in ``dilations``, and the scales are aggregated into one score. The curvature of the
+    noise falls with the square of the scale, while a knee bends the curve at all the scales, so the smallest of the
+    curvatures (the default ``min``) is high only at the knee, without smoothing the curve.
+
     Args:
         x (``np.ndarray``): the :math:`x` coordinates of the points
         y (``np.ndarray``): the :math:`y` coordinates of the points
+        dilations (``iterable`` of ``int``, optional): the scales, e.g. ``(1, 2, 4, 8)`` (default: only the successive
+            points)
+        aggregate (``str`` or ``callable``): the aggregation of the scales, see :obj:`knarrow.util.aggregate_scales`
+            (default: ``min``)
         **kwargs: possible additional arguments (none are used)
 
     Returns:
         ``int``: the index of the knee
     """
-    assert len(kwargs) == 0
-    assert x.shape == y.shape
-    indices = np_windowed(len(x), 3)
-    data_points = np.stack((x[indices], y[indices]), axis=-1)
-    curve_scores = np.array([get_curvature(row) for row in data_points])
-    return curve_scores.argmax().item() + 1
+    if dilations is None and get_backend("menger_successive") == "numba":
+        return _menger_kernel(x, y, anchored=False, **kwargs)
+    return as_index(np.argmax(menger_successive_scores(x, y, dilations, aggregate, **kwargs), axis=-1))
 
 
 def menger_anchored(x, y, **kwargs):
@@ -86,11 +143,57 @@ def menger_anchored(x, y, **kwargs):
         Returns:
             ``int``: the index of the knee
     """
+    if get_backend("menger_anchored") == "numba":
+        return _menger_kernel(x, y, anchored=True, **kwargs)
+    return as_index(np.argmax(menger_anchored_scores(x, y, **kwargs), axis=-1))
+
+
+def _menger_kernel(x, y, anchored, **kwargs):
+    assert len(kwargs) == 0
+    assert x.shape == y.shape
+    knees = np.empty(y.shape[:-1], dtype=np.intp)
+    kernel(menger_knees)(*as_rows(x, y), anchored, y.dtype.type(4), knees.reshape(-1))
+    return as_index(knees)
+
+
+def menger_successive_scores(x, y, dilations=None, aggregate="min", **kwargs):
+    """
+    The Menger curvature of every point and its neighbours, the scores of :obj:`menger_successive`.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+        dilations (``iterable`` of ``int``, optional): the scales (default: only the successive points)
+        aggregate (``str`` or ``callable``): the aggregation of the scales (default: ``min``)
+        **kwargs: possible additional arguments (none are used)
+
+    Returns:
+        ``np.ndarray``: the score of every point, :math:`-\\infty` for the first and the last ``max(dilations)``
+    """
+    assert len(kwargs) == 0
+    assert x.shape == y.shape
+    if dilations is None:
+        return pad_scores(get_curvature_components(*successive_views(x, y)))
+    # the curvature at all the scales at once, shape (..., n - 2 * reach, len(dilations))
+    scores = aggregate_scales(get_curvature_components(*multiscale_views(x, y, dilations)), aggregate)
+    reach = max(dilations)
+    return pad_scores(scores, before=reach, after=reach)
+
+
+def menger_anchored_scores(x, y, **kwargs):
+    """
+    The Menger curvature of every point and the first and the last point, the scores of :obj:`menger_anchored`.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+        **kwargs: possible additional arguments (none are used)
+
+    Returns:
+        ``np.ndarray``: the score of every point, :math:`-\\infty` for the first and the last one
+    """
     assert len(kwargs) == 0
     assert x.shape == y.shape
     # perhaps later `menger_anchored` and `menger_successive` can be united in the future
     # since the only difference is this line
-    indices = np_anchored(len(x))
-    data_points = np.stack((x[indices], y[indices]), axis=-1)
-    curve_scores = np.array([get_curvature(row) for row in data_points])
-    return curve_scores.argmax().item() + 1
+    return pad_scores(get_curvature_components(*anchored_views(x, y)))
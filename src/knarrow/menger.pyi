@@ -1,10 +1,31 @@
-from typing import Any
+from typing import Any, Callable, Iterable, Optional, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
 
-def menger_successive(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any) -> int: ...
+def menger_successive(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    dilations: Optional[Iterable[int]] = ...,
+    aggregate: Union[str, Callable[..., npt.NDArray[np.float64]]] = ...,
+    **kwargs: Any,
+) -> int: ...
 def menger_anchored(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any) -> int: ...
 def double_triangle_area(vertices: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
 def get_squared_vector_lengths(vertices: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
 def get_curvature(vertices: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def get_curvature_components(
+    first: Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]],
+    second: Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]],
+    third: Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]],
+) -> npt.NDArray[np.float64]: ...
+def menger_successive_scores(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    dilations: Optional[Iterable[int]] = ...,
+    aggregate: Union[str, Callable[..., npt.NDArray[np.float64]]] = ...,
+    **kwargs: Any,
+) -> npt.NDArray[np.float64]: ...
+def menger_anchored_scores(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any
+) -> npt.NDArray[np.float64]: ...
@@ -0,0 +1,275 @@
+import enum
+import importlib
+import threading
+import warnings
+
+ENTRY_POINT_GROUP = "knarrow.methods"
+
+
+class Complexity(enum.IntEnum):
+    """
+    The time complexity class of a method in the number of points, ordered from the cheapest.
+    """
+
+    LINEAR = 1
+    LINEARITHMIC = 2
+    ITERATIVE = 3  # linear per iteration of an iterative solver
+    QUADRATIC = 4
+
+
+class MethodSpec:
+    """
+    The description of a knee-finding method in the registry.
+
+    The functions are given either directly or as ``"module:attribute"`` strings, which are only imported on the first
+    use of the method (see :obj:`load`), so registering a method is cheap.
+
+    Args:
+        name (``str``): the name of the method, as passed to :obj:`knarrow.find_knee`
+        function (``callable`` or ``str``): the method, a function of the prepared :math:`x` and :math:`y` (see
+            :obj:`knarrow.util.prepare`) and the keyword arguments, returning the index of the knee
+        scores (``callable`` or ``str``, optional): the score of every point, higher is better (see
+            :obj:`knarrow.KneeResult`). Without it, ``return_result=True`` is not available for the method
+        complexity (:obj:`Complexity`): the time complexity class (default: ``LINEAR``)
+        kwargs (``iterable`` of ``str``): the names of the keyword arguments the method accepts
+        batch (``bool``): whether the functions accept many curves at once, with the shape ``(..., n)``; otherwise
+            :obj:`knarrow.find_knees` calls them curve by curve (default: ``False``)
+        best_scored (``bool``): whether the knee is always the best-scored point (default: ``True``)
+        locality (``tuple`` or ``str``, optional): the number of neighbours ``(before, after)`` the score of a point
+            depends on, or ``"anchored"`` if it depends on the point and the both ends of the curve. Enables the
+            coarse-to-fine mode (see :obj:`knarrow.coarse.coarse_to_fine`)
+    """
+
+    __slots__ = (
+        "_loaded",
+        "_lock",
+        "batch",
+        "best_scored",
+        "complexity",
+        "function",
+        "kwargs",
+        "locality",
+        "name",
+        "scores",
+    )
+
+    def __init__(
+        self,
+        name,
+        function,
+        scores=None,
+        complexity=Complexity.LINEAR,
+        kwargs=(),
+        batch=False,
+        best_scored=True,
+        locality=None,
+    ):
+        assert locality is None or locality == "anchored" or len(locality) == 2
+        self.name = name
+        self.function = function
+        self.scores = scores
+        self.complexity = Complexity(complexity)
+        self.kwargs = frozenset(kwargs)
+        self.batch = batch
+        self.best_scored = best_scored
+        self.locality = locality
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Import the functions of the method on its first use.
+
+        Returns:
+            :obj:`tuple` of ``callable``: the method and its scores function (``None`` if the method has none)
+        """
+        with self._lock:
+            if self._loaded is None:
+                self._loaded = _resolve(self.function), None if self.scores is None else _resolve(self.scores)
+        return self._loaded
+
+    def __repr__(self):
+        return f"MethodSpec(name={self.name!r}, complexity={self.complexity.name}, batch={self.batch})"
+
+
+def _resolve(target):
+    if callable(target):
+        return target
+    module, attribute = target.split(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+_REGISTRY = {}
+_DISCOVERY_LOCK = threading.Lock()
+_discovered = False
+
+
+def register(spec, replace=False):
+    """
+    Add a method to the registry.
+
+    Args:
+        spec (:obj:`MethodSpec`): the description of the method
+        replace (``bool``): replace a method of the same name instead of failing (default: ``False``)
+
+    Returns:
+        :obj:`MethodSpec`: the registered spec
+    """
+    assert spec.name != "all", "'all' is reserved for the vote of all the methods"
+    assert replace or spec.name not in _REGISTRY, f"The method {spec.name} is already registered"
+    _REGISTRY[spec.name] = spec
+    return spec
+
+
+def unregister(name):
+    """
+    Remove a method from the registry.
+
+    Args:
+        name (``str``): the name of the method
+    """
+    del _REGISTRY[name]
+
+
+def get(name):
+    """
+    Args:
+        name (``str``): the name of the method
+
+    Returns:
+        :obj:`MethodSpec`: the registered method
+
+    Raises:
+        ``KeyError``: if there is no such method
+    """
+    _discover()
+    return _REGISTRY[name]
+
+
+def available(max_complexity=None, batch=None):
+    """
+    The names of the registered methods, optionally only those matching the requirements.
+
+    Args:
+        max_complexity (:obj:`Complexity`, optional): only the methods of this complexity class or cheaper
+        batch (``bool``, optional): only the methods with (or without) the batch capability
+
+    Returns:
+        ``list`` of ``str``: the names in the order of registration, the built-in methods first
+    """
+    _discover()
+    return [
+        name
+        for name, spec in _REGISTRY.items()
+        if (max_complexity is None or spec.complexity <= max_complexity) and (batch is None or spec.batch == batch)
+    ]
+
+
+def load(name):
+    """
+    Import the functions of a knee-finding method on its first use.
+
+    Args:
+        name (``str``): the name of the method
+
+    Returns:
+        :obj:`tuple` of ``callable``: the method and its scores function
+    """
+    return get(name).load()
+
+
+def _discover():
+    # the methods of the other packages are registered on the first query, a broken plugin is skipped with a warning
+    global _discovered
+    if _discovered:
+        return
+    with _DISCOVERY_LOCK:
+        if _discovered:
+            return
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                spec = entry_point.load()
+            except (ImportError, AttributeError) as error:
+                warnings.warn(f"Skipping the knee-finding method {entry_point.name!r}: {error!r}", stacklevel=2)
+                continue
+            if not isinstance(spec, MethodSpec):
+                warnings.warn(
+                    f"Skipping the knee-finding method {entry_point.name!r}: {type(spec).__name__} is not a MethodSpec",
+                    stacklevel=2,
+                )
+                continue
+            if spec.name == "all" or spec.name in _REGISTRY:
+                warnings.warn(
+                    f"Skipping the knee-finding method {entry_point.name!r}: the name {spec.name!r} is already taken",
+                    stacklevel=2,
+                )
+                continue
+            register(spec)
+        _discovered = True
+
+
+for _spec in (
+    MethodSpec(
+        "angle",
+        "knarrow.angle_method:angle",
+        "knarrow.angle_method:angle_scores",
+        batch=True,
+        locality=(1, 1),
+    ),
+    MethodSpec(
+        "c_method",
+        "knarrow.c_method:c_method",
+        "knarrow.c_method:c_method_scores",
+        complexity=Complexity.ITERATIVE,
+        kwargs=("c0", "max_iterations"),
+        batch=True,
+    ),
+    MethodSpec(
+        "distance",
+        "knarrow.distance_method:distance",
+        "knarrow.distance_method:distance_scores",
+        batch=True,
+        locality=(0, 0),
+    ),
+    MethodSpec(
+        "distance_adjacent",
+        "knarrow.distance_method:distance_adjacent",
+        "knarrow.distance_method:distance_adjacent_scores",
+        kwargs=("dilations", "aggregate"),
+        batch=True,
+        locality=(0, 2),
+    ),
+    MethodSpec(
+        "kneedle",
+        "knarrow.kneedle:kneedle",
+        "knarrow.kneedle:kneedle_scores",
+        kwargs=("S", "online"),
+        batch=True,
+        best_scored=False,
+    ),
+    MethodSpec(
+        "menger_anchored",
+        "knarrow.menger:menger_anchored",
+        "knarrow.menger:menger_anchored_scores",
+        batch=True,
+        locality="anchored",
+    ),
+    MethodSpec(
+        "menger_successive",
+        "knarrow.menger:menger_successive",
+        "knarrow.menger:menger_successive_scores",
+        kwargs=("dilations", "aggregate"),
+        batch=True,
+        locality=(1, 1),
+    ),
+    MethodSpec(
+        "ols_swiping",
+        "knarrow.ols:ols_swiping",
+        "knarrow.ols:ols_swiping_scores",
+        batch=True,
+    ),
+):
+    register(_spec)
+del _spec
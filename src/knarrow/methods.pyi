@@ -0,0 +1,38 @@
+import enum
+from typing import Any, Callable, FrozenSet, List, Optional, Tuple, Union
+
+ENTRY_POINT_GROUP: str
+
+class Complexity(enum.IntEnum):
+    LINEAR = 1
+    LINEARITHMIC = 2
+    ITERATIVE = 3
+    QUADRATIC = 4
+
+class MethodSpec:
+    name: str
+    function: Union[Callable[..., Any], str]
+    scores: Optional[Union[Callable[..., Any], str]]
+    complexity: Complexity
+    kwargs: FrozenSet[str]
+    batch: bool
+    best_scored: bool
+    locality: Optional[Union[Tuple[int, int], str]]
+    def __init__(
+        self,
+        name: str,
+        function: Union[Callable[..., Any], str],
+        scores: Optional[Union[Callable[..., Any], str]] = ...,
+        complexity: Complexity = ...,
+        kwargs: Tuple[str, ...] = ...,
+        batch: bool = ...,
+        best_scored: bool = ...,
+        locality: Optional[Union[Tuple[int, int], str]] = ...,
+    ) -> None: ...
+    def load(self) -> Tuple[Callable[..., Any], Optional[Callable[..., Any]]]: ...
+
+def register(spec: MethodSpec, replace: bool = ...) -> MethodSpec: ...
+def unregister(name: str) -> None: ...
+def get(name: str) -> MethodSpec: ...
+def available(max_complexity: Optional[Complexity] = ..., batch: Optional[bool] = ...) -> List[str]: ...
+def load(name: str) -> Tuple[Callable[..., Any], Optional[Callable[..., Any]]]: ...
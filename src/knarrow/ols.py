@@ -1,6 +1,8 @@
 import numpy as np
 from numpy import linalg as la
 
+from .util import as_index, float_dtype, pad_scores
+
 
 def r_squared(x, y):
     """
@@ -32,6 +34,60 @@ def r_squared(x, y):
     return ((r2_1 + r2_2) / 2).item()
 
 
+def cumulative_r_squared(x, y):
+    """
+    Return the :math:`R^2` of the linear regressions fitted to every prefix of the points, all at once.
+
+    The fits are never performed explicitly: for a simple linear regression :math:`R^2` equals the squared correlation
+    coefficient, which only depends on the sums of :math:`x`, :math:`y`, :math:`x^2`, :math:`y^2` and :math:`xy`. Their
+    cumulative sums give the statistics of all the prefixes in a single vectorized pass.
+
+    Args:
+        x (``np.ndarray``): The :math:`x` coordinates of the points, shape ``(..., n)``
+        y (``np.ndarray``): The :math:`y` coordinates of the points, shape ``(..., n)``
+
+    Returns:
+        ``np.ndarray``: array of shape ``(..., n)``; the entry ``[..., k]`` is the :math:`R^2` of the fit to the first
+        ``k + 1`` points, in the floating point type of the inputs. The entry for the single point prefix is not
+        meaningful.
+    """
+    # R^2 does not depend on the translation of the points; moving the first point to the origin keeps the sums small,
+    # which avoids the catastrophic cancellation in the (co)variances of the short prefixes
+    dtype = float_dtype(x, y)
+    x = x - x[..., :1]
+    y = y - y[..., :1]
+    count = np.arange(1, x.shape[-1] + 1)
+    # the sums are always accumulated in float64, float32 cumulative sums lose too many digits on long curves
+    sums = (np.cumsum(v, axis=-1, dtype=np.float64) for v in (x, y, x * x, y * y, x * y))
+    return r_squared_from_sums(count, *sums).astype(dtype, copy=False)
+
+
+def r_squared_from_sums(count, sum_x, sum_y, sum_xx, sum_yy, sum_xy):
+    """
+    Return the :math:`R^2` of the linear regression from the sums of the (translated) coordinates of the points.
+
+    A set of points with a constant :math:`y` is fitted perfectly by a horizontal line, so its :math:`R^2` is :math:`1`.
+
+    Args:
+        count (``np.ndarray``): the number of points
+        sum_x (``np.ndarray``): the sum of :math:`x`
+        sum_y (``np.ndarray``): the sum of :math:`y`
+        sum_xx (``np.ndarray``): the sum of :math:`x^2`
+        sum_yy (``np.ndarray``): the sum of :math:`y^2`
+        sum_xy (``np.ndarray``): the sum of :math:`xy`
+
+    Returns:
+        ``np.ndarray``: the :math:`R^2` measure of the fit
+    """
+    # scaled (co)variances
+    s_xx = sum_xx - sum_x * sum_x / count
+    s_yy = sum_yy - sum_y * sum_y / count
+    s_xy = sum_xy - sum_x * sum_y / count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = s_xy * s_xy / (s_xx * s_yy)
+    return np.where(s_yy == 0, 1.0, r2)
+
+
 def ols_swiping(x, y, **kwargs):
     """
     Performs OLS swiping method.
@@ -41,6 +97,9 @@ def ols_swiping(x, y, **kwargs):
     ordinary least squares. If both lines fit quite well, meaning the :math:`R^2` for both left and the right fit is
     particularly high, the pivot point is declared as a knee.
 
+    The :math:`R^2` of all the left and all the right fits are computed at once with :obj:`cumulative_r_squared`, so
+    the method runs in linear time.
+
     Args:
         x (``np.ndarray``): the :math:`x` coordinates of the points
         y (``np.ndarray``): the :math:`y` coordinates of the points
@@ -49,10 +108,23 @@ def ols_swiping(x, y, **kwargs):
     Returns:
         ``int``: the index of the knee
     """
+    return as_index(np.argmax(ols_swiping_scores(x, y, **kwargs), axis=-1))
+
+
+def ols_swiping_scores(x, y, **kwargs):
+    """
+    The negated sum of the :math:`R^2` of the left and the right fit for every pivot, the scores of :obj:`ols_swiping`.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+        **kwargs: possible additional arguments (none are used)
+
+    Returns:
+        ``np.ndarray``: the score of every point, :math:`-\\infty` for the first and the last one
+    """
     assert len(kwargs) == 0
-    n = len(x)
-    # some python magic
-    # generator of all the splits, linear regressions and the sums of particular r2 coefficients
-    results = ((i, r_squared(x[: i + 1], y[: i + 1]) + r_squared(x[i:], y[i:])) for i in range(1, n - 1))
-    # the values are only calculated as the generator is consumed :))
-    return min(results, key=lambda t: t[1])[0]
+    # the left part of the pivot i are the points [0, i], the right part are the points [i, n - 1]
+    left_r2 = cumulative_r_squared(x, y)[..., 1:-1]
+    right_r2 = cumulative_r_squared(x[..., ::-1], y[..., ::-1])[..., -2:0:-1]
+    return pad_scores(-(left_r2 + right_r2))
@@ -5,3 +5,15 @@ import numpy.typing as npt
 
 def r_squared(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]) -> float: ...
 def ols_swiping(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any) -> int: ...
+def cumulative_r_squared(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def r_squared_from_sums(
+    count: npt.ArrayLike,
+    sum_x: npt.ArrayLike,
+    sum_y: npt.ArrayLike,
+    sum_xx: npt.ArrayLike,
+    sum_yy: npt.ArrayLike,
+    sum_xy: npt.ArrayLike,
+) -> npt.NDArray[np.float64]: ...
+def ols_swiping_scores(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], **kwargs: Any
+) -> npt.NDArray[np.float64]: ...
@@ -0,0 +1,150 @@
+import contextlib
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from .profiling import record_stage
+
+CHUNKS_PER_WORKER = 4
+
+
+class WorkerReport(NamedTuple):
+    """
+    The work done by one worker process of :obj:`find_knees_parallel`.
+
+    Attributes:
+        pid (``int``): the process id of the worker
+        chunks (``int``): the number of the chunks of curves it processed
+        curves (``int``): the number of the curves it processed
+        points (``int``): the number of the points of those curves
+        time (``float``): the wall time spent on the chunks, in seconds
+    """
+
+    pid: int
+    chunks: int
+    curves: int
+    points: int
+    time: float
+
+    @property
+    def throughput(self):
+        """``float``: the curves processed per second"""
+        return self.curves / self.time if self.time > 0 else float("inf")
+
+
+def find_knees_parallel(*args, workers, method="menger_successive", executor=None, chunks=None, **kwargs):
+    """
+    Find the knees of many curves with :obj:`knarrow.find_knees` in multiple processes.
+
+    The curves are split into contiguous chunks, and every chunk is a :obj:`knarrow.find_knees` call in a worker of a
+    process pool, so all the methods and the input preparation (including ``smoothing``) run in parallel. The inputs
+    are copied once into shared memory which the workers read in place, and the workers write the knees into a shared
+    result array at the positions of their chunk, so only the names of the buffers and the bounds of the chunks are
+    pickled and the knees are in the order of the curves.
+
+    Args:
+        *args (``np.ndarray``): the :math:`y` values of the curves, or their :math:`x` and :math:`y` coordinates, as
+            for :obj:`knarrow.find_knees`
+        workers (``int``): the number of the worker processes
+        method (``str``): the knee-finding method (default: menger_successive)
+        executor (:obj:`concurrent.futures.ProcessPoolExecutor`, optional): a pool to reuse instead of starting one
+            with ``workers`` processes for this call
+        chunks (``int``, optional): the number of the chunks (default: 4 per worker, at most one per curve)
+        **kwargs: possible additional arguments for :obj:`knarrow.find_knees`
+
+    Returns:
+        ``tuple``: the indices of the knees (``np.ndarray``, one per curve) and a :obj:`WorkerReport` per worker
+    """
+    assert workers >= 1 and 1 <= len(args) <= 2
+    arrays = [np.asarray(argument) for argument in args]
+    assert arrays[-1].ndim == 2, "The input must be of shape (n_curves, n_points)"
+    n_curves, n_points = arrays[-1].shape
+    chunks = min(chunks or CHUNKS_PER_WORKER * workers, n_curves)
+    bounds = np.linspace(0, n_curves, chunks + 1).astype(int).tolist()
+
+    buffers = []
+    try:
+        inputs = [_share(array, buffers) for array in arrays]
+        knees = _share(np.empty(n_curves, dtype=np.intp), buffers)
+        with contextlib.nullcontext(executor) if executor is not None else _process_pool(workers) as pool:
+            futures = [
+                pool.submit(_run_chunk, inputs, knees, start, stop, method, kwargs)
+                for start, stop in itertools.pairwise(bounds)
+            ]
+            results = [future.result() for future in futures]
+        result = np.ndarray((n_curves,), np.intp, buffers[-1].buf)
+        knees = result.copy()
+        del result  # the view must be gone before the block is closed
+    finally:
+        for buffer in buffers:
+            buffer.close()
+            buffer.unlink()
+
+    reports = {}
+    for pid, start, stop, elapsed in results:
+        record_stage(f"parallel.worker.{pid}", elapsed)
+        chunks, curves, time_ = reports.get(pid, (0, 0, 0.0))
+        reports[pid] = chunks + 1, curves + stop - start, time_ + elapsed
+    return knees, [
+        WorkerReport(pid, chunks, curves, curves * n_points, time_) for pid, (chunks, curves, time_) in reports.items()
+    ]
+
+
+def _process_pool(workers):
+    # forking a process with running threads (e.g. of the BLAS) can deadlock, the workers are started from a server
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(workers, mp_context=context)
+
+
+def _share(array, buffers):
+    # copy the array into a new shared memory block, returns what the workers need to map it
+    buffer = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    buffers.append(buffer)
+    np.ndarray(array.shape, array.dtype, buffer.buf)[...] = array
+    return buffer.name, array.shape, array.dtype.str
+
+
+def _attach(name):
+    # map a shared memory block created by `_share` in the parent
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # the block is owned (and unlinked) by the parent, the workers must not register it for cleanup
+    block = shared_memory.SharedMemory(name)
+    resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _run_chunk(inputs, knees, start, stop, method, kwargs):
+    """
+    Find the knees of the curves ``start:stop`` in a worker, reading the inputs from and writing the knees to the
+    shared memory.
+
+    Returns:
+        ``tuple``: the process id, the bounds of the chunk and the elapsed time
+    """
+    from .main import find_knees
+
+    started = time.perf_counter()
+    blocks = [_attach(name) for name, _, _ in (*inputs, knees)]
+    try:
+        *arrays, result = [
+            np.ndarray(shape, dtype, block.buf) for block, (_, shape, dtype) in zip(blocks, (*inputs, knees))
+        ]
+        y = arrays[-1][start:stop]
+        args = [y] if len(arrays) == 1 else [arrays[0] if arrays[0].ndim == 1 else arrays[0][start:stop], y]
+        result[start:stop] = find_knees(*args, method=method, **kwargs)
+        del arrays, result, y, args  # the views must be gone before the blocks are closed
+    finally:
+        for block in blocks:
+            # if a traceback still holds a view, the block is closed when the traceback is collected
+            with contextlib.suppress(BufferError):
+                block.close()
+    return os.getpid(), start, stop, time.perf_counter() - started
@@ -0,0 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+CHUNKS_PER_WORKER: int
+
+class WorkerReport(NamedTuple):
+    pid: int
+    chunks: int
+    curves: int
+    points: int
+    time: float
+    @property
+    def throughput(self) -> float: ...
+
+def find_knees_parallel(
+    *args: npt.ArrayLike,
+    workers: int,
+    method: str = ...,
+    executor: Optional[ProcessPoolExecutor] = ...,
+    chunks: Optional[int] = ...,
+    **kwargs: Any,
+) -> Tuple[npt.NDArray[np.intp], List[WorkerReport]]: ...
@@ -0,0 +1,284 @@
+import contextlib
+import contextvars
+import threading
+import time
+import tracemalloc
+
+_PROFILE = contextvars.ContextVar("knarrow_profile", default=None)
+
+
+class StageStatistics:
+    """
+    The aggregated measurements of one stage.
+
+    Attributes:
+        count (``int``): how many times the stage was run
+        time (``float``): the total wall time in seconds
+        min_time (``float``): the shortest run in seconds
+        max_time (``float``): the longest run in seconds
+        peak_memory (``int``): the largest memory allocated during a single run, in bytes (only if the memory is traced)
+        copies (``int``): the total number of full-size arrays allocated, as reported with :obj:`count_copies`
+    """
+
+    __slots__ = ("copies", "count", "max_time", "min_time", "peak_memory", "time")
+
+    def __init__(self, count=0, time=0.0, min_time=float("inf"), max_time=0.0, peak_memory=0, copies=0):
+        self.count = count
+        self.time = time
+        self.min_time = min_time
+        self.max_time = max_time
+        self.peak_memory = peak_memory
+        self.copies = copies
+
+    def add(self, elapsed, memory=0, copies=0):
+        self.count += 1
+        self.time += elapsed
+        self.min_time = min(self.min_time, elapsed)
+        self.max_time = max(self.max_time, elapsed)
+        self.peak_memory = max(self.peak_memory, memory)
+        self.copies += copies
+
+    def merge(self, other):
+        self.count += other.count
+        self.time += other.time
+        self.min_time = min(self.min_time, other.min_time)
+        self.max_time = max(self.max_time, other.max_time)
+        self.peak_memory = max(self.peak_memory, other.peak_memory)
+        self.copies += other.copies
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Profile:
+    """
+    The measurements of all the stages run inside a :obj:`profile` block.
+
+    Profiles are plain data: export them with :obj:`as_dict` (e.g. to JSON from every worker of a batch job), load them
+    back with :obj:`from_dict` and aggregate them with :obj:`merge`.
+
+    Args:
+        trace_memory (``bool``): whether to measure the peak memory of every stage with :obj:`tracemalloc`
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, name, elapsed, memory=0, copies=0):
+        """
+        Add one run of a stage.
+
+        Args:
+            name (``str``): the name of the stage
+            elapsed (``float``): the wall time in seconds
+            memory (``int``): the peak memory allocated during the run, in bytes
+            copies (``int``): the number of full-size arrays allocated during the run
+        """
+        with self._lock:
+            self.stages.setdefault(name, StageStatistics()).add(elapsed, memory, copies)
+
+    def merge(self, other):
+        """
+        Add all the measurements of another profile to this one.
+
+        Args:
+            other (``Profile``): the profile to merge in
+
+        Returns:
+            ``Profile``: this profile
+        """
+        with self._lock:
+            for name, statistics in other.stages.items():
+                self.stages.setdefault(name, StageStatistics()).merge(statistics)
+        return self
+
+    def as_dict(self):
+        """
+        Returns:
+            ``dict``: the statistics of every stage as a JSON-serializable dictionary
+        """
+        return {name: statistics.as_dict() for name, statistics in self.stages.items()}
+
+    @classmethod
+    def from_dict(cls, stages):
+        """
+        Load a profile exported with :obj:`as_dict`.
+
+        Args:
+            stages (``dict``): the statistics of every stage
+
+        Returns:
+            ``Profile``: the loaded profile
+        """
+        profile = cls()
+        profile.stages = {name: StageStatistics(**statistics) for name, statistics in stages.items()}
+        return profile
+
+    def report(self):
+        """
+        Returns:
+            ``str``: a table of the stages, the slowest first
+        """
+        lines = [
+            f"{'stage':<28} {'count':>8} {'total [ms]':>12} {'mean [ms]':>12} {'peak memory [B]':>16} {'copies':>8}"
+        ]
+        for name, statistics in sorted(self.stages.items(), key=lambda item: -item[1].time):
+            mean = statistics.time / statistics.count
+            lines.append(
+                f"{name:<28} {statistics.count:>8} {statistics.time * 1e3:>12.3f} {mean * 1e3:>12.3f} "
+                f"{statistics.peak_memory:>16} {statistics.copies:>8}"
+            )
+        return "\n".join(lines)
+
+    @property
+    def _stack(self):
+        # the stages currently running in this thread, the innermost last
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+class _Stage:
+    __slots__ = ("copies", "name", "peak", "profile", "start", "start_memory")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+        self.copies = 0
+
+    def __enter__(self):
+        stack = self.profile._stack
+        if self.profile.trace_memory:
+            self.start_memory, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # the peak is reset for every stage, so the enclosing stage keeps the peak seen so far
+                stack[-1].peak = max(stack[-1].peak, peak)
+            self.peak = self.start_memory
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        memory = 0
+        stack = self.profile._stack
+        stack.pop()
+        if self.profile.trace_memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            memory = self.peak - self.start_memory
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+        self.profile.record(self.name, elapsed, memory, self.copies)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """
+    Measure a block of code as a stage of the active profile.
+
+    Outside of a :obj:`profile` block it does nothing, at the cost of a single context variable lookup.
+
+    Args:
+        name (``str``): the name of the stage, e.g. ``prepare.sort`` or ``method.kneedle``
+
+    Returns:
+        a context manager measuring the block
+    """
+    profile = _PROFILE.get()
+    return _NO_STAGE if profile is None else _Stage(profile, name)
+
+
+def count_copies(*arrays, inputs=()):
+    """
+    Count the arrays of the size of the curves (copies of the input or temporaries of the same size) allocated by the
+    running stage.
+
+    The arrays are counted by their memory, so the views of an array count once and the arrays which share the memory
+    of the ``inputs`` are not counted at all: e.g. ``np.asarray`` returns an array as it is and copies anything else.
+    The copies are counted on the innermost stage running in this thread; outside of a :obj:`profile` block it does
+    nothing.
+
+    Args:
+        *arrays (``np.ndarray``): the arrays produced by the stage
+        inputs (``tuple``): the arrays (or any other objects) the stage received
+    """
+    profile = _PROFILE.get()
+    if profile is not None and profile._stack:
+        shared = {id(_memory(array)) for array in inputs}
+        profile._stack[-1].copies += len({id(_memory(array)) for array in arrays} - shared)
+
+
+def _memory(array):
+    # the object owning the memory of an array: the array itself, or the bottom of its chain of views
+    while getattr(array, "base", None) is not None:
+        array = array.base
+    return array
+
+
+def record_stage(name, elapsed, memory=0, copies=0):
+    """
+    Add a run of a stage measured elsewhere, e.g. in a worker process, to the active profile.
+
+    Outside of a :obj:`profile` block it does nothing.
+
+    Args:
+        name (``str``): the name of the stage
+        elapsed (``float``): the wall time in seconds
+        memory (``int``): the peak memory allocated during the run, in bytes
+        copies (``int``): the number of full-size arrays allocated during the run
+    """
+    profile = _PROFILE.get()
+    if profile is not None:
+        profile.record(name, elapsed, memory, copies)
+
+
+@contextlib.contextmanager
+def profile(trace_memory=False):
+    """
+    Profile all the knee-finding calls made inside the block, stage by stage.
+
+    The stages are the steps of the input preparation (``prepare.convert``, ``prepare.sort``, ``prepare.normalize``,
+    ``prepare.smoothing`` and ``prepare.knee_type``) and the methods (``method.<name>``). Besides the time, the input
+    preparation counts the full-size arrays it allocates (see :obj:`count_copies`). The active profile is stored
+    in a context variable, so it is shared with the threads of :obj:`knarrow.ensemble` but not with unrelated threads.
+
+    Args:
+        trace_memory (``bool``): also measure the peak memory of every stage; this starts :obj:`tracemalloc`, which
+            slows the code down considerably (default: ``False``)
+
+    Yields:
+        ``Profile``: the measurements, filled in as the stages run
+
+    Example:
+        >>> with profile() as measurements:
+        ...     find_knee(x, y, smoothing=0.01)
+        >>> print(measurements.report())
+    """
+    measurements = Profile(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _PROFILE.set(measurements)
+    try:
+        yield measurements
+    finally:
+        _PROFILE.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
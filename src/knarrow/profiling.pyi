@@ -0,0 +1,75 @@
+import contextvars
+import threading
+from types import TracebackType
+from typing import Any, ContextManager, Dict, List, Optional, Type, Union
+
+from typing_extensions import Self
+
+_PROFILE: contextvars.ContextVar[Optional[Profile]]
+
+class StageStatistics:
+    count: int
+    time: float
+    min_time: float
+    max_time: float
+    peak_memory: int
+    copies: int
+    def __init__(
+        self,
+        count: int = ...,
+        time: float = ...,
+        min_time: float = ...,
+        max_time: float = ...,
+        peak_memory: int = ...,
+        copies: int = ...,
+    ) -> None: ...
+    def add(self, elapsed: float, memory: int = ..., copies: int = ...) -> None: ...
+    def merge(self, other: StageStatistics) -> None: ...
+    def as_dict(self) -> Dict[str, Union[int, float]]: ...
+
+class Profile:
+    trace_memory: bool
+    stages: Dict[str, StageStatistics]
+    _lock: threading.Lock
+    _local: threading.local
+    def __init__(self, trace_memory: bool = ...) -> None: ...
+    def record(self, name: str, elapsed: float, memory: int = ..., copies: int = ...) -> None: ...
+    def merge(self, other: Profile) -> Profile: ...
+    def as_dict(self) -> Dict[str, Dict[str, Union[int, float]]]: ...
+    @classmethod
+    def from_dict(cls, stages: Dict[str, Dict[str, Any]]) -> Profile: ...
+    def report(self) -> str: ...
+    @property
+    def _stack(self) -> List[_Stage]: ...
+
+class _Stage:
+    profile: Profile
+    name: str
+    start: float
+    start_memory: int
+    peak: int
+    copies: int
+    def __init__(self, profile: Profile, name: str) -> None: ...
+    def __enter__(self) -> Self: ...
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> bool: ...
+
+class _NoStage:
+    def __enter__(self) -> Self: ...
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> bool: ...
+
+_NO_STAGE: _NoStage
+
+def stage(name: str) -> Union[_Stage, _NoStage]: ...
+def count_copies(number: int = ...) -> None: ...
+def record_stage(name: str, elapsed: float, memory: int = ..., copies: int = ...) -> None: ...
+def profile(trace_memory: bool = ...) -> ContextManager[Profile]: ...
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class KneeResult:
+    """
+    The knee found by a method, together with the score of every point.
+
+    Returned by :obj:`knarrow.find_knee` and :obj:`knarrow.find_knees` when called with ``return_result=True``. The
+    scores are the ones the method computed anyway to find the knee (higher is better, :math:`-\\infty` for the points
+    the method can't score), so inspecting the runner-up knees or the confidence costs no extra pass over the data.
+
+    The scores are materialized lazily: they are reordered to match the points of the input (undoing the reversal of
+    the curve done by :obj:`knarrow.util.prepare` for some knee types) only when :obj:`scores` is first accessed. Like
+    the index, the scores follow the order of the sorted input.
+
+    Attributes:
+        index (``int`` or ``np.ndarray``): the index of the knee, one per curve if there are multiple curves
+    """
+
+    __slots__ = ("_mapped_scores", "_mappings", "_scores", "index")
+
+    def __init__(self, index, scores, mappings=()):
+        """
+        Args:
+            index (``int`` or ``np.ndarray``): the index of the knee
+            scores (``np.ndarray`` or ``callable``): the scores of the points, shape ``(..., n)``, or a function without
+                arguments computing them on demand
+            mappings (``tuple`` of ``callable``): the index mappings (see :obj:`map_indices`) to apply to the scores
+        """
+        self.index = index
+        self._scores = scores
+        self._mappings = tuple(mappings)
+        self._mapped_scores = None
+
+    def map_indices(self, function):
+        """
+        Map the knee index (and lazily, the positions of the scores) with an index mapping.
+
+        Args:
+            function (``callable``): maps an index (or an array of indices, one per curve) to the new index
+
+        Returns:
+            ``KneeResult``: the mapped result
+        """
+        return KneeResult(function(self.index), self._scores, self._mappings + (function,))
+
+    @property
+    def scores(self):
+        """``np.ndarray``: the score of every point, shape ``(..., n)``"""
+        if self._mapped_scores is None:
+            scores = self._scores() if callable(self._scores) else self._scores
+            for function in self._mappings:
+                scores = _map_positions(scores, function)
+            self._mapped_scores = scores
+        return self._mapped_scores
+
+    @property
+    def margin(self):
+        """
+        ``float`` or ``np.ndarray``: the score of the knee minus the best score of all the other points.
+
+        A large margin means a clear knee, a small one means there is a runner-up almost as good as the knee. It is
+        negative if the method doesn't pick the best-scored point (e.g. :obj:`knarrow.kneedle.kneedle` picks the first
+        confirmed knee).
+        """
+        scores = self.scores
+        index = np.expand_dims(self.index, -1)
+        others = scores.copy()
+        np.put_along_axis(others, index, -np.inf, axis=-1)
+        margin = np.take_along_axis(scores, index, axis=-1)[..., 0] - np.max(others, axis=-1)
+        return margin.item() if margin.ndim == 0 else margin
+
+    def top_k(self, k, min_separation=1):
+        """
+        The ``k`` best-scored points which are at least ``min_separation`` indices apart from each other.
+
+        The points are picked greedily by their score (non-maximum suppression): the best point is picked, all the
+        points closer than ``min_separation`` to it are discarded, and so on. The points which can't be scored (a score
+        of :math:`-\\infty` or NaN) are never picked, so there can be fewer than ``k`` knees.
+
+        Args:
+            k (``int``): the maximal number of knees
+            min_separation (``int``): the minimal distance between two knees, in indices (default: 1, i.e. no
+                suppression)
+
+        Returns:
+            ``np.ndarray``: the indices of the knees, the best first. For multiple curves, an array of shape
+            ``(..., k)`` padded with -1 where a curve has fewer than ``k`` knees.
+        """
+        assert k > 0 and min_separation >= 1
+        scores = np.where(np.isnan(self.scores), -np.inf, self.scores)
+        positions = np.arange(scores.shape[-1])
+        knees = np.full(scores.shape[:-1] + (k,), -1)
+        for i in range(k):
+            best = np.argmax(scores, axis=-1)
+            valid = np.take_along_axis(scores, best[..., np.newaxis], axis=-1)[..., 0] > -np.inf
+            knees[..., i] = np.where(valid, best, -1)
+            suppressed = np.abs(positions - best[..., np.newaxis]) < min_separation
+            scores = np.where(suppressed, -np.inf, scores)
+        return knees[knees >= 0] if knees.ndim == 1 else knees
+
+    def __index__(self):
+        return int(self.index)
+
+    def __repr__(self):
+        return f"KneeResult(index={self.index!r})"
+
+
+def _map_positions(scores, function):
+    # the score of the point i moves to the position function(i), separately for every curve
+    n = scores.shape[-1]
+    positions = np.broadcast_to(np.arange(n).reshape((n,) + (1,) * (scores.ndim - 1)), (n,) + scores.shape[:-1])
+    positions = np.moveaxis(np.asarray(function(positions)), 0, -1)
+    mapped = np.empty_like(scores)
+    np.put_along_axis(mapped, positions, scores, axis=-1)
+    return mapped
@@ -0,0 +1,29 @@
+from typing import Any, Callable, Tuple, TypeAlias, Union
+
+import numpy as np
+import numpy.typing as npt
+
+_Scores: TypeAlias = Union[npt.NDArray[np.float64], Callable[[], npt.NDArray[np.float64]]]
+
+class KneeResult:
+    index: Union[int, npt.NDArray[np.intp]]
+    _scores: _Scores
+    _mappings: Tuple[Callable[[Any], Any], ...]
+    _mapped_scores: Union[npt.NDArray[np.float64], None]
+    def __init__(
+        self,
+        index: Union[int, npt.NDArray[np.intp]],
+        scores: _Scores,
+        mappings: Tuple[Callable[[Any], Any], ...] = ...,
+    ) -> None: ...
+    def map_indices(self, function: Callable[[Any], Any]) -> KneeResult: ...
+    @property
+    def scores(self) -> npt.NDArray[np.float64]: ...
+    @property
+    def margin(self) -> Union[float, npt.NDArray[np.float64]]: ...
+    def top_k(self, k: int, min_separation: int = ...) -> npt.NDArray[np.intp]: ...
+    def __index__(self) -> int: ...
+
+def _map_positions(
+    scores: npt.NDArray[np.float64], function: Callable[[Any], Any]
+) -> npt.NDArray[np.float64]: ...
@@ -1,13 +1,61 @@
+import collections
+import contextlib
+import contextvars
 import enum
-from typing import Union
+import functools
+import hashlib
+import threading
+from typing import NamedTuple, Union
 
 import numpy as np
 import numpy.linalg as la
 import numpy.typing as npt
 
+from .kernels import (
+    get_backend,
+    kernel,
+    pentadiagonal_factors,
+    pentadiagonal_substitution,
+)
+from .profiling import count_copies, stage
+
 Number = Union[int, float]
 
 EPS = 1e-5
+SMOOTHING_CACHE_SIZE = 32
+
+
+def float_dtype(*arrays):
+    """
+    The floating point type the knee is computed in.
+
+    The computation runs in ``float32`` if all the inputs are ``float32`` (or smaller floating point types), otherwise
+    in ``float64``, the same as with the usual NumPy type promotion; the integers are promoted to ``float64``.
+
+    Args:
+        *arrays (``np.ndarray``): the inputs
+
+    Returns:
+        ``np.dtype``: ``float32`` or ``float64``
+    """
+    return np.result_type(np.float32, *(array.dtype for array in arrays))
+
+
+def eps(dtype):
+    """
+    The :obj:`EPS` regularization constant for the given floating point type.
+
+    :obj:`EPS` is used as is unless it is smaller than a few units in the last place of :math:`1` of the type, so it
+    never vanishes when added to the normalized values.
+
+    Args:
+        dtype (``np.dtype``): the floating point type
+
+    Returns:
+        ``np.floating``: the constant as a scalar of that type
+    """
+    dtype = np.dtype(dtype)
+    return dtype.type(max(EPS, 16 * float(np.finfo(dtype).eps)))
 
 
 def np_windowed(length: int, window_size: int, stride: int = 1, dilation: int = 1) -> np.ndarray:
@@ -43,86 +91,575 @@ def np_anchored(length: int) -> npt.NDArray[np.int_]:
         ``np.ndarray``: indices for windowing an array
 
     """
-    indices = list(range(1, length - 1))
-    first = [0] * len(indices)
-    last = [length - 1] * len(indices)
-    indices = np.stack((first, indices, last), axis=-1)
-    return indices
+    inner = np.arange(1, length - 1)
+    return np.stack((np.zeros_like(inner), inner, np.full_like(inner, length - 1)), axis=-1)
+
+
+def windowed_view(x, window_size, stride=1, dilation=1):
+    """
+    A strided view of the windows of an array, like ``x[..., np_windowed(n, window_size)]`` without any copy.
+
+    Nothing is allocated: neither the index matrix of :obj:`np_windowed` nor the gathered windows. The view must not be
+    written to, as the windows overlap. With a ``stride`` or a ``dilation``, every window which fits in the array is
+    included.
+
+    Args:
+        x (``np.ndarray``): the array, windowed along the last axis
+        window_size (``int``): the number of elements in a window
+        stride (``int``): the distance between the starts of the consecutive windows. Defaults to 1
+        dilation (``int``): the distance between the elements in the window. Defaults to 1
+
+    Returns:
+        ``np.ndarray``: a read-only view of shape ``(..., n_windows, window_size)``
+    """
+    span = (window_size - 1) * dilation + 1
+    return np.lib.stride_tricks.sliding_window_view(x, span, axis=-1)[..., ::stride, ::dilation]
+
+
+def successive_views(x, y, dilation=1):
+    """
+    The triplets of the successive points, as three views of the coordinates instead of an array of the triplets.
+
+    The ``i``-th triplet consists of the points ``i``, ``i + dilation`` and ``i + 2 * dilation``.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points, shape ``(..., n)``
+        y (``np.ndarray``): the :math:`y` coordinates of the points, shape ``(..., n)``
+        dilation (``int``): the distance between the points of a triplet. Defaults to 1
+
+    Returns:
+        :obj:`tuple`: the three vertices of the triplets, each a pair of views of shape ``(..., n - 2 * dilation)``
+    """
+    x_windows, y_windows = windowed_view(x, 3, dilation=dilation), windowed_view(y, 3, dilation=dilation)
+    return tuple((x_windows[..., i], y_windows[..., i]) for i in range(3))
+
+
+def anchored_views(x, y):
+    """
+    The triplets of the first point, every inner point and the last point, as three views of the coordinates.
+
+    The first and the last point are views of shape ``(..., 1)`` which broadcast against the inner points.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points, shape ``(..., n)``
+        y (``np.ndarray``): the :math:`y` coordinates of the points, shape ``(..., n)``
+
+    Returns:
+        :obj:`tuple`: the three vertices of the triplets, each a pair of views
+    """
+    return (x[..., :1], y[..., :1]), (x[..., 1:-1], y[..., 1:-1]), (x[..., -1:], y[..., -1:])
+
+
+def multiscale_views(x, y, dilations):
+    """
+    The triplets of the points around every point at multiple scales: the point, and its neighbours ``d`` points
+    before and after it, for every dilation ``d``.
+
+    The middle points are views, the outer points of all the scales are gathered at once from a strided view of the
+    windows around every point. Only the points with the neighbours at all the scales are included, i.e. the points
+    ``max(dilations)`` to ``n - max(dilations) - 1``.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points, shape ``(..., n)``
+        y (``np.ndarray``): the :math:`y` coordinates of the points, shape ``(..., n)``
+        dilations (``iterable`` of ``int``): the distances of the neighbours, the scales
+
+    Returns:
+        :obj:`tuple`: the three vertices of the triplets, each a pair of arrays which broadcast to the shape
+        ``(..., n - 2 * max(dilations), len(dilations))``
+    """
+    dilations = np.asarray(dilations)
+    assert dilations.ndim == 1 and len(dilations) > 0 and np.all(dilations >= 1)
+    reach = int(dilations.max())
+    assert x.shape[-1] > 2 * reach, "The curve is too short for the largest dilation"
+    x_windows, y_windows = windowed_view(x, 2 * reach + 1), windowed_view(y, 2 * reach + 1)
+    before, after = reach - dilations, reach + dilations
+    return (
+        (x_windows[..., before], y_windows[..., before]),
+        (x_windows[..., reach, np.newaxis], y_windows[..., reach, np.newaxis]),
+        (x_windows[..., after], y_windows[..., after]),
+    )
+
+
+AGGREGATES = {
+    "mean": np.mean,
+    "median": np.median,
+    "max": np.max,
+    "min": np.min,
+}
+
+
+def aggregate_scales(scores, aggregate="mean"):
+    """
+    Aggregate the scores of the points at multiple scales (see :obj:`multiscale_views`) into one score per point.
+
+    Args:
+        scores (``np.ndarray``): the scores, the scales along the last axis
+        aggregate (``str`` or ``callable``): one of :obj:`AGGREGATES`, or a function reducing an ``axis`` like
+            :obj:`np.mean` (default: ``mean``)
+
+    Returns:
+        ``np.ndarray``: the aggregated scores, without the last axis
+    """
+    function = AGGREGATES[aggregate] if isinstance(aggregate, str) else aggregate
+    return function(scores, axis=-1)
 
 
 def prepare(f):
+    """
+    Decorator preparing the input of a knee-finding function for a single curve.
+
+    The inputs are converted to arrays, sorted by :math:`x`, normalized to the unit square, optionally smoothed and
+    converted to the increasing concave knee type. The wrapped function receives ``x`` and ``y`` of the same shape
+    :math:`(n_{points},)` and the returned knee index is mapped back to the sorted input.
+
+    The inputs are never copied or modified: existing arrays (and their views) are read in place, and the only
+    full-size arrays allocated are the normalized :math:`x` and :math:`y`, which are then reflected in place. With
+    ``sort=False`` the inputs are trusted to be sorted by :math:`x` already, which also skips the sortedness check;
+    together this is the zero-copy fast path for the inputs which are known to be well-formed. The allocations are
+    counted in the active :obj:`knarrow.profiling.profile`.
+    """
+
+    @functools.wraps(f)
     def inner(*args, **kwargs):
-        assert 1 <= len(args) <= 2
-        if len(args) == 2:
-            x = np.array(args[0])
-            assert x.ndim == 1 and x.shape[0] > 3
-            y = np.array(args[1])
-            assert y.ndim == 1 and y.shape[0] > 3
-            assert x.shape == y.shape
-        elif len(args) == 1:
-            argument = np.array(args[0]).squeeze()  # squeeze ensures all dimensions are > 1
-            assert 1 <= argument.ndim <= 2
-            if argument.ndim == 1:
-                assert argument.shape[0] >= 3, "The input must have at least 3 points"
-                y = argument
-                x = np.arange(len(y))
-            elif argument.ndim == 2:
-                n_rows, n_cols = argument.shape
-                if n_rows > n_cols:
-                    argument = argument.T
-                assert argument.shape[1] >= 3, "The input must have at least 3 points"
-                x, y = argument[0], argument[1]
-        else:
-            raise ValueError("There can only be 1 or 2 positional arguments passed to the function")
+        with stage("prepare.convert"):
+            assert 1 <= len(args) <= 2
+            if len(args) == 2:
+                x = np.asarray(args[0])
+                assert x.ndim == 1 and x.shape[0] > 3
+                y = np.asarray(args[1])
+                assert y.ndim == 1 and y.shape[0] > 3
+                assert x.shape == y.shape
+                dtype = float_dtype(x, y)
+                count_copies(x, y, inputs=args)
+            elif len(args) == 1:
+                argument = np.asarray(args[0])
+                count_copies(argument, inputs=args)
+                argument = argument.squeeze()  # squeeze ensures all dimensions are > 1
+                assert 1 <= argument.ndim <= 2
+                dtype = float_dtype(argument)  # the generated x doesn't affect the precision
+                if argument.ndim == 1:
+                    assert argument.shape[0] >= 3, "The input must have at least 3 points"
+                    y = argument
+                    x = np.arange(len(y))
+                    count_copies(x)
+                elif argument.ndim == 2:
+                    n_rows, n_cols = argument.shape
+                    if n_rows > n_cols:
+                        argument = argument.T
+                    assert argument.shape[1] >= 3, "The input must have at least 3 points"
+                    x, y = argument[0], argument[1]
+            else:
+                raise ValueError("There can only be 1 or 2 positional arguments passed to the function")
 
         # more or less all the algorithms depend on the inputs to be sorted, at least in the x dimension
         # therefore the x and y are sorted together
         # the user should explicitly disallow sorting
         perform_sort = kwargs.pop("sort", True)
-        if perform_sort and not np.all(np.diff(x) > 0):
-            sorted_indices = np.argsort(x)  # sort in the ascending way
-            x = x[sorted_indices]
-            y = y[sorted_indices]
-            assert np.all(np.diff(x))
+        with stage("prepare.sort"):
+            if perform_sort:
+                differences = np.diff(x)
+                increasing = differences > 0
+                count_copies(differences, increasing)
+                if not np.all(increasing):
+                    sorted_indices = np.argsort(x)  # sort in the ascending way
+                    x = x[sorted_indices]
+                    y = y[sorted_indices]
+                    differences = np.diff(x)
+                    assert np.all(differences)
+                    count_copies(sorted_indices, x, y, differences)
         # all the methods should work no matter the scale of the data
         # therefore the input 2D space is transformed in [0, 1]x[0, 1] square
-        x = normalize(x)
-        y = normalize(y)
+        # float32 inputs stay float32 from here on, which halves the memory of all the temporaries of the methods
+        # the normalized arrays are the only copies of the input, everything after this modifies them in place
+        with stage("prepare.normalize"):
+            x = normalize(x, dtype)
+            y = normalize(y, dtype)
+            count_copies(x, y)
 
         # optionally smooth out the data using cubic splines (custom implementation, no external libs)
         smoothing = kwargs.pop("smoothing", 0.0)
         assert smoothing >= 0.0
         if smoothing > 0:
-            x, y = cubic_spline_smoothing(x, y, smoothing)
+            with stage("prepare.smoothing"):
+                x, y = cubic_spline_smoothing(x, y, smoothing)
 
         # knee type detection and conversion to a standard type KneeType.INCREASING_CONCAVE
-        knee_type = detect_knee_type(y[0], y[1], y[-2], y[-1])
-        if knee_type == KneeType.INCREASING_CONCAVE:
+        with stage("prepare.knee_type"):
+            knee_type = detect_knee_type(y[0], y[1], y[-2], y[-1])
+            if knee_type == KneeType.DECREASING_CONVEX:
+                y = np.subtract(1, y, out=y)
+            elif knee_type == KneeType.INCREASING_CONVEX:
+                y = np.subtract(1, y[::-1], out=y[::-1])
+            elif knee_type == KneeType.DECREASING_CONCAVE:
+                y = y[::-1]
+        if knee_type in (KneeType.INCREASING_CONCAVE, KneeType.DECREASING_CONVEX):
             return f(x, y, **kwargs)
-        elif knee_type == KneeType.DECREASING_CONVEX:
-            return f(x, 1 - y, **kwargs)
-        elif knee_type == KneeType.INCREASING_CONVEX:
-            return len(x) - f(x, 1 - y[::-1], **kwargs) - 1
-        elif knee_type == KneeType.DECREASING_CONCAVE:
-            return len(x) - f(x, y[::-1], **kwargs) - 1
+        return map_indices(f(x, y, **kwargs), lambda knee: len(x) - knee - 1)
 
     return inner
 
 
-def normalize(x):
+def prepare_batch(f):
+    """
+    The batched counterpart of :obj:`prepare`.
+
+    Accepts either a single :math:`(n_{curves}, n_{points})` array of :math:`y` values, or the :math:`x` coordinates
+    (shared by all the curves with shape :math:`(n_{points},)`, or one row per curve) followed by the :math:`y` values.
+    Sorting, normalization, smoothing and the knee type conversion are the same as in :obj:`prepare`, only performed
+    along the last axis for all the curves at once. The wrapped function receives ``x`` and ``y`` of the same
+    :math:`(n_{curves}, n_{points})` shape and must return an array of knee indices, one per curve.
+    """
+
+    @functools.wraps(f)
+    def inner(*args, **kwargs):
+        with stage("prepare.convert"):
+            if len(args) == 1:
+                y = np.asarray(args[0])
+                assert y.ndim == 2 and y.shape[1] >= 3, "The input must be of shape (n_curves, n_points), n_points >= 3"
+                x = np.arange(y.shape[1])
+                dtype = float_dtype(y)
+            elif len(args) == 2:
+                x = np.asarray(args[0])
+                y = np.asarray(args[1])
+                assert y.ndim == 2 and y.shape[1] > 3
+                assert x.shape in (y.shape, y.shape[1:])
+                dtype = float_dtype(x, y)
+            else:
+                raise ValueError("There can only be 1 or 2 positional arguments passed to the function")
+            count_copies(x, y, inputs=args)
+
+        perform_sort = kwargs.pop("sort", True)
+        with stage("prepare.sort"):
+            if perform_sort:
+                differences = np.diff(x, axis=-1)
+                increasing = differences > 0
+                count_copies(differences, increasing)
+                if not np.all(increasing):
+                    sorted_indices = np.argsort(x, axis=-1)
+                    x = np.take_along_axis(x, sorted_indices, axis=-1)
+                    y = np.take_along_axis(y, np.broadcast_to(sorted_indices, y.shape), axis=-1)
+                    differences = np.diff(x, axis=-1)
+                    assert np.all(differences)
+                    count_copies(sorted_indices, x, y, differences)
+        with stage("prepare.normalize"):
+            x = normalize(x, dtype)
+            y = normalize(y, dtype)
+            count_copies(x, y)
+
+        smoothing = kwargs.pop("smoothing", 0.0)
+        assert smoothing >= 0.0
+        if smoothing > 0:
+            with stage("prepare.smoothing"):
+                if x.ndim == 1:
+                    x, y = cubic_spline_smoothing(x, y, smoothing)
+                else:
+                    y = np.stack([cubic_spline_smoothing(x_row, y_row, smoothing)[1] for x_row, y_row in zip(x, y)])
+                    count_copies(y)
+
+        # the same conversion to KneeType.INCREASING_CONCAVE as in `prepare`, just with a mask per knee type
+        with stage("prepare.knee_type"):
+            knee_types = knee_type_codes(y[:, 0], y[:, 1], y[:, -2], y[:, -1])
+            flipped = np.isin(knee_types, (KneeType.DECREASING_CONVEX.value, KneeType.INCREASING_CONVEX.value))
+            reversed_ = np.isin(knee_types, (KneeType.DECREASING_CONCAVE.value, KneeType.INCREASING_CONVEX.value))
+            np.subtract(1, y, out=y, where=flipped[:, np.newaxis])
+            if reversed_.any():
+                y[reversed_] = y[reversed_, ::-1]
+        knees = f(np.broadcast_to(x, y.shape), y, **kwargs)
+        return map_indices(knees, lambda knee: np.where(reversed_, y.shape[1] - knee - 1, knee))
+
+    return inner
+
+
+def prepare_segments(f):
+    """
+    The counterpart of :obj:`prepare` for many curves of different lengths stored one after another in flat arrays.
+
+    Accepts the flat :math:`x` and :math:`y` coordinates of all the curves followed by the offsets of the curves, like
+    the Arrow list arrays: the :math:`i`-th curve is ``x[offsets[i]:offsets[i + 1]]``. Anything with the buffer
+    protocol (or ``__array__``) is read in place. Sorting, normalization, smoothing and the knee type conversion are
+    the same as in :obj:`prepare`, applied to every segment with vectorized operations over the flat arrays, so there
+    are no per-curve Python objects; only the smoothing is solved curve by curve. The wrapped function receives the
+    prepared flat ``x`` and ``y`` and the offsets starting from 0, and must return an array of knee indices, one per
+    curve, relative to the start of the curve.
+    """
+
+    @functools.wraps(f)
+    def inner(x, y, offsets, **kwargs):
+        with stage("prepare.convert"):
+            offsets = np.asarray(offsets)
+            assert offsets.ndim == 1 and len(offsets) >= 2 and np.issubdtype(offsets.dtype, np.integer)
+            # the offsets of a sliced Arrow array don't start at 0, the coordinates outside of the curves are ignored
+            start, stop = offsets[0], offsets[-1]
+            arrays = np.asarray(x), np.asarray(y)
+            count_copies(*arrays, inputs=(x, y))
+            x, y = (array[start:stop] for array in arrays)
+            offsets = offsets - start
+            lengths = np.diff(offsets)
+            assert x.ndim == 1 and x.shape == y.shape and len(x) == offsets[-1]
+            assert np.all(lengths > 3), "Every curve must have more than 3 points"
+            dtype = float_dtype(x, y)
+            starts, ends = offsets[:-1], offsets[1:]
+            segments = np.repeat(np.arange(len(lengths)), lengths)  # the curve of every point
+            count_copies(segments)
+
+        perform_sort = kwargs.pop("sort", True)
+        with stage("prepare.sort"):
+            if perform_sort:
+                differences = np.diff(x)
+                increasing = differences > 0
+                increasing[ends[:-1] - 1] = True  # the last point of a curve and the first of the next one
+                count_copies(differences, increasing)
+                if not np.all(increasing):
+                    sorted_indices = np.lexsort((x, segments))
+                    x = x[sorted_indices]
+                    y = y[sorted_indices]
+                    differences = np.diff(x)
+                    increasing = differences != 0
+                    increasing[ends[:-1] - 1] = True
+                    assert np.all(increasing)
+                    count_copies(sorted_indices, x, y, differences, increasing)
+        with stage("prepare.normalize"):
+            x = _normalize_segments(x, starts, lengths, dtype)
+            y = _normalize_segments(y, starts, lengths, dtype)
+            count_copies(x, y)
+
+        smoothing = kwargs.pop("smoothing", 0.0)
+        assert smoothing >= 0.0
+        if smoothing > 0:
+            with stage("prepare.smoothing"):
+                for start, end in zip(starts.tolist(), ends.tolist()):
+                    x[start:end], y[start:end] = cubic_spline_smoothing(x[start:end], y[start:end], smoothing)
+
+        # the same conversion to KneeType.INCREASING_CONCAVE as in `prepare`, the reversal is a permutation of points
+        with stage("prepare.knee_type"):
+            knee_types = knee_type_codes(y[starts], y[starts + 1], y[ends - 2], y[ends - 1])
+            flipped = np.isin(knee_types, (KneeType.DECREASING_CONVEX.value, KneeType.INCREASING_CONVEX.value))
+            reversed_ = np.isin(knee_types, (KneeType.DECREASING_CONCAVE.value, KneeType.INCREASING_CONVEX.value))
+            np.subtract(1, y, out=y, where=np.repeat(flipped, lengths))
+            if reversed_.any():
+                positions = np.flatnonzero(np.repeat(reversed_, lengths))
+                y[positions] = y[(starts + ends - 1)[segments[positions]] - positions]
+        knees = f(x, y, offsets, **kwargs)
+        return np.where(reversed_, lengths - knees - 1, knees)
+
+    return inner
+
+
+def _normalize_segments(x, starts, lengths, dtype):
+    # the same as normalize for every segment, the minimum and the range of each segment are spread over its points
+    x_min = np.minimum.reduceat(x, starts)
+    normalized = np.subtract(x, np.repeat(x_min, lengths), dtype=dtype)
+    return np.divide(normalized, np.repeat(np.maximum.reduceat(x, starts) - x_min, lengths), out=normalized)
+
+
+def map_indices(result, function):
+    """
+    Apply a function to the knee indices contained in the result of a knee-finding function.
+
+    Used by :obj:`prepare` to map the indices back after the knee type conversion. The result is either the index
+    (or an array of indices) itself, or an object with a ``map_indices`` method which returns a new object with all the
+    indices it holds mapped by the given function.
+
+    Args:
+        result: the result of a knee-finding function
+        function (``callable``): the mapping of the indices
+
+    Returns:
+        the result with the mapped indices
+    """
+    if hasattr(result, "map_indices"):
+        return result.map_indices(function)
+    return function(result)
+
+
+_SHARED_INTERMEDIATES = contextvars.ContextVar("shared_intermediates", default=None)
+
+
+class SharedIntermediates:
+    """
+    The storage for the intermediate arrays computed from the same curve by multiple knee-finding methods.
+
+    Every intermediate is computed at most once, even if the methods run in multiple threads.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+    """
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self._values = {}
+        self._locks = {}
+
+    def get(self, function):
+        lock = self._locks.setdefault(function, threading.Lock())
+        with lock:
+            if function not in self._values:
+                self._values[function] = function(self.x, self.y)
+        return self._values[function]
+
+
+@contextlib.contextmanager
+def shared_intermediates(x, y):
+    """
+    Context manager in which the intermediates (the functions decorated with :obj:`intermediate`) of the given curve
+    are computed only once and shared between the knee-finding methods.
+
+    The scope is bound to the current :obj:`contextvars.Context`, so the methods running in other threads share the
+    intermediates only if they run in a copy of this context, e.g. with :obj:`contextvars.copy_context`.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+
+    Yields:
+        :obj:`SharedIntermediates`: the storage of the intermediates
+    """
+    storage = SharedIntermediates(x, y)
+    token = _SHARED_INTERMEDIATES.set(storage)
+    try:
+        yield storage
+    finally:
+        _SHARED_INTERMEDIATES.reset(token)
+
+
+def intermediate(function):
+    """
+    Decorator for the functions computing an intermediate array from the whole curve.
+
+    Inside :obj:`shared_intermediates` the result for that very curve is computed once and then reused, otherwise the
+    function is simply called.
+
+    Args:
+        function (``callable``): function of ``x`` and ``y``
+
+    Returns:
+        ``callable``: the decorated function
+    """
+
+    @functools.wraps(function)
+    def inner(x, y):
+        storage = _SHARED_INTERMEDIATES.get()
+        if storage is None or storage.x is not x or storage.y is not y:
+            return function(x, y)
+        return storage.get(function)
+
+    return inner
+
+
+@intermediate
+def differences(x, y):
+    """
+    Returns the differences between the consecutive points.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+
+    Returns:
+        :obj:`tuple` of ``np.ndarray``: the differences of :math:`x` and :math:`y`
+    """
+    return np.diff(x), np.diff(y)
+
+
+@intermediate
+def residuals(x, y):
+    """
+    Returns the differences of the points from the line :math:`y=x`.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points
+
+    Returns:
+        ``np.ndarray``: :math:`y - x`
+    """
+    return y - x
+
+
+@intermediate
+def successive_points(x, y):
+    """
+    Returns all the triplets of the successive points.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points, shape ``(..., n)``
+        y (``np.ndarray``): the :math:`y` coordinates of the points, shape ``(..., n)``
+
+    Returns:
+        ``np.ndarray``: the triplets, shape ``(..., n - 2, 3, 2)``
+    """
+    return np.stack((windowed_view(x, 3), windowed_view(y, 3)), axis=-1)
+
+
+@intermediate
+def anchored_points(x, y):
+    """
+    Returns the triplets of the first point, every inner point and the last point.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points, shape ``(..., n)``
+        y (``np.ndarray``): the :math:`y` coordinates of the points, shape ``(..., n)``
+
+    Returns:
+        ``np.ndarray``: the triplets, shape ``(..., n - 2, 3, 2)``
+    """
+    indices = np_anchored(x.shape[-1])
+    return np.stack((x[..., indices], y[..., indices]), axis=-1)
+
+
+def pad_scores(scores, before=1, after=1):
+    """
+    Pad the scores of the inner points with :math:`-\\infty` to get exactly one score per point.
+
+    Args:
+        scores (``np.ndarray``): the scores, shape ``(..., n - before - after)``
+        before (``int``): the number of the leading points without a score
+        after (``int``): the number of the trailing points without a score
+
+    Returns:
+        ``np.ndarray``: the scores of all the points, shape ``(..., n)``
+    """
+    padding = [(0, 0)] * (scores.ndim - 1) + [(before, after)]
+    return np.pad(scores, padding, constant_values=-np.inf)
+
+
+def as_index(indices):
+    """
+    Helper function for returning the knee indices from the methods.
+
+    Args:
+        indices (``np.ndarray``): the indices of the knees, one per curve
+
+    Returns:
+        ``int`` if there is only a single curve, otherwise the ``np.ndarray`` of indices
+    """
+    return indices.item() if np.ndim(indices) == 0 else indices
+
+
+def normalize(x, dtype=None):
     """
     Helper function for normalizing the inputs.
 
     Normalization is an affine transformation such that the minimal element of x maps to 0, and maximal element of x
-    maps to 1
+    maps to 1. Multidimensional arrays are normalized along the last axis. The result is computed in a single new
+    array, the input is left untouched.
 
     Args:
         x (``np.ndarray``): the array to be normalized
+        dtype (``np.dtype``, optional): the floating point type of the result (default: the type of ``x`` if it is a
+            floating point type, otherwise ``float64``)
 
     Returns:
          ``np.ndarray``: a normalized array such that the minimum is 0 and the maximum is 1
     """
-    return (x - x.min()) / (x.max() - x.min())
+    if dtype is None:
+        dtype = x.dtype if np.issubdtype(x.dtype, np.floating) else np.float64
+    x_min = x.min(axis=-1, keepdims=True)
+    normalized = np.subtract(x, x_min, dtype=dtype)
+    return np.divide(normalized, x.max(axis=-1, keepdims=True) - x_min, out=normalized)
 
 
 def get_delta_matrix(h):
@@ -173,13 +710,263 @@ def get_weight_matrix(h):
     return out
 
 
+def get_delta_bands(h):
+    """
+    Returns the non-zero diagonals of the :math:`\\Delta` matrix (see :obj:`get_delta_matrix`).
+
+    Args:
+        h (``np.ndarray``): the differences vector
+
+    Returns:
+        :obj:`tuple` of ``np.ndarray``: the entries :math:`\\Delta_{i,i}`, :math:`\\Delta_{i,i+1}` and
+        :math:`\\Delta_{i,i+2}`
+    """
+    assert h.ndim == 1
+    inverse = 1 / h
+    return inverse[:-1], -inverse[:-1] - inverse[1:], inverse[1:]
+
+
+def get_weight_bands(h):
+    """
+    Returns the non-zero diagonals of the (symmetric) weight matrix :math:`W` (see :obj:`get_weight_matrix`).
+
+    Args:
+        h (``np.ndarray``): the differences vector
+
+    Returns:
+        :obj:`tuple` of ``np.ndarray``: the main and the upper diagonal of :math:`W`
+    """
+    assert h.ndim == 1
+    return (h[:-1] + h[1:]) / 3.0, h[1:-1] / 6.0
+
+
+def factorize_pentadiagonal(d0, d1, d2):
+    """
+    Computes the :math:`LDL^T` factorization of a symmetric positive definite pentadiagonal matrix in linear time.
+
+    :math:`L` is a unit lower triangular matrix with two non-zero subdiagonals, and :math:`D` is diagonal.
+
+    Args:
+        d0 (``np.ndarray``): the main diagonal, length :math:`m`
+        d1 (``np.ndarray``): the first upper diagonal, length :math:`m-1`
+        d2 (``np.ndarray``): the second upper diagonal, length :math:`m-2`
+
+    Returns:
+        :obj:`tuple`: the diagonal of :math:`D` and the two subdiagonals of :math:`L`, as arrays with the ``numba``
+        backend of ``smoothing`` (see :obj:`knarrow.kernels.set_backend`), otherwise as lists
+    """
+    if get_backend("smoothing") == "numba":
+        m = len(d0)
+        factors = np.empty(m), np.empty(max(m - 1, 0)), np.empty(max(m - 2, 0))
+        kernel(pentadiagonal_factors)(*(np.asarray(diagonal, dtype=np.float64) for diagonal in (d0, d1, d2)), *factors)
+        return factors
+    # the fallback loop, python floats are way faster than numpy scalars in loops
+    d0, d1, d2 = d0.tolist(), d1.tolist(), d2.tolist()
+    m = len(d0)
+    d = [0.0] * m
+    l1 = [0.0] * max(m - 1, 0)
+    l2 = [0.0] * max(m - 2, 0)
+    for i in range(m):
+        pivot = d0[i]
+        if i >= 1:
+            pivot -= l1[i - 1] * l1[i - 1] * d[i - 1]
+        if i >= 2:
+            pivot -= l2[i - 2] * l2[i - 2] * d[i - 2]
+        d[i] = pivot
+        if i < m - 1:
+            off_diagonal = d1[i]
+            if i >= 1:
+                off_diagonal -= l2[i - 1] * l1[i - 1] * d[i - 1]
+            l1[i] = off_diagonal / pivot
+        if i < m - 2:
+            l2[i] = d2[i] / pivot
+    return d, l1, l2
+
+
+def solve_pentadiagonal(factors, rhs):
+    """
+    Solves the pentadiagonal system factorized with :obj:`factorize_pentadiagonal` by forward and back substitution.
+
+    Args:
+        factors (``tuple``): the output of :obj:`factorize_pentadiagonal`
+        rhs (``np.ndarray``): the right hand side, shape ``(..., m)``. Multiple right hand sides are solved at once.
+
+    Returns:
+        ``np.ndarray``: the solution, the same shape as ``rhs``
+    """
+    d, l1, l2 = factors
+    m = len(d)
+    if get_backend("smoothing") == "numba":
+        # the factors may come from the other backend through the cache
+        d, l1, l2 = (np.asarray(factor, dtype=np.float64) for factor in factors)
+        z = np.array(rhs, dtype=np.float64)
+        kernel(pentadiagonal_substitution)(d, l1, l2, z.reshape(-1, m))
+        return z
+    # a single right hand side is a list of python floats, many of them are rows of shape (...)
+    z = rhs.tolist() if rhs.ndim == 1 else list(np.moveaxis(rhs, -1, 0))
+    for i in range(1, m):
+        z[i] = z[i] - l1[i - 1] * z[i - 1]
+        if i >= 2:
+            z[i] = z[i] - l2[i - 2] * z[i - 2]
+    for i in range(m):
+        z[i] = z[i] / d[i]
+    for i in range(m - 2, -1, -1):
+        z[i] = z[i] - l1[i] * z[i + 1]
+        if i < m - 2:
+            z[i] = z[i] - l2[i] * z[i + 2]
+    return np.moveaxis(np.array(z, dtype=float).reshape((m,) + rhs.shape[:-1]), 0, -1)
+
+
 def cubic_spline_smoothing(x, y, smoothing_factor=0):
     """
     Smoothes the :math:`y` vecetor by minimizing the second derivative.
 
+    The smoothed values :math:`g` solve :math:`\\left(I + \\lambda \\Delta^T W^{-1} \\Delta\\right) g = y`. Instead
+    of the dense matrices, Reinsch's algorithm is used: :math:`\\gamma` is found from the pentadiagonal system
+    :math:`\\left(W + \\lambda \\Delta \\Delta^T\\right) \\gamma = \\Delta y` and then
+    :math:`g = y - \\lambda \\Delta^T \\gamma`. Both time and memory are linear in the number of points.
+
+    The system depends only on :math:`x` and the smoothing factor, so its factorization is kept in
+    :obj:`SMOOTHING_CACHE`: smoothing another :math:`y` on a known grid is just the forward and back substitution.
+
     Args:
         x (``np.ndarray``): the :math:`x` coordinates of the points
-        y (``np.ndarray``): the :math:`y` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points, possibly many curves of shape ``(..., len(x))``
+        smoothing_factor (``float``): the cubic spline smoothing hyperparameter
+
+    Returns:
+        :obj:`tuple` of ``np.ndarray``: the :math:`x` and :math:`y` coordinates of the smoothed points, :math:`y` in
+        the same floating point type as the input
+    """
+    # the system is badly conditioned for dense points (the bands grow as 1/h^2), so it is always solved in float64
+    dtype = float_dtype(x, y)
+    y_float = np.asarray(y, dtype=np.float64)
+    (lower, middle, upper), factors = SMOOTHING_CACHE.get(x, smoothing_factor)
+    right = lower * y_float[..., :-2] + middle * y_float[..., 1:-1] + upper * y_float[..., 2:]
+    gamma = solve_pentadiagonal(factors, right)
+    correction = np.zeros(y_float.shape)  # delta.T @ gamma
+    correction[..., :-2] += lower * gamma
+    correction[..., 1:-1] += middle * gamma
+    correction[..., 2:] += upper * gamma
+    smoothed = (y_float - smoothing_factor * correction).astype(dtype, copy=False)
+    count_copies(y_float, right, gamma, correction, smoothed, inputs=(y,))
+    return x, smoothed
+
+
+def smoothing_operator(x, smoothing_factor):
+    """
+    Builds and factorizes the pentadiagonal system of :obj:`cubic_spline_smoothing` for the given grid.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points, in ``float64``
+        smoothing_factor (``float``): the cubic spline smoothing hyperparameter
+
+    Returns:
+        :obj:`tuple`: the three bands of the :math:`\\Delta` matrix (see :obj:`get_delta_bands`) and the factors of
+        the system (see :obj:`factorize_pentadiagonal`)
+    """
+    h = np.diff(x)
+    lower, middle, upper = get_delta_bands(h)  # row i of delta has these three entries at columns i, i+1 and i+2
+    weight_diagonal, weight_off_diagonal = get_weight_bands(h)
+    factors = factorize_pentadiagonal(
+        weight_diagonal + smoothing_factor * (lower**2 + middle**2 + upper**2),
+        weight_off_diagonal + smoothing_factor * (middle[:-1] * lower[1:] + upper[:-1] * middle[1:]),
+        smoothing_factor * upper[:-2] * lower[2:],
+    )
+    return (lower, middle, upper), factors
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class SmoothingCache:
+    """
+    A bounded cache of the factorized smoothing systems (see :obj:`smoothing_operator`) with LRU eviction.
+
+    The entries are keyed by a digest of the :math:`x` grid and the smoothing factor. A hit is confirmed by comparing
+    the whole grid, so a collision of the digests can never return a wrong factorization. The cache is thread-safe.
+
+    Args:
+        maxsize (``int``): the maximal number of the factorizations kept, 0 disables the cache
+    """
+
+    def __init__(self, maxsize=SMOOTHING_CACHE_SIZE):
+        assert maxsize >= 0
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, x, smoothing_factor):
+        """
+        Returns the factorized system for the grid, building it on a miss.
+
+        Args:
+            x (``np.ndarray``): the :math:`x` coordinates of the points
+            smoothing_factor (``float``): the cubic spline smoothing hyperparameter
+
+        Returns:
+            :obj:`tuple`: the output of :obj:`smoothing_operator`
+        """
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        key = hashlib.blake2b(x, digest_size=16).digest(), len(x), float(smoothing_factor)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and np.array_equal(entry[0], x):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        operator = smoothing_operator(x, smoothing_factor)
+        with self._lock:
+            if self.maxsize > 0:
+                self._entries[key] = (x.copy(), operator)  # the caller may modify its grid later
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return operator
+
+    def clear(self):
+        """
+        Removes all the entries and resets the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """
+        Returns:
+            :obj:`CacheInfo`: the hits, the misses, the maximal and the current size, as :obj:`functools.lru_cache`
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+SMOOTHING_CACHE = SmoothingCache()
+
+
+def clear_smoothing_cache():
+    """
+    Removes all the factorizations from :obj:`SMOOTHING_CACHE`, e.g. to release the memory after a batch job.
+    """
+    SMOOTHING_CACHE.clear()
+
+
+def cubic_spline_smoothing_dense(x, y, smoothing_factor=0):
+    """
+    The reference implementation of :obj:`cubic_spline_smoothing` with dense matrices.
+
+    Needs :math:`O(n^3)` time and :math:`O(n^2)` memory, so it is only kept for testing.
+
+    Args:
+        x (``np.ndarray``): the :math:`x` coordinates of the points
+        y (``np.ndarray``): the :math:`y` coordinates of the points, possibly many curves of shape ``(..., len(x))``
         smoothing_factor (``float``): the cubic spline smoothing hyperparameter
 
     Returns:
@@ -190,8 +977,10 @@ def cubic_spline_smoothing(x, y, smoothing_factor=0):
     weight = get_weight_matrix(h)
     # equivalent to 'delta.T @ np.inv(weight) @ delta', just both numerically more stable and faster
     matrix = delta.T @ la.solve(weight, delta)
-    smoothed_y = la.solve(np.identity(len(y)) + smoothing_factor * matrix, y)
-    return x, smoothed_y
+    # all the curves sharing the same x are smoothed at once, as the columns of the right hand side
+    n = y.shape[-1]
+    smoothed_y = la.solve(np.identity(n) + smoothing_factor * matrix, y.reshape(-1, n).T).T
+    return x, smoothed_y.reshape(y.shape)
 
 
 def projection_distance(vertices):
@@ -211,11 +1000,36 @@ def projection_distance(vertices):
     # vertices is of shape (..., 2, 2)
     assert vertices.ndim >= 2
     assert vertices.shape[-2:] == (2, 2)
-    determinants = np.abs(la.det(vertices))  # this is of shape (...), the last two are not existent anymore
-    vectors = vertices[..., 1, :]  # select the second row of all the matrices. this is of shape (..., 2)
-    lengths = la.norm(vectors, ord=2, axis=-1)  # this is of shape (...)
-    distances = determinants / (lengths + EPS)
-    return distances
+    if vertices.ndim == 2:
+        return projection_distance(vertices[np.newaxis])[0]
+    return projection_distance_components(
+        (vertices[..., 0, 0], vertices[..., 0, 1]), (vertices[..., 1, 0], vertices[..., 1, 1])
+    )
+
+
+def projection_distance_components(point, vector):
+    """
+    :obj:`projection_distance` with the coordinates given separately, e.g. as views from :obj:`successive_views`.
+
+    The determinants and the norms are computed in the closed form, elementwise on the coordinates.
+
+    Args:
+        point (:obj:`tuple` of ``np.ndarray``): the :math:`x` and :math:`y` coordinates of the points to project
+        vector (:obj:`tuple` of ``np.ndarray``): the :math:`x` and :math:`y` coordinates of the vectors defining the
+            lines through the origin
+
+    Returns:
+        ``np.ndarray``: the distances of the points from the lines
+    """
+    (p_x, p_y), (v_x, v_y) = point, vector
+    determinants = p_x * v_y
+    determinants -= p_y * v_x
+    np.abs(determinants, out=determinants)
+    lengths = v_x * v_x
+    lengths += v_y * v_y
+    np.sqrt(lengths, out=lengths)
+    lengths += eps(lengths.dtype)
+    return np.divide(determinants, lengths, out=determinants)
 
 
 class KneeType(enum.Enum):
@@ -240,7 +1054,22 @@ def detect_knee_type(y1, y2, y3, y4):
     Returns:
         :obj:`KneeType`: the type of the knee detected
     """
+    return KneeType(int(knee_type_codes(y1, y2, y3, y4)))
+
+
+def knee_type_codes(y1, y2, y3, y4):
+    """
+    Vectorized version of :obj:`detect_knee_type`, returning the values of :obj:`KneeType` instead of the members.
+
+    Args:
+        y1 (``np.ndarray``): the :math:`y` coordinates of the first points
+        y2 (``np.ndarray``): the :math:`y` coordinates of the second points
+        y3 (``np.ndarray``): the :math:`y` coordinates of the second-to-last points
+        y4 (``np.ndarray``): the :math:`y` coordinates of the last points
+
+    Returns:
+        ``np.ndarray``: the values of the knee types detected
+    """
     is_increasing = y3 > y2  # all the points are increasing
-    is_exploding = abs(y4 - y3) > abs(y2 - y1)  # the magnitude of the increase is itself increasing #meta
-    type_code = int(is_exploding) * 2 + int(is_increasing)
-    return KneeType(type_code)
+    is_exploding = np.abs(y4 - y3) > np.abs(y2 - y1)  # the magnitude of the increase is itself increasing #meta
+    return np.asarray(is_exploding, dtype=int) * 2 + np.asarray(is_increasing, dtype=int)
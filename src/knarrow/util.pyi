@@ -1,23 +1,130 @@
+import collections
+import contextlib
 import enum
-from typing import Callable, Tuple
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeAlias,
+    TypeVar,
+    Union,
+)
 
 import numpy as np
 import numpy.typing as npt
 
+_T = TypeVar("_T")
+
+EPS: float
+SMOOTHING_CACHE_SIZE: int
+AGGREGATES: Dict[str, Callable[..., npt.NDArray[np.float64]]]
+
 class KneeType(enum.Enum):
     DECREASING_CONVEX = 0
     INCREASING_CONCAVE = 1
     DECREASING_CONCAVE = 2
     INCREASING_CONVEX = 3
 
+def float_dtype(*arrays: npt.NDArray[Any]) -> np.dtype[np.floating[Any]]: ...
+def eps(dtype: npt.DTypeLike) -> np.floating[Any]: ...
 def np_windowed(length: int, window_size: int, stride: int = 1, dilation: int = 1) -> npt.NDArray[np.intp]: ...
 def np_anchored(length: int) -> npt.NDArray[np.intp]: ...
+def windowed_view(
+    x: npt.NDArray[Any], window_size: int, stride: int = ..., dilation: int = ...
+) -> npt.NDArray[Any]: ...
+def successive_views(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], dilation: int = ...
+) -> Tuple[Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]], ...]: ...
+def anchored_views(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+) -> Tuple[Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]], ...]: ...
+def multiscale_views(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], dilations: Iterable[int]
+) -> Tuple[Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]], ...]: ...
+def aggregate_scales(
+    scores: npt.NDArray[np.float64], aggregate: Union[str, Callable[..., npt.NDArray[np.float64]]] = ...
+) -> npt.NDArray[np.float64]: ...
 def prepare(f: Callable[..., int]) -> Callable[..., int]: ...
-def normalize(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def prepare_batch(f: Callable[..., npt.NDArray[np.intp]]) -> Callable[..., npt.NDArray[np.intp]]: ...
+def prepare_segments(f: Callable[..., npt.NDArray[np.intp]]) -> Callable[..., npt.NDArray[np.intp]]: ...
+def pad_scores(scores: npt.NDArray[np.float64], before: int = ..., after: int = ...) -> npt.NDArray[np.float64]: ...
+def map_indices(result: Any, function: Callable[[Any], Any]) -> Any: ...
+
+class SharedIntermediates:
+    x: npt.NDArray[np.float64]
+    y: npt.NDArray[np.float64]
+    def __init__(self, x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]) -> None: ...
+    def get(self, function: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], _T]) -> _T: ...
+
+def shared_intermediates(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+) -> contextlib.AbstractContextManager[SharedIntermediates]: ...
+def intermediate(
+    function: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], _T],
+) -> Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], _T]: ...
+def differences(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: ...
+def residuals(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def successive_points(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def anchored_points(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def as_index(indices: npt.NDArray[np.intp] | np.intp) -> int | npt.NDArray[np.intp]: ...
+def normalize(x: npt.NDArray[Any], dtype: Optional[npt.DTypeLike] = ...) -> npt.NDArray[np.floating[Any]]: ...
 def get_delta_matrix(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
 def get_weight_matrix(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def get_delta_bands(
+    h: npt.NDArray[np.float64],
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]: ...
+def get_weight_bands(h: npt.NDArray[np.float64]) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: ...
+def factorize_pentadiagonal(
+    d0: npt.NDArray[np.float64], d1: npt.NDArray[np.float64], d2: npt.NDArray[np.float64]
+) -> Tuple[List[float], List[float], List[float]]: ...
+def solve_pentadiagonal(
+    factors: Tuple[List[float], List[float], List[float]], rhs: npt.NDArray[np.float64]
+) -> npt.NDArray[np.float64]: ...
 def cubic_spline_smoothing(
     x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], smoothing_factor: float
 ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: ...
+_Bands: TypeAlias = Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]
+_Operator: TypeAlias = Tuple[_Bands, Tuple[List[float], List[float], List[float]]]
+
+def smoothing_operator(x: npt.NDArray[np.float64], smoothing_factor: float) -> _Operator: ...
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+class SmoothingCache:
+    maxsize: int
+    hits: int
+    misses: int
+    _entries: collections.OrderedDict[Tuple[bytes, int, float], Tuple[npt.NDArray[np.float64], _Operator]]
+    _lock: threading.Lock
+    def __init__(self, maxsize: int = ...) -> None: ...
+    def get(self, x: npt.NDArray[np.floating[Any]], smoothing_factor: float) -> _Operator: ...
+    def clear(self) -> None: ...
+    def info(self) -> CacheInfo: ...
+
+SMOOTHING_CACHE: SmoothingCache
+
+def clear_smoothing_cache() -> None: ...
+def cubic_spline_smoothing_dense(
+    x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], smoothing_factor: float
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: ...
 def projection_distance(vertices: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]: ...
+def projection_distance_components(
+    point: Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]],
+    vector: Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]],
+) -> npt.NDArray[np.float64]: ...
 def detect_knee_type(y1: float, y2: float, y3: float, y4: float) -> KneeType: ...
+def knee_type_codes(
+    y1: npt.ArrayLike, y2: npt.ArrayLike, y3: npt.ArrayLike, y4: npt.ArrayLike
+) -> npt.NDArray[np.int_]: ...
@@ -0,0 +1,114 @@
+import asyncio
+import gc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from knarrow import asynchronous, find_knee
+from knarrow.asynchronous import KneeBatcher, find_knee_async
+from knarrow.profiling import profile
+
+from .conftest import make_curves
+
+
+def gather(batcher, *requests):
+    async def main():
+        return await asyncio.gather(*(batcher.find_knee(*args, **kwargs) for args, kwargs in requests))
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("method", ["menger_successive", "kneedle", "all"])
+@pytest.mark.parametrize("window", [0.0, 0.01])
+def test_coalescing(method, window):
+    x, y = make_curves(20)
+    batcher = KneeBatcher(window=window)
+    knees = gather(batcher, *[((x, row), {"method": method}) for row in y])
+    assert knees == [find_knee(x, row, method=method) for row in y]
+    assert all(isinstance(knee, int) for knee in knees)
+    assert batcher.requests == 20 and batcher.batches == 1
+
+
+def test_groups():
+    # the incompatible requests are computed separately, in the same order for every caller
+    x, y = make_curves(6, 40)
+    x_short, y_short = make_curves(3, 25, seed=1)
+    requests = [((x, row), {}) for row in y] + [((row,), {}) for row in y_short]
+    requests += [((x, y[0]), {"method": "distance"}), ((x, y[1]), {"smoothing": 0.01})]
+    requests += [((x.astype(np.float32), row.astype(np.float32)), {}) for row in y[:2]]
+    batcher = KneeBatcher()
+    knees = gather(batcher, *requests)
+    assert knees == [find_knee(*args, **kwargs) for args, kwargs in requests]
+    assert batcher.batches == 5
+
+
+def test_max_batch():
+    x, y = make_curves(10)
+    batcher = KneeBatcher(window=10.0, max_batch=5)  # full batches don't wait for the window
+    assert gather(batcher, *[((x, row), {}) for row in y]) == [find_knee(x, row) for row in y]
+    assert batcher.batches == 2
+
+
+def test_unbatched():
+    x, y = make_curves(2)
+    batcher = KneeBatcher()
+    result = gather(batcher, ((x, y[0]), {"return_result": True}))[0]
+    assert result.index == find_knee(x, y[0])
+    assert gather(batcher, (([1, 2, 3],), {}))[0] == find_knee([1, 2, 3])
+    assert batcher.batches == 2
+
+
+def test_fallback():
+    # an invalid curve fails its own request only
+    x, y = make_curves(4)
+    invalid = np.concatenate([x[:-2], x[1:3]])
+    batcher = KneeBatcher()
+
+    async def main():
+        requests = [batcher.find_knee(x, row) for row in y] + [batcher.find_knee(invalid, y[0])]
+        return await asyncio.gather(*requests, return_exceptions=True)
+
+    *knees, error = asyncio.run(main())
+    assert knees == [find_knee(x, row) for row in y]
+    assert isinstance(error, AssertionError)
+    assert batcher.batches == 1
+
+
+def test_find_knee_async():
+    x, y = make_curves(8)
+
+    async def main():
+        return await asyncio.gather(*(find_knee_async(x, row, method="angle") for row in y))
+
+    assert asyncio.run(main()) == [find_knee(x, row, method="angle") for row in y]
+
+
+def test_context():
+    # the batches and the single requests run in the threads with the profile of the caller
+    x, y = make_curves(3)
+    batcher = KneeBatcher()
+    with profile() as measurements:
+        gather(batcher, *[((x, row), {}) for row in y], ((x, y[0]), {"return_result": True}))
+    assert measurements.stages["prepare.convert"].count == 2  # one find_knees call and one find_knee call
+    assert batcher.batches == 2
+
+
+def test_finished_loops():
+    # the batchers of a finished event loop don't keep it alive
+    x, y = make_curves(4)
+
+    async def main():
+        return await asyncio.gather(*(find_knee_async(x, row) for row in y), find_knee_async([1, 2, 3]))
+
+    for _ in range(5):
+        asyncio.run(main())
+    gc.collect()
+    assert len(asynchronous._BATCHERS) == 0
+
+
+def test_process_pool():
+    x, y = make_curves(8)
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        batcher = KneeBatcher(executor)
+        assert gather(batcher, *[((x, row), {}) for row in y]) == [find_knee(x, row) for row in y]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from knarrow.c_method import (
+    C_BOUNDS,
+    TOLERANCE,
+    c_method,
+    d2e_dc2,
+    de_dc,
+    energy_derivatives,
+    f,
+    newton_raphson,
+    tolerance,
+)
+
+
+def energy(x, y, c):
+    return np.mean((f(x, c) - y) ** 2) / 2
+
+
+@pytest.mark.parametrize("c", [-2.0, 0.0, 0.3, 3.0])
+def test_derivatives(c):
+    x = np.linspace(0, 1, 50)
+    y = np.sqrt(x)
+    h = 1e-4
+    gradient = (energy(x, y, c + h) - energy(x, y, c - h)) / (2 * h)
+    curvature = (energy(x, y, c + h) - 2 * energy(x, y, c) + energy(x, y, c - h)) / h**2
+    assert np.isclose(de_dc(y, x, np.array([c])), gradient, rtol=1e-5)
+    assert np.isclose(d2e_dc2(y, x, np.array([c])), curvature, rtol=1e-3)
+    assert np.allclose(energy_derivatives(y, x, np.array(c)), (gradient, curvature), rtol=1e-3)
+
+
+@pytest.mark.parametrize("y_function", [np.sqrt, lambda x: 1 - (1 - x) ** 3, lambda x: np.log1p(20 * x) / np.log1p(20)])
+def test_newton_raphson(y_function):
+    x = np.linspace(0, 1, 50)
+    y = y_function(x)
+    c = newton_raphson(x, y)
+    grid = np.linspace(c - 0.01, c + 0.01, 201)
+    assert abs(grid[np.argmin([energy(x, y, g) for g in grid])] - c) < 1e-3
+    assert np.isclose(newton_raphson(x, y, c0=c - 1), c, atol=1e-4)  # warm start
+    assert np.isclose(newton_raphson(x, y, c0=100.0), c, atol=1e-4)  # clipped to the bounds
+
+
+def test_newton_raphson_flat():
+    # the optimum is at c = -inf, which used to never converge
+    x = np.linspace(0, 1, 10)
+    c = newton_raphson(x, x.copy())
+    assert C_BOUNDS[0] <= c < -10
+    assert newton_raphson(x, x.copy(), max_iterations=0) == 3.0
+
+
+def test_newton_raphson_batch():
+    x = np.linspace(0, 1, 100)
+    y = np.stack([x**p for p in np.linspace(0.1, 1, 10)]).reshape(2, 5, 100)
+    c = newton_raphson(x, y)
+    assert c.shape == (2, 5)
+    assert np.allclose(c, [[newton_raphson(x, row) for row in rows] for rows in y], atol=1e-4)
+    assert np.allclose(newton_raphson(x, y, c0=c), c, atol=1e-4)
+
+
+def test_c_method_kwargs():
+    x = np.linspace(0, 1, 50)
+    y = np.sqrt(x)
+    assert c_method(x, y, c0=0.5, max_iterations=50) == c_method(x, y)
+
+
+def test_tolerance():
+    assert tolerance(np.float64) == TOLERANCE
+    assert tolerance(np.float32) > TOLERANCE
+    x = np.linspace(0, 1, 10_000)
+    y = f(x, 4.0)
+    assert abs(newton_raphson(x.astype(np.float32), y.astype(np.float32)) - 4.0) <= 10 * tolerance(np.float32)
+
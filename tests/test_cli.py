@@ -1,3 +1,8 @@
+import io
+import subprocess
+import sys
+
+import numpy as np
 from typer.testing import CliRunner
 
 from knarrow.cli import app
@@ -24,3 +29,60 @@ def test_sort_input_file():
     result = runner.invoke(app, ["--sort", "--output", "index", "--smoothing", "0.01", "tests/cli/shuf_delim.txt"])
     assert result.exit_code == 0
     assert result.stdout.strip() == "shuf_delim.txt 14"
+
+
+def test_value_output():
+    result = runner.invoke(app, ["--sort", "--smoothing", "0.01", "tests/cli/shuf_delim.txt"])
+    assert result.exit_code == 0
+    with open("tests/cli/shuf_delim.txt") as file:
+        lines = file.read().splitlines()
+    assert result.stdout.strip() == f"shuf_delim.txt {lines[14]}"
+
+
+def test_blank_lines():
+    # the blank lines are skipped without shifting the rows of the values
+    text = "1\n\n2\n  \n3\n4\n6\n"
+    result = runner.invoke(app, ["--output", "value", "-"], input=text)
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "<stdin> 4"
+    result = runner.invoke(app, ["--output", "index", "-"], input=text)
+    assert result.stdout.strip() == "<stdin> 3"
+
+
+def test_npy_input(tmp_path):
+    data = np.loadtxt("tests/cli/shuf_delim.txt", delimiter=",")
+    np.save(tmp_path / "points.npy", data)
+    np.save(tmp_path / "transposed.npy", data.T)
+    for name in ("points.npy", "transposed.npy"):
+        args = ["--sort", "--output", "index", "--smoothing", "0.01", str(tmp_path / name)]
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0
+        assert result.stdout.strip() == f"{name} 14"
+
+
+def test_binary_input(tmp_path):
+    data = np.loadtxt("tests/cli/shuf_delim.txt", delimiter=",")
+    data.astype(np.float32).tofile(tmp_path / "points.bin")
+    args = ["--input-format", "binary", "--dtype", "float32", "--columns", "2", "--sort", "--output", "index"]
+    result = runner.invoke(app, [*args, "--smoothing", "0.01", str(tmp_path / "points.bin")])
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "points.bin 14"
+
+    y = np.loadtxt("tests/cli/data.txt")
+    result = runner.invoke(app, ["--input-format", "binary", "--output", "value", "-"], input=y.tobytes())
+    assert result.exit_code == 0
+    assert result.stdout.strip() == f"<stdin> {y[11]}"
+
+
+def test_npy_stdin():
+    buffer = io.BytesIO()
+    np.save(buffer, np.loadtxt("tests/cli/test.txt"))
+    result = runner.invoke(app, ["--input-format", "npy", "-"], input=buffer.getvalue())
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "<stdin> 3.0"
+
+
+def test_startup_imports():
+    # --help, --version and the argument parsing don't need NumPy nor the methods
+    code = "import sys, knarrow.cli; assert not {'numpy', 'knarrow.main'} & set(sys.modules), sorted(sys.modules)"
+    subprocess.run([sys.executable, "-c", code], check=True)
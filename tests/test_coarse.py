@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import knarrow.main
+from knarrow import find_knee
+from knarrow.coarse import coarse_to_fine, lttb
+from knarrow.methods import available, get
+from knarrow.util import normalize
+
+
+def lttb_reference(x, y, n_out):
+    n = len(x)
+    selected = [0]
+    start = lambda bucket: int(bucket * (n - 2) / (n_out - 2)) + 1  # noqa: E731
+    for bucket in range(n_out - 2):
+        begin, end = start(bucket), start(bucket + 1)
+        if bucket == n_out - 3:
+            next_x, next_y = x[-1], y[-1]
+        else:
+            next_x, next_y = x[end : start(bucket + 2)].mean(), y[end : start(bucket + 2)].mean()
+        a = selected[-1]
+        areas = [abs((x[a] - next_x) * (y[j] - y[a]) - (x[a] - x[j]) * (next_y - y[a])) for j in range(begin, end)]
+        selected.append(begin + int(np.argmax(areas)))
+    return np.array(selected + [n - 1])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_lttb(seed):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(10, 2000)
+    n_out = rng.integers(3, n)
+    x = np.sort(rng.uniform(0, 1, n))
+    y = rng.normal(size=n)
+    assert np.array_equal(lttb(x, y, n_out), lttb_reference(x, y, n_out))
+    assert np.array_equal(lttb(x, y, n + 5), np.arange(n))
+
+
+def make_curve(seed, n=20_000):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, rng.uniform(1, 100), n)
+    u = x / x[-1]
+    y = [1 - np.exp(-rng.uniform(3, 30) * u), np.log1p(rng.uniform(5, 200) * u), u ** rng.uniform(2, 5)][seed % 3]
+    return x, y * rng.choice([-1, 1])
+
+
+@pytest.mark.parametrize("method", ["distance", "menger_anchored", "menger_successive"])
+@pytest.mark.parametrize("seed", range(6))
+def test_coarse_to_fine(method, seed):
+    # the full-resolution knees of these methods are close to the coarse ones, so the result must be the full one
+    x, y = make_curve(seed)
+    assert find_knee(x, y, method=method, coarse=500) == find_knee(x, y, method=method)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_coarse_to_fine_c_method(seed):
+    x, y = make_curve(seed)
+    full, coarse = find_knee(x, y, method="c_method"), find_knee(x, y, method="c_method", coarse=500)
+    assert abs(x[full] - x[coarse]) <= 1e-3 * x[-1]
+
+
+@pytest.mark.parametrize("method", [m for m in available() if get(m).locality is not None])
+@pytest.mark.parametrize("seed", range(3))
+def test_window(method, seed):
+    # whatever the candidate, the result is the best full-resolution point of its window
+    x, y = make_curve(seed, 5000)
+    x, y = normalize(x), normalize(y)
+    scores_function = getattr(knarrow.main, f"{method}_scores")
+    knee = coarse_to_fine(method, x, y, 100, window=3)
+    selected = lttb(x, y, 100)
+    candidate = np.argmax(scores_function(x[selected], y[selected]))
+    low, high = selected[max(candidate - 3, 0)], selected[min(candidate + 3, 99)]
+    scores = scores_function(x, y)
+    assert low <= knee <= high
+    assert scores[knee] == scores[low : high + 1].max()
+
+
+@pytest.mark.parametrize("method", ["distance_adjacent", "menger_successive"])
+def test_window_multiscale(method):
+    # the refined slice reaches the neighbours at the largest scale
+    x, y = make_curve(1, 5000)
+    x, y = normalize(x), normalize(y)
+    scores_function = getattr(knarrow.main, f"{method}_scores")
+    knee = coarse_to_fine(method, x, y, 200, window=3, dilations=(1, 3, 5))
+    selected = lttb(x, y, 200)
+    candidate = np.argmax(scores_function(x[selected], y[selected], dilations=(1, 3, 5)))
+    low, high = selected[max(candidate - 3, 0)], selected[min(candidate + 3, 199)]
+    scores = scores_function(x, y, dilations=(1, 3, 5))
+    assert low <= knee <= high
+    assert scores[knee] == scores[low : high + 1].max()
+
+
+def test_small_curve():
+    x = np.linspace(0, 1, 50)
+    assert find_knee(x, np.sqrt(x), method="angle", coarse=100) == find_knee(x, np.sqrt(x), method="angle")
+
+
+@pytest.mark.parametrize("method", ["kneedle", "ols_swiping", "all"])
+def test_not_local(method):
+    x = np.linspace(0, 1, 50)
+    with pytest.raises(ValueError):
+        find_knee(x, np.sqrt(x), method=method, coarse=10)
@@ -0,0 +1,70 @@
+import array
+
+import numpy as np
+import pytest
+
+from knarrow import find_knee, find_knees_grouped
+from knarrow.methods import available
+from knarrow.profiling import profile
+
+
+def make_table(lengths, seed=0, shuffle=False):
+    rng = np.random.default_rng(seed)
+    xs, ys = [], []
+    for i, length in enumerate(lengths):
+        x = np.sort(rng.uniform(0, rng.uniform(1, 100), length))
+        u = x / x[-1]
+        y = [1 - np.exp(-8 * u), np.exp(-8 * u), np.exp(8 * (u - 1)), -np.exp(8 * u)][i % 4]
+        y = y + rng.normal(0, 0.01, length)
+        if shuffle:
+            order = rng.permutation(length)
+            x, y = x[order], y[order]
+        xs.append(x)
+        ys.append(y)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return np.concatenate(xs), np.concatenate(ys), offsets
+
+
+def expected(x, y, offsets, **kwargs):
+    return [find_knee(x[start:end], y[start:end], **kwargs) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+@pytest.mark.parametrize("method", available() + ["all"])
+@pytest.mark.parametrize("lengths", [[10, 25, 10, 7, 40, 25, 5, 8], [20] * 6])
+def test_grouped(method, lengths):
+    x, y, offsets = make_table(lengths)
+    knees = find_knees_grouped(x, y, offsets, method=method)
+    assert knees.tolist() == expected(x, y, offsets, method=method)
+
+
+@pytest.mark.parametrize("smoothing", [0.0, 0.01])
+def test_unsorted(smoothing):
+    x, y, offsets = make_table([10, 25, 10, 7, 40], seed=1, shuffle=True)
+    knees = find_knees_grouped(x, y, offsets, smoothing=smoothing)
+    assert knees.tolist() == expected(x, y, offsets, smoothing=smoothing)
+
+
+def test_buffers():
+    # the buffer-protocol arrays and sliced offsets (as in a sliced Arrow array) are read in place
+    x, y, offsets = make_table([10, 25, 10, 7], seed=2)
+    sliced = find_knees_grouped(array.array("d", x), memoryview(y), array.array("q", offsets[1:]))
+    assert sliced.tolist() == expected(x, y, offsets)[1:]
+    float32 = find_knees_grouped(x.astype(np.float32), y.astype(np.float32), offsets, method="distance")
+    assert float32.tolist() == expected(x.astype(np.float32), y.astype(np.float32), offsets, method="distance")
+
+
+def test_copies():
+    x, y, offsets = make_table([20] * 100)
+    with profile() as measurements:
+        find_knees_grouped(x, y, offsets, sort=False)
+    assert sum(statistics.copies for statistics in measurements.stages.values()) == 3
+
+
+@pytest.mark.parametrize(
+    "offsets",
+    [[0, 10, 12, 20], [0, 10, 30], [0, 10, 9, 20], [0.0, 10.0, 20.0], [0]],
+)
+def test_invalid(offsets):
+    x, y, _ = make_table([10, 10])
+    with pytest.raises(AssertionError):
+        find_knees_grouped(x, y, offsets)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from knarrow import IncrementalKneeDetector, find_knee
+from knarrow.incremental import INCREMENTAL_METHODS
+
+CURVES = [np.sqrt, lambda t: t**3, lambda t: 1 - np.sqrt(t), lambda t: (1 - t) ** 3]
+
+
+@pytest.mark.parametrize("method", INCREMENTAL_METHODS)
+@pytest.mark.parametrize("curve", range(4))
+def test_incremental(method, curve):
+    rng = np.random.default_rng(curve)
+    n = 40
+    x = np.cumsum(rng.uniform(0.5, 1.5, n))
+    y = 3 * CURVES[curve]((x - x[0]) / (x[-1] - x[0])) + rng.normal(0, 0.01, n)
+    detector = IncrementalKneeDetector(method, capacity=4)
+    for i in range(n):
+        detector.append(x[i], y[i])
+        if i >= 3:
+            assert detector.knee() == find_knee(x[: i + 1], y[: i + 1], method=method)
+    assert len(detector) == n
+    assert np.array_equal(detector.x, x) and np.array_equal(detector.y, y)
+
+
+@pytest.mark.parametrize("method", ["distance", "ols_swiping"])
+def test_extend(method):
+    x = np.linspace(0, 1, 1000)
+    y = np.log1p(50 * x)
+    detector = IncrementalKneeDetector(method)
+    detector.extend(x, y)
+    knee = detector.knee()
+    assert knee == find_knee(x, y, method=method)
+    assert detector.knee() is knee  # cached until the next point
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ols_swiping(seed):
+    # the right fits come from the total sums minus the sums of the left parts, except on the plateau of the loss,
+    # far from the origin, where the differences would cancel
+    rng = np.random.default_rng(seed)
+    n = 300
+    x = 1e5 + 1e3 * np.cumsum(rng.uniform(0.1, 10, n))
+    y = 100 * np.exp(-rng.uniform(5, 30) * (x - x[0]) / (x[-1] - x[0])) + rng.normal(0, 0.001, n)
+    detector = IncrementalKneeDetector("ols_swiping")
+    for i in range(n):
+        detector.append(x[i], y[i])
+        if i >= 3:
+            assert detector.knee() == find_knee(x[: i + 1], y[: i + 1], method="ols_swiping")
+
+
+def test_kwargs():
+    x = np.linspace(0, 1, 50)
+    y = np.sqrt(x)
+    detector = IncrementalKneeDetector("distance", smoothing=0.01)
+    detector.extend(x, y)
+    assert detector.knee() == find_knee(x, y, method="distance", smoothing=0.01)
+
+
+@pytest.mark.xfail(raises=AssertionError, strict=True)
+@pytest.mark.parametrize("method", ["angle", "kneedle", "menger_successive"])
+def test_not_incremental(method):
+    IncrementalKneeDetector(method)
+
+
+@pytest.mark.xfail(raises=AssertionError, strict=True)
+def test_not_increasing():
+    detector = IncrementalKneeDetector()
+    detector.append(1.0, 1.0)
+    detector.append(1.0, 2.0)
+
+
+@pytest.mark.xfail(raises=AssertionError, strict=True)
+def test_too_short():
+    detector = IncrementalKneeDetector()
+    detector.extend([0.0, 1.0, 2.0], [0.0, 1.0, 1.5])
+    detector.knee()
@@ -0,0 +1,158 @@
+import threading
+
+import numpy as np
+import pytest
+
+from knarrow import find_knee, find_knees, kernels
+from knarrow.kernels import (
+    KERNEL_METHODS,
+    get_backend,
+    menger_knees,
+    pentadiagonal_factors,
+    pentadiagonal_substitution,
+    set_backend,
+    use_backend,
+)
+from knarrow.util import SmoothingCache, cubic_spline_smoothing, factorize_pentadiagonal, solve_pentadiagonal
+
+from .conftest import make_curves
+
+
+@pytest.fixture
+def interpreted(monkeypatch):
+    # the kernels run as plain Python, the same code Numba compiles
+    monkeypatch.setattr(kernels, "numba_available", lambda: True)
+    monkeypatch.setattr(kernels, "_compile", lambda function: function)
+    monkeypatch.setattr(kernels, "_compiled", {})
+
+
+def assert_parity(method, x, y, **kwargs):
+    with use_backend("numpy"):
+        expected = find_knees(x, y, method=method, **kwargs)
+    with use_backend("numba"):
+        assert find_knees(x, y, method=method, **kwargs).tolist() == expected.tolist()
+        for i in range(0, len(y), 7):
+            assert find_knee(x[i], y[i], method=method, **kwargs) == expected[i]
+
+
+@pytest.mark.parametrize("method", KERNEL_METHODS)
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_parity(interpreted, method, dtype):
+    assert_parity(method, *make_curves(30, 50, dtype=dtype, irregular=True))
+    assert len(kernels._compiled) == 1
+
+
+@pytest.mark.parametrize(
+    "method,kwargs",
+    [
+        ("kneedle", {"S": 0.1}),
+        ("kneedle", {"S": 0.1, "online": True}),
+        ("c_method", {"c0": -2.0, "max_iterations": 3}),
+        ("menger_successive", {"smoothing": 0.01}),
+    ],
+)
+def test_parity_arguments(interpreted, method, kwargs):
+    assert_parity(method, *make_curves(30, 50, seed=1, irregular=True), **kwargs)
+
+
+@pytest.mark.parametrize("method", ["kneedle", "menger_anchored", "menger_successive"])
+def test_parity_degenerate(interpreted, method):
+    # ties, repeated points and single local maxima pick the same knees as np.argmax
+    x = np.tile(np.linspace(0, 1, 12), (4, 1))
+    y = np.vstack((x[0], np.round(np.sqrt(x[1]), 1), np.minimum(x[2], 0.5), np.r_[0, 0, 0, np.sqrt(x[3, 3:])]))
+    assert_parity(method, x, y, sort=False)
+
+
+def assert_smoothing_parity(x, y):
+    with use_backend("numpy", method="smoothing"):
+        expected = cubic_spline_smoothing(x, y, 0.01)[1]
+        factors = factorize_pentadiagonal(x[2:] + 1, x[2:-1] / 3, x[2:-2] / 7)
+    with use_backend("numba", method="smoothing"):
+        assert np.array_equal(cubic_spline_smoothing(x, y, 0.01)[1], expected)
+        compiled_factors = factorize_pentadiagonal(x[2:] + 1, x[2:-1] / 3, x[2:-2] / 7)
+        assert all(np.array_equal(*pair) for pair in zip(compiled_factors, factors))
+        rhs = y[..., 2:]
+        assert np.array_equal(solve_pentadiagonal(factors, rhs), solve_pentadiagonal(compiled_factors, rhs))
+
+
+def test_smoothing(interpreted, monkeypatch):
+    # the same floating point operations as the python loops, on one curve and on many curves at once
+    monkeypatch.setattr("knarrow.util.SMOOTHING_CACHE", SmoothingCache(maxsize=0))
+    x, y = make_curves(3, 40, seed=3, irregular=True)
+    assert_smoothing_parity(x[0], y[0])
+    assert_smoothing_parity(x[0], y)
+    assert get_backend("smoothing") == "numba"
+    assert set(kernels._compiled) == {pentadiagonal_factors, pentadiagonal_substitution}
+
+
+def test_selection(interpreted):
+    assert get_backend("kneedle") == "numba"
+    assert get_backend("distance") == "numpy"
+    with use_backend("numpy"):
+        assert get_backend("kneedle") == "numpy"
+        with use_backend("numba", method="kneedle"):
+            assert get_backend("kneedle") == "numba"
+            assert get_backend("c_method") == "numpy"
+        assert get_backend("kneedle") == "numpy"
+    assert get_backend("kneedle") == "numba"
+    with pytest.raises(AssertionError):
+        set_backend("cuda")
+
+
+def test_threads(interpreted):
+    # the blocks of two threads overlap: a enters, b enters, a exits, b exits
+    a_entered, b_entered, a_exited = threading.Event(), threading.Event(), threading.Event()
+    seen = {}
+
+    def a():
+        with use_backend("numpy"):
+            a_entered.set()
+            b_entered.wait()
+            seen["a"] = get_backend("kneedle")
+        a_exited.set()
+
+    def b():
+        a_entered.wait()
+        with use_backend("numba"):
+            b_entered.set()
+            a_exited.wait()
+            seen["b"] = get_backend("kneedle")
+
+    threads = [threading.Thread(target=a), threading.Thread(target=b)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {"a": "numpy", "b": "numba"}
+    assert kernels._selected == {}
+
+
+def test_without_numba(monkeypatch):
+    monkeypatch.setattr(kernels, "numba_available", lambda: False)
+    assert get_backend("kneedle") == "numpy"
+    with pytest.raises(AssertionError):
+        set_backend("numba")
+
+
+def test_multiscale(interpreted):
+    # the kernels only cover the single-scale scores
+    assert_parity("menger_successive", *make_curves(5, 50, irregular=True), dilations=(1, 2))
+    assert menger_knees not in kernels._compiled
+
+
+class TestCompiled:
+    # the tests above run the kernels interpreted; these are reported as skipped, not passed, without numba
+    @pytest.fixture(autouse=True)
+    def compiled(self):
+        pytest.importorskip("numba", reason="the compiled kernels need numba (pip install knarrow[jit])")
+
+    @pytest.mark.parametrize("method", KERNEL_METHODS)
+    @pytest.mark.parametrize("dtype", [np.float64, np.float32])
+    def test_parity(self, method, dtype):
+        assert_parity(method, *make_curves(200, 300, seed=2, dtype=dtype, irregular=True))
+
+    def test_smoothing(self):
+        assert_smoothing_parity(*(array[0] for array in make_curves(1, 5000, seed=4, irregular=True)))
+
+    def test_default(self):
+        assert all(get_backend(method) == "numba" for method in KERNEL_METHODS)
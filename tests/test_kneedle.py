@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from knarrow.kneedle import kneedle
+
+
+def kneedle_reference(x, y, s=1.0):
+    # the original implementation, with a (local maxima, n) matrix of the thresholds
+    n = len(x)
+    y_d = y - x
+    local_maxima_indices = ((y_d[1:-1] > y_d[:-2]) & (y_d[1:-1] > y_d[2:])).nonzero()[0] + 1
+    if len(local_maxima_indices) == 1:
+        return local_maxima_indices[0].item()
+    x_lmx = x[local_maxima_indices]
+    t = y_d[local_maxima_indices] - s / (n - 1)
+    below_threshold_mask = x_lmx[:, np.newaxis] < x
+    below_threshold_mask &= t[:, np.newaxis] > y_d
+    under_threshold_ix = np.argpartition(~below_threshold_mask, 0)[:, 0]
+    local_maxima_indices_augmented = np.append(local_maxima_indices, n)
+    maxima_mask = (local_maxima_indices_augmented[:-1] < under_threshold_ix) & (
+        under_threshold_ix < local_maxima_indices_augmented[1:]
+    )
+    return local_maxima_indices[maxima_mask][0].item() + 1
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("s", [0.5, 1.0, 3.0])
+def test_kneedle(seed, s):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(10, 300)
+    x = np.linspace(0, 1, n)
+    y = x ** rng.uniform(0.1, 0.9) + rng.normal(0, rng.choice([0.001, 0.01, 0.05]), n)
+    try:
+        expected = kneedle_reference(x, y, s)
+    except IndexError:
+        pytest.skip("the reference finds no knee")
+    assert kneedle(x, y, S=s) == expected
+
+
+def test_batch():
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, 100)
+    y = np.stack([x**p + rng.normal(0, 0.02, 100) for p in rng.uniform(0.1, 0.9, 20)])
+    assert np.array_equal(kneedle(x, y), [kneedle(x, row) for row in y])
+    assert np.array_equal(kneedle(x, y, online=True), [kneedle(x, row, online=True) for row in y])
+
+
+def test_online():
+    # two separate knees, the second one confirmed later
+    x = np.linspace(0, 1, 9)
+    y = x + np.array([0, 0.3, 0, 0, 0, 0.4, 0, 0, 0])
+    assert kneedle(x, y) == 2
+    assert kneedle(x, y, online=True) == 6
+
+
+def test_no_knee():
+    x = np.linspace(0, 1, 7)
+    y = x + np.array([0, 0.1, 0.09, 0.1, 0.09, 0.1, 0])  # the drops are too small for any threshold
+    assert kneedle(x, y) == np.argmax(y - x)
@@ -1,7 +1,12 @@
+import subprocess
+import sys
+
 import numpy as np
 import pytest
 
-from knarrow.main import find_knee
+from knarrow.main import EnsembleResult, ensemble, find_knee, find_knees
+
+from .conftest import make_curves
 
 ALL_METHODS = [
     "angle",
@@ -74,3 +79,108 @@ def test_twovar(smoothing, method, y, target):
 )
 def test_fails(method, inputs):
     find_knee(*inputs, method=method)
+
+
+@pytest.mark.parametrize("smoothing", [0.0, 0.01])
+@pytest.mark.parametrize("method", ALL_METHODS)
+def test_find_knees(smoothing, method):
+    x, y = make_curves(12, 40, noise=0.01)
+    target = np.array([find_knee(x, row, method=method, smoothing=smoothing) for row in y])
+
+    result = find_knees(x, y, method=method, smoothing=smoothing)
+    assert isinstance(result, np.ndarray)
+    assert result.shape == (12,)
+    assert (result == target).all()
+
+    # one x per curve, shuffled
+    rng = np.random.default_rng()
+    random_indices = rng.permuted(np.tile(np.arange(40), (12, 1)), axis=1)
+    x_shuffled = np.take_along_axis(np.tile(x, (12, 1)), random_indices, axis=1)
+    y_shuffled = np.take_along_axis(y, random_indices, axis=1)
+    result = find_knees(x_shuffled, y_shuffled, method=method, smoothing=smoothing)
+    assert (result == target).all()
+
+
+@pytest.mark.parametrize("smoothing", [0.0, 0.01])
+@pytest.mark.parametrize("method", ALL_METHODS)
+def test_float32(smoothing, method):
+    # float32 curves are computed in float32 and find (almost) the same knees as in float64. The methods using the
+    # second differences of the successive points lose about eps * n^2 on very smooth curves, so fewer points there
+    x, y = make_curves(12, 100 if smoothing else 1000, noise=0.01)
+    x32, y32 = x.astype(np.float32), y.astype(np.float32)
+    result = find_knees(x32, y32, method=method, smoothing=smoothing, return_result=True)
+    target = find_knees(x, y, method=method, smoothing=smoothing, return_result=True)
+    assert result.scores.dtype == np.float32
+    finite = np.isfinite(target.scores)
+    assert (finite == np.isfinite(result.scores)).all()
+    scale = np.abs(target.scores[finite]).max()
+    assert np.allclose(result.scores[finite], target.scores[finite], rtol=1e-3, atol=2e-3 * scale)
+    if method != "kneedle":  # kneedle doesn't pick the best score
+        # the knees can only differ between the points scored (almost) the same in float64
+        knee_scores = np.take_along_axis(target.scores, result.index[:, np.newaxis], axis=-1)[:, 0]
+        assert np.allclose(knee_scores, target.scores.max(axis=-1), rtol=1e-3, atol=1e-3 * scale)
+    else:
+        assert (result.index == target.index).all()
+
+    assert find_knee(x32, y32[0], method=method, smoothing=smoothing, return_result=True).scores.dtype == np.float32
+    assert find_knee(y32[0], method=method, return_result=True).scores.dtype == np.float32
+    # anything else than float32 is computed in float64, as before
+    assert find_knee(x32, y[0], method=method, return_result=True).scores.dtype == np.float64
+    assert find_knee((y[0] * 100).astype(int), method=method, return_result=True).scores.dtype == np.float64
+
+
+def test_find_knees_all():
+    x, y = make_curves(12, 40, noise=0.0)
+    target = np.array([find_knee(row, method="all") for row in y])
+    assert (find_knees(y, method="all") == target).all()
+
+
+@pytest.mark.xfail(raises=AssertionError)
+@pytest.mark.parametrize(
+    "inputs",
+    [
+        ([0.0, 1.0, 2.0, 3.0, 4.0],),
+        (np.ones((3, 2)),),
+        (np.arange(5), np.ones((3, 6))),
+    ],
+)
+def test_find_knees_fails(inputs):
+    find_knees(*inputs)
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+@pytest.mark.parametrize("smoothing", [0.0, 0.01])
+def test_ensemble(workers, smoothing):
+    x, y = make_curves(4, 40, noise=0.01)
+    for row in y:
+        result = ensemble(x, row, workers=workers, smoothing=smoothing)
+        assert isinstance(result, EnsembleResult)
+        assert list(result.votes) == ALL_METHODS
+        for method, knee in result.votes.items():
+            assert knee == find_knee(x, row, method=method, smoothing=smoothing)
+        assert result.knee == find_knee(x, row, method="all", smoothing=smoothing)
+
+
+def test_ensemble_methods():
+    x, y = make_curves(4, 40, noise=0.0)
+    result = ensemble(x, y[1], methods=["angle", "distance"])
+    assert list(result.votes) == ["angle", "distance"]
+    assert result.knee == result.votes["angle"]
+
+
+def test_lazy_methods():
+    code = (
+        "import sys, knarrow\n"
+        "assert 'numpy' not in sys.modules\n"
+        "assert knarrow.find_knee([1, 2, 3, 4, 6], method='angle') == 3\n"
+        "assert 'knarrow.angle_method' in sys.modules and 'knarrow.kneedle' not in sys.modules\n"
+        "from knarrow.main import kneedle_scores\n"
+        "assert 'knarrow.kneedle' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_deprecated_methods():
+    with pytest.deprecated_call():
+        from knarrow.main import _METHODS
+    assert _METHODS == ALL_METHODS
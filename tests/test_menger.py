@@ -1,7 +1,18 @@
+import tracemalloc
+
 import numpy as np
 import pytest
 
-from knarrow.menger import double_triangle_area, get_squared_vector_lengths
+from knarrow import find_knee
+from knarrow.distance_method import distance_adjacent_scores
+from knarrow.menger import (
+    double_triangle_area,
+    get_curvature,
+    get_squared_vector_lengths,
+    menger_anchored_scores,
+    menger_successive_scores,
+)
+from knarrow.util import np_anchored, np_windowed
 
 
 @pytest.mark.parametrize(
@@ -30,3 +41,99 @@ def test_double_triangle_area(vertices, output):
     assert result.dtype == vertices.dtype
     assert result.shape == output.shape
     assert np.isclose(result, output).all()
+
+
+def test_vectorized():
+    rng = np.random.default_rng()
+    vertices = rng.normal(size=(4, 5, 3, 2))
+    areas = double_triangle_area(vertices)
+    lengths = get_squared_vector_lengths(vertices)
+    curvatures = get_curvature(vertices)
+    assert areas.shape == curvatures.shape == (4, 5)
+    assert lengths.shape == (4, 5, 3)
+    for index in np.ndindex(4, 5):
+        assert np.isclose(areas[index], abs(np.linalg.det(np.hstack((vertices[index], np.ones((3, 1)))))))
+        assert np.allclose(lengths[index], get_squared_vector_lengths(vertices[index]))
+        assert np.isclose(curvatures[index], get_curvature(vertices[index]))
+
+
+def test_curvature():
+    # three points on a circle with the radius 2
+    angles = np.array([0.1, 1.0, 2.5])
+    vertices = 2 * np.stack((np.cos(angles), np.sin(angles)), axis=-1)
+    assert np.isclose(get_curvature(vertices), 0.5)
+
+
+@pytest.mark.parametrize(
+    "scores,gathered",
+    [(menger_successive_scores, np_windowed(100_000, 3)), (menger_anchored_scores, np_anchored(100_000))],
+)
+def test_strided(scores, gathered):
+    # the views give exactly the curvature of the gathered triplets, without allocating them
+    x = np.sort(np.random.default_rng(0).uniform(size=(3, 100_000)))
+    y = np.sqrt(x)
+    expected = get_curvature(np.stack((x[..., gathered], y[..., gathered]), axis=-1))
+    tracemalloc.start()
+    try:
+        result = scores(x, y)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert (result[..., 1:-1] == expected).all()
+    assert peak < 8 * x.nbytes
+
+
+@pytest.mark.parametrize("scores", [menger_successive_scores, distance_adjacent_scores])
+def test_single_scale(scores):
+    x = np.sort(np.random.default_rng(1).uniform(size=(3, 500)))
+    y = np.sqrt(x)
+    assert (scores(x, y, dilations=(1,)) == scores(x, y)).all()
+
+
+@pytest.mark.parametrize("scores", [menger_successive_scores, distance_adjacent_scores])
+@pytest.mark.parametrize("dilations", [(1, 3), (2, 5, 4)])
+def test_multiscale(scores, dilations):
+    # every scale is the single-scale score of the curve subsampled with the step of that scale
+    x = np.sort(np.random.default_rng(2).uniform(size=(2, 60)))
+    y = np.sqrt(x)
+    reach = max(dilations)
+    single = []
+    for dilation in dilations:
+        sampled = np.empty((2, 60))
+        for offset in range(dilation):
+            sampled[:, offset::dilation] = scores(x[:, offset::dilation], y[:, offset::dilation])
+        # the score of the subsampled point i is at the position of the point i * dilation
+        single.append(np.roll(sampled, dilation - 1, axis=-1) if scores is distance_adjacent_scores else sampled)
+    result = scores(x, y, dilations=dilations, aggregate="max")
+    inner = slice(reach - 1, -reach - 1) if scores is distance_adjacent_scores else slice(reach, -reach)
+    assert np.allclose(result[:, inner], np.max(single, axis=0)[:, inner])
+    assert np.isneginf(np.delete(result, np.arange(60)[inner], axis=1)).all()
+
+
+@pytest.mark.parametrize("method", ["menger_successive", "distance_adjacent"])
+def test_multiscale_noise(method):
+    # a single scale finds the noise, the multi-scale scores find the knee
+    x = np.linspace(0, 1, 200)
+    y = x - np.log1p(np.exp(40 * (x - 0.3))) / 40
+    rng = np.random.default_rng(0)
+    single, multiple = [], []
+    for _ in range(20):
+        noisy = y + rng.normal(0, 3e-4, 200)
+        single.append(find_knee(x, noisy, method=method))
+        multiple.append(find_knee(x, noisy, method=method, dilations=(1, 2, 4, 8, 16)))
+    knee = find_knee(x, y, method=method)
+    assert np.mean(np.abs(np.array(single) - knee) <= 10) < 0.5
+    assert np.mean(np.abs(np.array(multiple) - knee) <= 10) >= 0.9
+
+
+def test_aggregates():
+    x = np.linspace(0, 1, 100)
+    y = np.sqrt(x)
+    scores = [menger_successive_scores(x, y, dilations=(d,)) for d in (1, 2, 4)]
+    for aggregate in ["mean", "median", "max", "min"]:
+        expected = getattr(np, aggregate)(scores, axis=0)[4:-4]
+        assert np.allclose(menger_successive_scores(x, y, dilations=(1, 2, 4), aggregate=aggregate)[4:-4], expected)
+    custom = menger_successive_scores(x, y, dilations=(1, 2, 4), aggregate=lambda s, axis: s[..., 1])
+    assert np.allclose(custom[4:-4], scores[1][4:-4])
+    with pytest.raises(AssertionError):
+        menger_successive_scores(x[:8], y[:8], dilations=(4,))
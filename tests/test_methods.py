@@ -0,0 +1,134 @@
+import importlib.metadata
+
+import numpy as np
+import pytest
+
+import knarrow.methods
+from knarrow.main import ensemble, find_knee, find_knees
+from knarrow.methods import Complexity, MethodSpec, available, get, register, unregister
+
+
+def last_point(x, y):
+    assert y.ndim == 1
+    return len(y) - 1
+
+
+def last_point_scores(x, y):
+    assert y.ndim == 1
+    return np.arange(len(y), dtype=float)
+
+
+@pytest.fixture
+def custom():
+    spec = register(MethodSpec("last_point", last_point, last_point_scores, complexity=Complexity.QUADRATIC))
+    yield spec
+    unregister("last_point")
+
+
+def test_builtins():
+    assert available() == [
+        "angle",
+        "c_method",
+        "distance",
+        "distance_adjacent",
+        "kneedle",
+        "menger_anchored",
+        "menger_successive",
+        "ols_swiping",
+    ]
+    assert available(max_complexity=Complexity.LINEAR) == [m for m in available() if m != "c_method"]
+    assert available(batch=False) == []
+    assert get("kneedle").kwargs == {"S", "online"}
+    with pytest.raises(KeyError):
+        get("all")
+
+
+def test_register(custom):
+    assert available()[-1] == "last_point"
+    assert find_knee([0, 3, 4, 4.5, 5], method="last_point") == 4
+    result = find_knee([0, 3, 4, 4.5, 5], method="last_point", return_result=True)
+    assert result.index == 4 and list(result.scores) == [0, 1, 2, 3, 4]
+    with pytest.raises(AssertionError):
+        register(MethodSpec("last_point", last_point))
+    with pytest.raises(AssertionError):
+        register(MethodSpec("all", last_point))
+
+
+def test_lazy_function():
+    register(MethodSpec("lazy_angle", "knarrow.angle_method:angle", batch=True))
+    try:
+        assert get("lazy_angle")._loaded is None
+        assert find_knee([1, 2, 3, 4, 6], method="lazy_angle") == find_knee([1, 2, 3, 4, 6], method="angle")
+        with pytest.raises(ValueError):
+            find_knee([1, 2, 3, 4, 6], method="lazy_angle", return_result=True)
+    finally:
+        unregister("lazy_angle")
+
+
+def test_without_batch(custom):
+    x = np.arange(6)
+    y = np.array([[1, 2, 3, 4, 5, 7], [1, 3, 5, 6, 7, 8]])
+    assert find_knees(x, y, method="last_point").tolist() == [0, 5]  # the first curve is reversed by prepare
+    assert find_knees(x, y, method="last_point", return_result=True).scores.shape == (2, 6)
+
+
+def test_max_complexity(custom):
+    x = np.linspace(0, 1, 50)
+    y = 1 - np.exp(-8 * x)
+    assert list(ensemble(x, y).votes) == available()
+    votes = ensemble(x, y, max_complexity=Complexity.LINEAR).votes
+    assert list(votes) == available(max_complexity=Complexity.LINEAR)
+    assert "c_method" not in votes and "last_point" not in votes
+    expected = ensemble(x, y, methods=available()[:-1]).knee
+    assert find_knee(x, y, method="all", max_complexity=Complexity.ITERATIVE) == expected
+
+
+def test_kwargs():
+    x = np.linspace(0, 1, 50)
+    y = 1 - np.exp(-8 * x)
+    result = ensemble(x, y, S=2.0, max_iterations=10)
+    assert result.votes["kneedle"] == find_knee(x, y, method="kneedle", S=2.0)
+    assert result.votes["c_method"] == find_knee(x, y, method="c_method", max_iterations=10)
+    with pytest.raises(AssertionError):
+        ensemble(x, y, unknown=1)
+    with pytest.raises(AssertionError):
+        ensemble(x, y, methods=["angle"], S=2.0)
+
+
+class EntryPoint:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def load(self):
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+def test_discovery(monkeypatch):
+    plugins = [
+        EntryPoint("plugin", MethodSpec("plugin", last_point, last_point_scores)),
+        EntryPoint("broken", ImportError("no module named 'broken'")),
+        EntryPoint("impostor", MethodSpec("distance", last_point, last_point_scores)),
+        EntryPoint("function", last_point),
+    ]
+
+    def entry_points(group):
+        assert group == knarrow.methods.ENTRY_POINT_GROUP
+        return plugins
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", entry_points)
+    monkeypatch.setattr(knarrow.methods, "_discovered", False)
+    try:
+        with pytest.warns(UserWarning) as warnings:
+            assert available()[-1] == "plugin"
+        assert [str(warning.message) for warning in warnings] == [
+            "Skipping the knee-finding method 'broken': ImportError(\"no module named 'broken'\")",
+            "Skipping the knee-finding method 'impostor': the name 'distance' is already taken",
+            "Skipping the knee-finding method 'function': function is not a MethodSpec",
+        ]
+        assert get("distance").function == "knarrow.distance_method:distance"
+        assert find_knee([0, 3, 4, 4.5, 5], method="plugin") == 4
+    finally:
+        unregister("plugin")
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from knarrow.ols import cumulative_r_squared, ols_swiping, r_squared
+
+
+def ols_swiping_reference(x, y):
+    results = ((i, r_squared(x[: i + 1], y[: i + 1]) + r_squared(x[i:], y[i:])) for i in range(1, len(x) - 1))
+    return min(results, key=lambda t: t[1])[0]
+
+
+@pytest.mark.parametrize("n", [3, 4, 10, 100])
+def test_cumulative_r_squared(n):
+    rng = np.random.default_rng()
+    x = np.sort(rng.uniform(0, 1, n))
+    y = rng.normal(size=n)
+    result = cumulative_r_squared(x, y)
+    assert result.shape == (n,)
+    assert np.allclose(result[1:], [r_squared(x[: k + 1], y[: k + 1]) for k in range(1, n)])
+
+    batch = cumulative_r_squared(x, np.stack((y, 2 * y + 1)))
+    assert np.allclose(batch, result[np.newaxis, :])
+
+
+def test_cumulative_r_squared_constant():
+    x = np.linspace(0, 1, 5)
+    assert np.allclose(cumulative_r_squared(x, np.ones(5))[1:], 1.0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_ols_swiping(seed):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(5, 200)
+    x = np.linspace(0, 1, n)
+    y = x ** rng.uniform(0.2, 0.8) + rng.normal(0, 0.05, n)
+    assert ols_swiping(x, y) == ols_swiping_reference(x, y)
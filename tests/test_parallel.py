@@ -0,0 +1,73 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from knarrow import find_knees, parallel
+from knarrow.methods import available
+from knarrow.parallel import WorkerReport, find_knees_parallel
+from knarrow.profiling import profile
+
+from .conftest import make_curves
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+@pytest.mark.parametrize("method", available() + ["all"])
+def test_methods(executor, method):
+    x, y = make_curves(23)
+    knees, _ = find_knees_parallel(x, y, workers=2, method=method, executor=executor)
+    assert knees.tolist() == find_knees(x, y, method=method).tolist()
+
+
+@pytest.mark.parametrize("smoothing", [0.0, 0.01])
+def test_inputs(executor, smoothing):
+    x, y = make_curves(10, seed=1)
+    rows = np.tile(x, (10, 1)).astype(np.float32)
+    for args in [(y,), (x, y), (rows, y.astype(np.float32))]:
+        knees, _ = find_knees_parallel(*args, workers=2, executor=executor, smoothing=smoothing, chunks=3)
+        assert knees.tolist() == find_knees(*args, smoothing=smoothing).tolist()
+
+
+def test_workers():
+    x, y = make_curves(50)
+    assert find_knees(x, y, workers=2).tolist() == find_knees(x, y).tolist()
+    with pytest.raises(AssertionError):
+        find_knees(x, y, workers=2, return_result=True)
+
+
+def test_report(executor):
+    x, y = make_curves(30)
+    with profile() as measurements:
+        _, reports = find_knees_parallel(x, y, workers=2, executor=executor)
+    assert all(isinstance(report, WorkerReport) and report.throughput > 0 for report in reports)
+    assert sum(report.chunks for report in reports) == 8
+    assert sum(report.curves for report in reports) == 30
+    assert sum(report.points for report in reports) == 30 * 40
+    workers = {name: statistics for name, statistics in measurements.stages.items() if name.startswith("parallel.")}
+    assert {f"parallel.worker.{report.pid}" for report in reports} == set(workers)
+    assert sum(statistics.count for statistics in workers.values()) == 8
+
+
+def test_failure(executor, monkeypatch):
+    # the shared memory is released even if a worker fails
+    names, share_original = [], parallel._share
+
+    def share(array, buffers):
+        shared = share_original(array, buffers)
+        names.append(shared[0])
+        return shared
+
+    monkeypatch.setattr(parallel, "_share", share)
+    x, y = make_curves(10)
+    with pytest.raises(AssertionError):
+        find_knees_parallel(x, y, workers=2, executor=executor, method="unknown")
+    assert len(names) == 3
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name)
@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+
+from knarrow import ensemble, find_knee, find_knees
+from knarrow.profiling import Profile, count_copies, profile, stage
+
+PREPARE_STAGES = {"prepare.convert", "prepare.sort", "prepare.normalize", "prepare.knee_type"}
+
+
+def test_stages():
+    x = np.linspace(0, 1, 100)
+    with profile() as measurements:
+        find_knee(x, np.sqrt(x), method="kneedle")
+        find_knee(x, np.sqrt(x), method="kneedle", smoothing=0.01)
+    assert set(measurements.stages) == PREPARE_STAGES | {"prepare.smoothing", "method.kneedle"}
+    assert measurements.stages["prepare.convert"].count == 2
+    assert measurements.stages["prepare.smoothing"].count == 1
+    statistics = measurements.stages["method.kneedle"]
+    assert 0 < statistics.min_time <= statistics.max_time <= statistics.time
+    assert statistics.peak_memory == 0  # not traced
+
+
+def test_batch_and_ensemble():
+    x = np.linspace(0, 1, 50)
+    with profile() as measurements:
+        find_knees(x, np.stack((np.sqrt(x), x**2)), method="angle")
+        ensemble(x, np.sqrt(x), methods=["distance", "ols_swiping"], workers=2)
+    assert measurements.stages["prepare.convert"].count == 2
+    assert {"method.angle", "method.distance", "method.ols_swiping"} <= set(measurements.stages)
+
+
+def test_disabled():
+    with profile() as measurements:
+        pass
+    find_knee([1, 2, 3, 4, 6])
+    assert measurements.stages == {}
+    with stage("anything") as disabled:
+        assert disabled is stage("anything else")
+
+
+def test_trace_memory():
+    with profile(trace_memory=True) as measurements:
+        with stage("outer"):
+            with stage("inner"):
+                buffer = np.ones(100_000)
+            del buffer
+            np.ones(10_000)
+    inner, outer = measurements.stages["inner"], measurements.stages["outer"]
+    assert inner.peak_memory >= 800_000
+    assert outer.peak_memory >= inner.peak_memory
+
+
+def test_export_and_merge():
+    x = np.linspace(0, 1, 20)
+    with profile() as first:
+        find_knee(x, np.sqrt(x), method="distance")
+    with profile() as second:
+        find_knee(x, np.sqrt(x), method="distance")
+        find_knee(x, np.sqrt(x), method="angle")
+    exported = json.loads(json.dumps(first.as_dict()))
+    merged = Profile.from_dict(exported).merge(second)
+    assert merged.stages["method.distance"].count == 2
+    assert merged.stages["method.angle"].count == 1
+    assert merged.stages["prepare.sort"].time == first.stages["prepare.sort"].time + second.stages["prepare.sort"].time
+    assert "method.distance" in merged.report()
+
+
+def total_copies(measurements):
+    return sum(statistics.copies for name, statistics in measurements.stages.items() if name.startswith("prepare."))
+
+
+def test_copies():
+    x = np.linspace(0, 1, 100)
+    for y in (np.sqrt(x), 1 - np.sqrt(x), x**3, 1 - x**3):  # all the knee types are reflected in place
+        with profile() as measurements:
+            find_knee(x, y, method="distance", sort=False)
+        assert total_copies(measurements) == 2  # just the normalized x and y
+        with profile() as measurements:
+            find_knee(x, y, method="distance")
+        assert total_copies(measurements) == 4  # and the sortedness check
+    with profile() as measurements:
+        find_knee(x[::-1], np.sqrt(x)[::-1].tolist(), method="distance")
+    assert total_copies(measurements) == 9  # the conversion of the list and the sort
+    with profile() as measurements:
+        find_knees(x, np.stack((np.sqrt(x), x**3)), method="distance", sort=False)
+    assert total_copies(measurements) == 2
+    with profile() as measurements:
+        find_knee(x, np.sqrt(x), method="distance", sort=False, smoothing=0.1)
+    assert measurements.stages["prepare.smoothing"].copies == 4  # the system, its solution, the correction and y
+    assert total_copies(measurements) == 6
+    with profile() as measurements:
+        find_knee(x.astype(np.float32), np.sqrt(x).astype(np.float32), method="distance", sort=False, smoothing=0.1)
+    assert measurements.stages["prepare.smoothing"].copies == 5  # and the float64 y
+
+    a = np.arange(10)
+    with profile() as measurements:
+        with stage("outer"):
+            count_copies(a, a[::2], np.asarray(a), a.copy(), np.asarray([1, 2]), inputs=(a,))
+            with stage("inner"):
+                count_copies(a.copy())
+    assert measurements.stages["outer"].copies == 2 and measurements.stages["inner"].copies == 1
+    assert "copies" in measurements.report()
+
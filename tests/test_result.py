@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from knarrow import KneeResult, find_knee, find_knees, find_top_knees
+from knarrow.menger import menger_successive_scores
+from knarrow.methods import available
+from knarrow.util import normalize
+
+X = np.linspace(0, 1, 30)
+CURVES = [np.sqrt(X), X**2, 1 - np.sqrt(X), 1 - X**2]
+
+
+@pytest.mark.parametrize("method", available() + ["all"])
+@pytest.mark.parametrize("y", CURVES)
+def test_find_knee_result(method, y):
+    result = find_knee(X, y, method=method, return_result=True)
+    assert isinstance(result, KneeResult)
+    assert result.index == find_knee(X, y, method=method)
+    assert result.scores.shape == X.shape
+    assert np.isfinite(result.scores[result.index])
+    if method != "kneedle":
+        assert result.scores[result.index] == result.scores.max()
+        assert result.margin >= 0
+
+
+@pytest.mark.parametrize("method", available() + ["all"])
+def test_find_knees_result(method):
+    y = np.stack(CURVES)
+    result = find_knees(X, y, method=method, return_result=True)
+    assert np.array_equal(result.index, find_knees(X, y, method=method))
+    for i, curve in enumerate(CURVES):
+        single = find_knee(X, curve, method=method, return_result=True)
+        assert np.allclose(result.scores[i], single.scores)
+        assert np.allclose(result.margin[i], single.margin)
+
+
+def test_reflected_scores():
+    # the decreasing concave curve is reversed in `prepare`, the scores must be reversed back
+    y = 1 - X**2
+    scores = menger_successive_scores(X, normalize(y)[::-1])[::-1]
+    assert np.allclose(find_knee(X, y, method="menger_successive", return_result=True).scores, scores)
+
+
+def test_lazy():
+    calls = []
+    result = KneeResult(3, lambda: calls.append(1) or np.arange(5.0))
+    mapped = result.map_indices(lambda knee: 4 - knee)
+    assert mapped.index == 1 and calls == []
+    assert np.array_equal(mapped.scores, np.arange(5.0)[::-1])
+    assert mapped.scores is mapped.scores and calls == [1]
+    assert [10, 20, 30, 40, 50][mapped] == 20
+    assert mapped.margin == -1.0  # 3 is not the best score
+
+
+@pytest.mark.parametrize("method", ["angle", "distance_adjacent", "menger_anchored", "menger_successive"])
+def test_find_top_knees(method):
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, [0, 0.2, 0.6, 1], [0, 0.6, 0.9, 1])  # two knees, at 20 and 60
+    knees = find_top_knees(x, y, k=2, min_separation=10, method=method)
+    assert sorted(knees) in ([20, 60], [19, 59])  # distance_adjacent reports one point earlier
+    assert knees[0] == find_knee(x, y, method=method)
+
+
+def test_top_k():
+    result = KneeResult(0, np.array([5.0, 4.0, -np.inf, 1.0, 3.0, np.nan, 2.0]))
+    assert np.array_equal(result.top_k(3), [0, 1, 4])
+    assert np.array_equal(result.top_k(3, min_separation=2), [0, 4, 6])
+    assert np.array_equal(result.top_k(10, min_separation=3), [0, 4])
+    assert np.array_equal(result.top_k(10), [0, 1, 4, 6, 3])  # -inf and NaN are never picked
+
+
+def test_top_k_batch():
+    scores = np.array([[1.0, 3.0, 2.0, 0.0], [-np.inf, -np.inf, 1.0, -np.inf]])
+    knees = KneeResult(np.array([1, 2]), scores).top_k(2, min_separation=2)
+    assert np.array_equal(knees, [[1, 3], [2, -1]])
@@ -3,14 +3,36 @@ import numpy.linalg as la
 import numpy.typing as npt
 import pytest
 
+from knarrow import find_knee, find_knees
 from knarrow.util import (
+    EPS,
+    SMOOTHING_CACHE,
     KneeType,
+    SmoothingCache,
+    anchored_views,
+    clear_smoothing_cache,
+    cubic_spline_smoothing,
+    cubic_spline_smoothing_dense,
     detect_knee_type,
+    eps,
+    factorize_pentadiagonal,
+    float_dtype,
+    get_delta_bands,
     get_delta_matrix,
+    get_weight_bands,
     get_weight_matrix,
+    knee_type_codes,
     normalize,
+    np_anchored,
     np_windowed,
     projection_distance,
+    projection_distance_components,
+    residuals,
+    shared_intermediates,
+    solve_pentadiagonal,
+    successive_points,
+    successive_views,
+    windowed_view,
 )
 
 
@@ -31,6 +53,35 @@ def test_np_widowed(length: int, w: int, s: int, d: int, target: npt.NDArray[np.
     assert (output == target).all()
 
 
+@pytest.mark.parametrize("length,w,s,d", [(7, 3, 1, 1), (7, 4, 1, 1), (7, 3, 2, 1), (7, 4, 2, 1), (7, 3, 1, 2)])
+def test_windowed_view(length, w, s, d):
+    x = np.arange(2 * length).reshape(2, length) ** 2
+    view = windowed_view(x, w, s, d)
+    assert np.shares_memory(view, x) and not view.flags.writeable
+    assert (view == x[..., np_windowed(length, w, s, d)]).all()
+
+
+def test_component_views():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(size=(2, 3, 10))
+    for views, indices in ((successive_views(x, y), np_windowed(10, 3)), (anchored_views(x, y), np_anchored(10))):
+        for i, (x_view, y_view) in enumerate(views):
+            assert np.shares_memory(x_view, x) and np.shares_memory(y_view, y)
+            assert (np.broadcast_to(x_view, (3, 8)) == x[..., indices[:, i]]).all()
+            assert (np.broadcast_to(y_view, (3, 8)) == y[..., indices[:, i]]).all()
+    (x_1, _), (x_2, _), (x_3, _) = successive_views(x, y, dilation=3)
+    assert (x_1 == x[..., :4]).all() and (x_2 == x[..., 3:7]).all() and (x_3 == x[..., 6:]).all()
+
+
+def test_projection_distance_components():
+    vertices = np.random.default_rng(0).normal(size=(4, 5, 2, 2))
+    result = projection_distance_components(
+        (vertices[..., 0, 0], vertices[..., 0, 1]), (vertices[..., 1, 0], vertices[..., 1, 1])
+    )
+    expected = np.abs(la.det(vertices)) / (la.norm(vertices[..., 1, :], axis=-1) + EPS)
+    assert np.allclose(result, expected)
+
+
 def test_scale():
     rng = np.random.default_rng()
     for _ in range(100):
@@ -43,6 +94,15 @@ def test_scale():
         assert scaled_array.max().item() == 1
 
 
+def test_scale_batch():
+    rng = np.random.default_rng()
+    array = rng.normal(0, 10, (5, 100))
+    scaled_array = normalize(array)
+    assert scaled_array.shape == array.shape
+    assert (scaled_array.min(axis=-1) == 0).all()
+    assert (scaled_array.max(axis=-1) == 1).all()
+
+
 @pytest.mark.parametrize(
     "x,target",
     [
@@ -93,6 +153,48 @@ def test_get_weight_matrix(x, target):
     assert np.allclose(out, target)
 
 
+def test_bands():
+    rng = np.random.default_rng()
+    h = rng.uniform(0.1, 1.0, 10)
+    delta = get_delta_matrix(h)
+    weight = get_weight_matrix(h)
+    for offset, band in enumerate(get_delta_bands(h)):
+        assert np.allclose(np.diagonal(delta, offset), band)
+    for offset, band in enumerate(get_weight_bands(h)):
+        assert np.allclose(np.diagonal(weight, offset), band)
+
+
+@pytest.mark.parametrize("m", [1, 2, 3, 10])
+def test_solve_pentadiagonal(m):
+    rng = np.random.default_rng()
+    d1 = rng.uniform(-1, 1, m - 1)
+    d2 = rng.uniform(-1, 1, max(m - 2, 0))
+    d0 = rng.uniform(4, 5, m)  # diagonally dominant, therefore positive definite
+    matrix = np.diag(d0)
+    for offset, band in ((1, d1), (2, d2)):
+        rows = np.arange(len(band))
+        matrix[rows, rows + offset] = matrix[rows + offset, rows] = band
+    factors = factorize_pentadiagonal(d0, d1, d2)
+    rhs = rng.normal(size=m)
+    assert np.allclose(solve_pentadiagonal(factors, rhs), la.solve(matrix, rhs))
+    rhs = rng.normal(size=(2, 3, m))
+    assert np.allclose(solve_pentadiagonal(factors, rhs) @ matrix.T, rhs)
+
+
+@pytest.mark.parametrize("smoothing_factor", [0.0, 1e-4, 1e-2, 1.0])
+@pytest.mark.parametrize("n", [3, 4, 10, 100])
+def test_cubic_spline_smoothing(n, smoothing_factor):
+    rng = np.random.default_rng()
+    x = normalize(np.cumsum(rng.uniform(0.5, 1.5, n)))
+    y = rng.normal(size=(2, n))
+    _, target = cubic_spline_smoothing_dense(x, y, smoothing_factor)
+    _, smoothed = cubic_spline_smoothing(x, y, smoothing_factor)
+    assert smoothed.shape == y.shape
+    assert np.allclose(smoothed, target)
+    _, smoothed = cubic_spline_smoothing(x, y[0], smoothing_factor)
+    assert np.allclose(smoothed, target[0])
+
+
 @pytest.mark.parametrize("n", range(3, 20))
 def test_numerical(n):
     delta = np.random.randn(n - 2, n)
@@ -131,6 +233,77 @@ def test_projection_distance(x, target):
     assert np.allclose(result, target)
 
 
+@pytest.mark.parametrize(
+    "dtypes,target",
+    [
+        ((np.float32,), np.float32),
+        ((np.float32, np.float16), np.float32),
+        ((np.float16,), np.float32),
+        ((np.float32, np.float64), np.float64),
+        ((np.float32, np.int64), np.float64),
+        ((np.int32,), np.float64),
+    ],
+)
+def test_float_dtype(dtypes, target):
+    assert float_dtype(*(np.zeros(3, dtype=dtype) for dtype in dtypes)) == target
+
+
+def test_eps():
+    assert eps(np.float64) == EPS and eps(np.float32) == np.float32(EPS)
+    assert eps(np.float32).dtype == np.float32
+    assert eps(np.float16) > np.finfo(np.float16).eps
+
+
+def test_smoothing_cache():
+    clear_smoothing_cache()
+    x = np.linspace(0, 1, 50)
+    rng = np.random.default_rng(0)
+    first, second = np.sqrt(x) + rng.normal(0, 0.05, (2, 50))
+    expected = cubic_spline_smoothing_dense(x, second, 0.01)[1]
+    cubic_spline_smoothing(x, first, 0.01)
+    assert np.allclose(cubic_spline_smoothing(x.copy(), second, 0.01)[1], expected)  # a hit, even for another array
+    cubic_spline_smoothing(x, second, 0.1)
+    cubic_spline_smoothing(x.astype(np.float32), second, 0.01)
+    assert SMOOTHING_CACHE.info()[:2] == (1, 3)
+
+    cache = SmoothingCache(maxsize=2)
+    operators = [cache.get(x, 0.01), cache.get(x**2, 0.01), cache.get(x, 0.01), cache.get(x**3, 0.01)]
+    assert cache.info() == (1, 3, 2, 2)
+    assert operators[2] is operators[0]
+    assert cache.get(x, 0.01) is operators[0]  # the least recently used x**2 was evicted
+    assert cache.get(x**2, 0.01) is not operators[1]
+
+    # a colliding digest is never trusted, the grids are compared
+    key = next(iter(cache._entries))
+    cache._entries[key] = (x**4, operators[1])
+    assert cache.get(x, 0.01)[1] == operators[0][1]
+    cache.clear()
+    assert cache.info() == (0, 0, 2, 0)
+
+
+@pytest.mark.parametrize("y_function", [np.sqrt, lambda x: 1 - np.sqrt(x), lambda x: x**3, lambda x: 1 - x**3])
+def test_prepare_views(y_function):
+    # the inputs are read in place, never written to
+    x = np.linspace(0, 10, 50)
+    y = y_function(x / 10)
+    x_view, y_view = x[::2], y[::2]
+    expected = y_view.copy()
+    x.flags.writeable = y.flags.writeable = False
+    knee = find_knee(x_view, y_view, method="menger_successive", sort=False)
+    assert knee == find_knee(x_view.copy(), expected, method="menger_successive")
+    assert np.array_equal(y_view, expected)
+    assert find_knees(x_view, np.stack((y_view, y_view)), sort=False).tolist() == [knee, knee]
+    assert np.array_equal(y_view, expected)
+
+
+def test_float32_smoothing():
+    x = np.linspace(0, 1, 200)
+    y = np.sqrt(x) + np.random.default_rng(0).normal(0, 0.05, 200)
+    _, smoothed = cubic_spline_smoothing(x.astype(np.float32), y.astype(np.float32), 0.01)
+    assert smoothed.dtype == np.float32
+    assert np.allclose(smoothed, cubic_spline_smoothing(x, y, 0.01)[1], atol=1e-5)
+
+
 @pytest.mark.parametrize(
     "x,target",
     [
@@ -143,3 +316,20 @@ def test_projection_distance(x, target):
 def test_find_knee(x, target):
     output = detect_knee_type(*x)
     assert output == target
+
+
+def test_knee_type_codes():
+    y = np.array([(0.0, 1.0, 3.0, 7.0), (7.0, 3.0, 1.0, 0.0), (1.0, 4.0, 6.0, 7.0), (7.0, 6.0, 4.0, 1.0)])
+    output = knee_type_codes(*y.T)
+    assert output.tolist() == [knee_type.value for knee_type in map(detect_knee_type, *y.T)]
+
+
+def test_shared_intermediates():
+    x = np.linspace(0, 1, 10)
+    y = x**2
+    assert residuals(x, y) is not residuals(x, y)
+    with shared_intermediates(x, y):
+        assert residuals(x, y) is residuals(x, y)
+        assert successive_points(x, y) is successive_points(x, y)
+        assert residuals(x, y.copy()) is not residuals(x, y)  # a different curve
+    assert residuals(x, y) is not residuals(x, y)